@@ -0,0 +1,60 @@
+import os
+import time
+import asyncio
+
+# Default time budget for one run, overridable per test (`timeout_seconds`).
+RUN_TIMEOUT_SECONDS = int(os.environ.get("RUN_TIMEOUT_SECONDS", "300"))
+# Share of the budget the planner and the evaluator may each use. TinyFish
+# gets whatever is left, minus the evaluator's share, which is always kept
+# in reserve so a slow browser session still ends with a verdict.
+RUN_PLAN_SHARE = float(os.environ.get("RUN_PLAN_SHARE", "0.2"))
+RUN_EVAL_SHARE = float(os.environ.get("RUN_EVAL_SHARE", "0.2"))
+MIN_STAGE_SECONDS = 5.0
+
+
+class StageTimeout(Exception):
+    def __init__(self, stage: str, seconds: float):
+        super().__init__(f"{stage} timed out after {seconds:.0f}s")
+        self.stage = stage
+        self.seconds = seconds
+
+
+def run_timeout(test: dict | None) -> float:
+    """The run budget of a stored test (hash or dict), falling back to the default."""
+    try:
+        return float((test or {}).get("timeout_seconds") or RUN_TIMEOUT_SECONDS)
+    except (TypeError, ValueError):
+        return float(RUN_TIMEOUT_SECONDS)
+
+
+class RunDeadline:
+    """Wall-clock budget for one run_test call, split across its stages."""
+
+    def __init__(self, total: float):
+        self.total = total
+        self._started = time.monotonic()
+
+    def remaining(self) -> float:
+        return max(0.0, self.total - (time.monotonic() - self._started))
+
+    def budget(self, stage: str) -> float:
+        remaining = self.remaining()
+        if stage == "plan":
+            limit = min(remaining, self.total * RUN_PLAN_SHARE)
+        elif stage == "browser":
+            limit = remaining - self.total * RUN_EVAL_SHARE
+        else:
+            limit = remaining
+        return max(MIN_STAGE_SECONDS, limit)
+
+    def stage_end(self, stage: str) -> float:
+        """time.monotonic() at which `stage`, started now, runs out of budget."""
+        return time.monotonic() + self.budget(stage)
+
+    async def run(self, stage: str, awaitable):
+        """Await `awaitable` within the stage budget; cancel it and raise StageTimeout when over."""
+        seconds = self.budget(stage)
+        try:
+            return await asyncio.wait_for(awaitable, seconds)
+        except asyncio.TimeoutError:
+            raise StageTimeout(stage, seconds) from None
@@ -1,6 +1,7 @@
 import json
 from pydantic_ai import Agent, UsageLimits
-from models import TestResult
+from models import TestResult, StepResult
+from services.limiter import acquire
 
 evaluator_agent = Agent(
     'anthropic:claude-haiku-4-5-20251001',
@@ -61,12 +62,88 @@ def _summarize_browser_result(browser_result: dict) -> dict:
     return summary
 
 
+EVALUATOR_MODES = ("auto", "llm", "rules")
+
+
+def _text(value) -> str:
+    if isinstance(value, list):
+        return ", ".join(str(v) for v in value)
+    return str(value) if value else ""
+
+
+def evaluate_rules(browser_result: dict, step_results: list[dict], decide_all: bool = False) -> TestResult | None:
+    """Build the verdict locally when the browser outcome is unambiguous.
+
+    A technical failure (TinyFish ERROR event, HTTP error, stream without a
+    COMPLETE event) is a fail. A run where TinyFish reported success with no
+    error and every step passed is a pass. Anything else is left to the LLM
+    (returns None) unless `decide_all` is set, in which case the run passes
+    only if every step passed and TinyFish did not report failure.
+    """
+    total = len(step_results)
+    passed_count = sum(1 for sr in step_results if sr.get("passed"))
+    results = [StepResult(**sr) for sr in step_results]
+
+    error = browser_result.get("error")
+    if error:
+        return TestResult(
+            passed=False,
+            steps_passed=passed_count,
+            steps_total=total,
+            details=f"The browser session did not complete: {error}",
+            step_results=results,
+            error=error,
+        )
+
+    data = None
+    raw = browser_result.get("raw_result")
+    if raw:
+        try:
+            data = json.loads(raw) if isinstance(raw, str) else raw
+        except (json.JSONDecodeError, TypeError):
+            data = None
+    data = data if isinstance(data, dict) else {}
+    reported = data.get("success")
+
+    all_passed = total > 0 and passed_count == total
+    if browser_result.get("success") and reported is True and not data.get("error") and all_passed:
+        observed = _text(data.get("verification") or data.get("action_performed"))
+        return TestResult(
+            passed=True,
+            steps_passed=passed_count,
+            steps_total=total,
+            details=f"All {total} steps passed. {observed}".strip(),
+            step_results=results,
+        )
+
+    if not decide_all:
+        return None
+
+    passed = all_passed and reported is not False
+    reason = _text(data.get("error") or data.get("verification")) or "not every step passed"
+    return TestResult(
+        passed=passed,
+        steps_passed=passed_count,
+        steps_total=total,
+        details=f"{passed_count}/{total} steps passed." + ("" if passed else f" {reason}"),
+        step_results=results,
+    )
+
+
 async def evaluate_test(
     url: str,
     goal: str,
     browser_result: dict,
     step_results: list[dict],
+    mode: str = "auto",
 ) -> TestResult:
+    """Decide pass/fail. `mode`: auto (rules, LLM if ambiguous), llm, or rules only."""
+    if mode != "llm":
+        verdict = evaluate_rules(browser_result, step_results, decide_all=mode == "rules")
+        if verdict is not None:
+            verdict.meta["evaluator"] = "rules"
+            return verdict
+
     summarized = _summarize_browser_result(browser_result)
 
     prompt = f"""Test URL: {url}
@@ -80,8 +157,10 @@ Step Results:
 
 Evaluate whether this test passed or failed based on the original goal."""
 
-    result = await evaluator_agent.run(
-        prompt,
-        usage_limits=UsageLimits(request_limit=3),
-    )
+    async with acquire("anthropic"):
+        result = await evaluator_agent.run(
+            prompt,
+            usage_limits=UsageLimits(request_limit=3),
+        )
+    result.output.meta["evaluator"] = "llm"
     return result.output
@@ -1,36 +1,80 @@
 import json
 import time
 from models import TestPlan, BrowserResult, StepResult, StepExecution, TestResult
-from agents.planner import create_plan
-from agents.evaluator import evaluate_test
+from agents.planner import create_plan, PLANNER_VERSION
+from agents.evaluator import evaluate_test, evaluate_rules, EVALUATOR_MODES
+from agents.progress import StepProgress
+from agents.deadline import RunDeadline, StageTimeout, run_timeout
+from agents.retry import RetryLog, with_retries, transient_error, transient_tinyfish
 from services.tinyfish import call_tinyfish
-from services.result_store import log_event
-from services.config import get_redis
+from services.limiter import LimiterTimeout
+from services.result_store import log_event, flush_events
+from services.config import get_async_redis
 from services.variable_resolver import resolve_variables
+from services.plan_cache import plan_cache_key, get_cached_plan, store_plan, record_plan_outcome
+from services.metrics import retries as retries_metric, stage, record_stage, tinyfish_aborts
 
 
-async def run_test(url: str, goal: str, test_id: str | None = None) -> tuple[TestPlan, BrowserResult, TestResult]:
+async def _get_plan(url: str, goal: str) -> tuple[TestPlan, str, str]:
+    """Return (plan, cache_key, cache_status), calling the planner only on a miss."""
+    cache_key = plan_cache_key(url, goal, PLANNER_VERSION)
+    try:
+        plan, cache_status = await get_cached_plan(cache_key)
+    except Exception as e:
+        print(f"[PlanCache] Lookup failed: {e}")
+        plan, cache_status = None, "error"
+    if plan:
+        return plan, cache_key, cache_status
+
+    plan = await create_plan(url, goal)
+    try:
+        await store_plan(cache_key, plan)
+    except Exception as e:
+        print(f"[PlanCache] Store failed: {e}")
+    return plan, cache_key, cache_status
+
+
+async def run_test(
+    url: str,
+    goal: str,
+    test_id: str | None = None,
+    evaluator_mode: str | None = None,
+    variables: list[dict] | None = None,
+    timeout_seconds: float | None = None,
+) -> tuple[TestPlan, BrowserResult, TestResult]:
+    """Plan, execute and evaluate one test within a deadline.
+
+    `timeout_seconds` (default: the test's `timeout_seconds`, else
+    RUN_TIMEOUT_SECONDS) is split across the stages by RunDeadline. A stage
+    that runs out of time is cancelled and the run is recorded as a failure
+    saying where it stopped, rather than raising.
+    """
     start = time.time()
+    # Per-stage durations in ms, stored on the run record as meta["stages"].
+    spans: dict[str, int] = {}
 
     if test_id:
         try:
-            redis = get_redis()
-            redis.delete(f"events:{test_id}")
+            await flush_events()
+            redis = get_async_redis()
+            await redis.delete(f"events:{test_id}")
         except Exception as e:
             print(f"[EventLog] Failed to clear events stream: {e}")
 
-    def _log(event_type: str, message: str, **kwargs):
+    async def _log(event_type: str, message: str, **kwargs):
         if test_id:
             try:
-                log_event(test_id, event_type, message, **kwargs)
+                await log_event(test_id, event_type, message, **kwargs)
             except Exception as e:
                 print(f"[EventLog] Failed to log event: {e}")
 
     # Resolve variables: planner gets real values, evaluator gets {{placeholders}}
     original_goal = goal
+    test_data = {}
     if test_id:
         try:
-            test_data = get_redis().hgetall(f"test:{test_id}")
+            test_data = await get_async_redis().hgetall(f"test:{test_id}") or {}
+            evaluator_mode = evaluator_mode or test_data.get("evaluator_mode")
             raw_vars = test_data.get("variables", "[]")
             variables = json.loads(raw_vars) if isinstance(raw_vars, str) else raw_vars
             if variables:
@@ -38,27 +82,124 @@ async def run_test(url: str, goal: str, test_id: str | None = None) -> tuple[Tes
                 print(f"[Pipeline] Resolved {len(variables)} variables in goal")
         except Exception as e:
             print(f"[Pipeline] Variable resolution failed: {e}")
+    elif variables:
+        goal = resolve_variables(goal, variables)
+
+    deadline = RunDeadline(timeout_seconds or run_timeout(test_data))
+    retry_logs = {name: RetryLog(name) for name in ("plan", "browser", "evaluate")}
+
+    async def _on_retry(stage_name: str, attempt: int, reason: str, delay: float):
+        retries_metric.inc(stage=stage_name)
+        await _log("retry", f"{stage_name} attempt {attempt} failed ({reason}), retrying in {delay:.1f}s", stage=stage_name, attempt=attempt)
 
     try:
-        _log("plan_start", f"Planning test for {url}")
+        await _log("plan_start", f"Planning test for {url}")
         print(f"[Planner] Creating test plan for: {goal}")
-        plan = await create_plan(url, goal)
-        print(f"[Planner] {plan.total_steps} steps planned")
+        try:
+            with stage(spans, "plan"):
+                plan, cache_key, plan_cache = await deadline.run("plan", with_retries(
+                    retry_logs["plan"],
+                    lambda attempt: _get_plan(url, goal),
+                    deadline.stage_end("plan"),
+                    on_retry=_on_retry,
+                ))
+        except (StageTimeout, LimiterTimeout) as e:
+            print(f"[Planner] {e}")
+            if isinstance(e, StageTimeout):
+                await _log("error", f"Run timed out while planning ({e.seconds:.0f}s budget)")
+                details, error = f"Timed out while planning: no plan within {e.seconds:.0f}s.", f"Timed out while planning after {e.seconds:.0f}s"
+            else:
+                await _log("error", f"Planner unavailable: {e}")
+                details, error = f"Planner unavailable: {e}.", str(e)
+            plan = TestPlan(tinyfish_goal="", steps=[], total_steps=0)
+            browser_result = BrowserResult(success=False, step_results=[], error=str(e))
+            final_result = TestResult(
+                passed=False,
+                steps_passed=0,
+                steps_total=0,
+                details=details,
+                step_results=[],
+                error=error,
+            )
+            final_result.duration_ms = int((time.time() - start) * 1000)
+            final_result.meta["stages"] = spans
+            if isinstance(e, StageTimeout):
+                final_result.meta.update({"timed_out": "plan", "deadline_s": deadline.total})
+            if retry_logs["plan"].retries:
+                final_result.meta["retries"] = {"plan": retry_logs["plan"].summary()}
+            return plan, browser_result, final_result
+        print(f"[Planner] {plan.total_steps} steps planned (plan cache: {plan_cache})")
         steps_json = json.dumps([{"step_number": s.step_number, "description": s.description} for s in plan.steps])
-        _log("plan_complete", f"Plan created: {plan.total_steps} steps", steps=steps_json)
+        plan_source = "reused cached plan" if plan_cache == "hit" else "created"
+        await _log("plan_complete", f"Plan {plan_source}: {plan.total_steps} steps", steps=steps_json, plan_cache=plan_cache)
 
         # Execute ALL steps in a single continuous TinyFish session
-        _log("browser_start", "Executing test with TinyFish")
+        await _log("browser_start", "Executing test with TinyFish")
         print(f"[Browser] Executing all {plan.total_steps} steps in one session...")
 
+        live = {}
+
         async def _on_streaming_url(streaming_url: str):
-            _log("browser_preview", "Live browser preview available", streaming_url=streaming_url)
+            live["streaming_url"] = streaming_url
+            await _log("browser_preview", "Live browser preview available", streaming_url=streaming_url)
 
-        tinyfish_result = await call_tinyfish(
-            url=url,
-            goal=plan.tinyfish_goal,
-            on_streaming_url=_on_streaming_url,
-        )
+        progress = StepProgress(plan.steps)
+
+        async def _on_step(event: dict) -> str | None:
+            step_number, failing = progress.observe(event)
+            await _log(
+                "step_progress",
+                f"Step {step_number}: {(event.get('message') or event.get('purpose') or '')[:120]}",
+                step_number=step_number,
+                action=event.get("action") or None,
+                failing=failing,
+            )
+            if progress.abort_reason:
+                print(f"[Browser] Aborting TinyFish session: {progress.abort_reason}")
+                await _log("browser_abort", f"Stopped the browser early: {progress.abort_reason}", step_number=step_number)
+            return progress.abort_reason
+
+        async def _attempt_browser(attempt: int) -> dict:
+            nonlocal progress
+            if attempt:
+                # A retried session starts over from the first step.
+                progress = StepProgress(plan.steps)
+            return await call_tinyfish(
+                url=url,
+                goal=plan.tinyfish_goal,
+                timeout=browser_budget,
+                on_streaming_url=_on_streaming_url,
+                on_step=_on_step,
+            )
+
+        timed_out = None
+        browser_budget = deadline.budget("browser")
+        try:
+            tinyfish_result = await deadline.run("browser", with_retries(
+                retry_logs["browser"],
+                _attempt_browser,
+                deadline.stage_end("browser"),
+                check_result=transient_tinyfish,
+                on_retry=_on_retry,
+            ))
+        except StageTimeout as e:
+            # Cancelling the call closed the stream; keep what was seen so far.
+            timed_out = "browser"
+            print(f"[Browser] {e} at step {progress.current}")
+            await _log("browser_abort", f"Timed out at step {progress.current} after {e.seconds:.0f}s", step_number=progress.current)
+            record_stage(spans, "tinyfish_complete", int(e.seconds * 1000))
+            tinyfish_result = {
+                "success": False,
+                "raw": None,
+                "streaming_url": live.get("streaming_url"),
+                "error": f"Timed out at step {progress.current} after {e.seconds:.0f}s",
+                "aborted": True,
+            }
+        aborted_at = progress.current if tinyfish_result.get("aborted") else None
+        if aborted_at is not None and not timed_out:
+            tinyfish_aborts.inc()
+        for name, ms in tinyfish_result.get("timings", {}).items():
+            record_stage(spans, f"tinyfish_{name.removesuffix('_ms')}", ms)
 
         streaming_url = tinyfish_result.get("streaming_url")
 
@@ -97,6 +238,10 @@ async def run_test(url: str, goal: str, test_id: str | None = None) -> tuple[Tes
                 passed = step_data.get("success", overall_success)
                 raw_details = step_data.get("verification", "") or step_data.get("action_performed", "") or step_data.get("message", "")
                 details = ", ".join(raw_details) if isinstance(raw_details, list) else str(raw_details) if raw_details else ""
+            elif aborted_at is not None and step_num != aborted_at:
+                # The browser got past earlier steps; later ones never ran.
+                passed = step_num < aborted_at
+                details = "Reached before the run was aborted" if passed else "Not reached: the run was aborted"
             elif error:
                 passed = False
                 details = error
@@ -121,14 +266,15 @@ async def run_test(url: str, goal: str, test_id: str | None = None) -> tuple[Tes
                 step_number=step_num,
                 passed=passed,
                 details=details,
+                retry_count=retry_logs["browser"].retries,
             )
             step_results.append(sr)
 
             status_char = "+" if passed else "x"
             print(f"[Browser] Step {step_num}: {status_char} {details[:80]}")
-            _log("step_complete", f"Step {step_num}: {'passed' if passed else 'failed'} — {details[:120]}", step_number=step_num, passed=passed)
+            await _log("step_complete", f"Step {step_num}: {'passed' if passed else 'failed'} — {details[:120]}", step_number=step_num, passed=passed)
 
-        _log("browser_complete", f"Browser execution finished: {len(step_executions)} steps")
+        await _log("browser_complete", f"Browser execution finished: {len(step_executions)} steps")
 
         browser_result = BrowserResult(
             success=overall_success,
@@ -136,26 +282,85 @@ async def run_test(url: str, goal: str, test_id: str | None = None) -> tuple[Tes
             step_executions=[se.model_dump() for se in step_executions] if step_executions else [],
             raw_result=tinyfish_raw if isinstance(tinyfish_raw, str) else json.dumps(tinyfish_raw) if tinyfish_raw else None,
             streaming_url=streaming_url,
+            error=error,
         )
 
-        _log("eval_start", "Evaluating results")
+        await _log("eval_start", "Evaluating results")
         print("[Evaluator] Synthesizing results...")
-        final_result = await evaluate_test(
-            url=url,
-            goal=original_goal,
-            browser_result=browser_result.model_dump(),
-            step_results=[sr.model_dump() for sr in step_results],
-        )
+        try:
+            with stage(spans, "evaluate"):
+                final_result = await deadline.run("evaluate", with_retries(
+                    retry_logs["evaluate"],
+                    lambda attempt: evaluate_test(
+                        url=url,
+                        goal=original_goal,
+                        browser_result=browser_result.model_dump(),
+                        step_results=[sr.model_dump() for sr in step_results],
+                        mode=evaluator_mode if evaluator_mode in EVALUATOR_MODES else "auto",
+                    ),
+                    deadline.stage_end("evaluate"),
+                    on_retry=_on_retry,
+                ))
+        except Exception as e:
+            # Out of time or the model stayed unavailable: fall back to the rules.
+            if isinstance(e, StageTimeout):
+                timed_out = timed_out or "evaluate"
+                note = f"evaluator timed out after {e.seconds:.0f}s"
+            elif isinstance(e, LimiterTimeout):
+                note = f"evaluator unavailable: {e}"
+            elif transient_error(e):
+                note = f"evaluator unavailable: {transient_error(e)}"
+            else:
+                raise
+            print(f"[Evaluator] {note}, deciding by rules")
+            final_result = evaluate_rules(
+                browser_result.model_dump(), [sr.model_dump() for sr in step_results], decide_all=True,
+            )
+            final_result.details += f" ({note}, decided by rules)"
+            final_result.meta["evaluator"] = "rules"
 
         final_result.duration_ms = int((time.time() - start) * 1000)
+        record_stage(spans, "total", final_result.duration_ms)
+        final_result.meta["plan_cache"] = plan_cache
+        final_result.meta["stages"] = spans
+        if aborted_at is not None:
+            final_result.meta["aborted_at_step"] = aborted_at
+            final_result.error = final_result.error or error
+        if timed_out:
+            final_result.meta["timed_out"] = timed_out
+            final_result.meta["deadline_s"] = deadline.total
+        for sr in final_result.step_results:
+            sr.retry_count = retry_logs["browser"].retries
+        retried = {name: log.summary() for name, log in retry_logs.items() if log.retries}
+        if retried:
+            final_result.meta["retries"] = retried
+
+        # Only stored tests' runs count toward re-planning a cached plan.
+        if test_id:
+            try:
+                await record_plan_outcome(cache_key, plan_cache, final_result.passed)
+            except Exception as e:
+                print(f"[PlanCache] Failed to record outcome: {e}")
 
         status = "PASSED" if final_result.passed else "FAILED"
-        print(f"[Result] {status} -- {final_result.steps_passed}/{final_result.steps_total} steps in {final_result.duration_ms}ms")
+        print(f"[Result] {status} -- {final_result.steps_passed}/{final_result.steps_total} steps in {final_result.duration_ms}ms (decided by {final_result.meta.get('evaluator')})")
         print(f"[Result] {final_result.details}")
-        _log("eval_complete", f"Test {status} — {final_result.steps_passed}/{final_result.steps_total} steps", passed=final_result.passed)
+        await _log(
+            "eval_complete",
+            f"Test {status} — {final_result.steps_passed}/{final_result.steps_total} steps",
+            passed=final_result.passed,
+            evaluator=final_result.meta.get("evaluator"),
+        )
 
         return plan, browser_result, final_result
 
     except Exception as e:
-        _log("error", f"Pipeline error: {str(e)}")
+        await _log("error", f"Pipeline error: {str(e)}")
         raise
+
+    finally:
+        if test_id:
+            try:
+                await flush_events()
+            except Exception as e:
+                print(f"[EventLog] Failed to flush events: {e}")
@@ -1,10 +1,11 @@
+import hashlib
 from pydantic_ai import Agent, UsageLimits
 from models import TestPlan
+from services.limiter import acquire
 
-planner_agent = Agent(
-    'anthropic:claude-haiku-4-5-20251001',
-    output_type=TestPlan,
-    instructions="""You are a QA test planner that generates browser automation instructions
+PLANNER_MODEL = 'anthropic:claude-haiku-4-5-20251001'
+
+PLANNER_INSTRUCTIONS = """You are a QA test planner that generates browser automation instructions
 for TinyFish, an AI-powered browser agent.
 
 TinyFish accepts a URL and a "goal" — a natural language instruction describing what to do
@@ -56,13 +57,23 @@ WHAT TINYFISH CANNOT DO:
 
 STEP COUNT: Aim for 3-6 steps. Simple checks = 2-3 steps. Complex flows = 5-6 steps. Never exceed 8.
 
-The `steps` list should mirror the STEP instructions in the combined goal.""",
+The `steps` list should mirror the STEP instructions in the combined goal."""
+
+# Changes whenever the model or prompt changes, so cached plans from an older
+# planner are never reused (see services/plan_cache.py).
+PLANNER_VERSION = hashlib.sha256(f"{PLANNER_MODEL}\n{PLANNER_INSTRUCTIONS}".encode()).hexdigest()[:12]
+
+planner_agent = Agent(
+    PLANNER_MODEL,
+    output_type=TestPlan,
+    instructions=PLANNER_INSTRUCTIONS,
 )
 
 
 async def create_plan(url: str, goal: str) -> TestPlan:
-    result = await planner_agent.run(
-        f"Test URL: {url}\nTest Goal: {goal}",
-        usage_limits=UsageLimits(request_limit=3),
-    )
+    async with acquire("anthropic"):
+        result = await planner_agent.run(
+            f"Test URL: {url}\nTest Goal: {goal}",
+            usage_limits=UsageLimits(request_limit=3),
+        )
     return result.output
@@ -0,0 +1,84 @@
+import os
+import re
+from models import TestStep
+
+# Consecutive failure-looking STEP events on one plan step before the
+# TinyFish session is abandoned (0 = never abort early).
+TINYFISH_ABORT_AFTER_FAILURES = int(os.environ.get("TINYFISH_ABORT_AFTER_FAILURES", "3"))
+
+_STEP_REF = re.compile(r"\bstep\s+(\d+)\b", re.I)
+_FAILURE = re.compile(
+    r"\b(error|errors|failed|fails|failing|unable to|could not|couldn't|cannot|can't|not found|"
+    r"does not exist|doesn't exist|no such|404|500|502|503|timed out|timeout|blank page|access denied)\b",
+    re.I,
+)
+# Forms of one failure word count as the same word ("errors" ~ "error").
+_FAILURE_FORMS = {"errors": "error", "failed": "fail", "fails": "fail", "failing": "fail", "timed out": "timeout", "couldn't": "could not", "can't": "cannot", "doesn't exist": "does not exist"}
+_URL = re.compile(r"https?://\S+")
+_WORD = re.compile(r"[a-z0-9]+(?:'[a-z]+)?")
+_STOPWORDS = {
+    "the", "and", "for", "that", "this", "with", "into", "from", "then", "page", "step",
+    "verify", "check", "click", "clicked", "navigate", "navigated", "button", "field", "is", "are",
+}
+
+
+def _tokens(text: str) -> set[str]:
+    return {w for w in _WORD.findall(text.lower()) if len(w) > 2 and w not in _STOPWORDS}
+
+
+def _failure_words(text: str) -> set[str]:
+    found = {m.lower() for m in _FAILURE.findall(text)}
+    return {_FAILURE_FORMS.get(w, w) for w in found}
+
+
+class StepProgress:
+    """Maps TinyFish STEP events onto planned steps while the stream runs.
+
+    TinyFish does not number its STEP events, so an event is attributed to
+    the plan step it names ("STEP 2: ...", echoed from the goal) or, failing
+    that, to the step whose description it shares the most words with.
+    Progress only moves forward. A run of failure-looking events on the same
+    step (errors, "not found", timeouts) sets `abort_reason`. Failure words
+    the step itself mentions ("shows an error message") are expected there
+    and do not count.
+    """
+
+    def __init__(self, steps: list[TestStep], abort_after: int = TINYFISH_ABORT_AFTER_FAILURES):
+        self.steps = sorted(steps, key=lambda s: s.step_number)
+        self._tokens = {s.step_number: _tokens(f"{s.description} {s.success_criteria}") for s in self.steps}
+        self._expected = {s.step_number: _failure_words(f"{s.description} {s.success_criteria}") for s in self.steps}
+        self.current = self.steps[0].step_number if self.steps else 0
+        self.abort_after = abort_after
+        self.failures = 0
+        self.abort_reason: str | None = None
+
+    def _match(self, text: str) -> int:
+        numbers = [s.step_number for s in self.steps]
+        ref = _STEP_REF.search(text)
+        if ref and int(ref.group(1)) in numbers:
+            return max(self.current, int(ref.group(1)))
+
+        words = _tokens(text)
+        best, best_score = self.current, len(words & self._tokens.get(self.current, set()))
+        for number in numbers:
+            if number <= self.current:
+                continue
+            score = len(words & self._tokens[number])
+            if score >= 2 and score > best_score:
+                best, best_score = number, score
+        return best
+
+    def observe(self, event: dict) -> tuple[int, bool]:
+        """Attribute a STEP event; returns (plan step number, looks failing)."""
+        text = " ".join(str(event.get(k) or "") for k in ("purpose", "message", "action"))
+        text = _URL.sub(" ", text)
+        step_number = self._match(text)
+        if step_number != self.current:
+            self.current = step_number
+            self.failures = 0
+
+        failing = bool(_failure_words(text) - self._expected.get(self.current, set()))
+        self.failures = self.failures + 1 if failing else 0
+        if failing and self.abort_after and self.failures >= self.abort_after and not self.abort_reason:
+            self.abort_reason = f"step {self.current} failing ({self.failures} consecutive errors): {event.get('message', '')[:200]}"
+        return self.current, failing
@@ -0,0 +1,122 @@
+import os
+import re
+import time
+import random
+import asyncio
+from typing import Any, Awaitable, Callable
+
+import httpx
+from pydantic_ai.exceptions import ModelAPIError, ModelHTTPError
+
+# Attempts per stage (1 = never retry), and the backoff before attempt n+1:
+# a random delay up to min(RETRY_MAX_DELAY, RETRY_BASE_DELAY * 2**n).
+RETRY_MAX_ATTEMPTS = int(os.environ.get("RETRY_MAX_ATTEMPTS", "3"))
+RETRY_BASE_DELAY = float(os.environ.get("RETRY_BASE_DELAY", "2"))
+RETRY_MAX_DELAY = float(os.environ.get("RETRY_MAX_DELAY", "30"))
+# A retry is only started if at least this much of the stage budget would be
+# left after the backoff; otherwise the last failure stands.
+RETRY_MIN_ATTEMPT_SECONDS = float(os.environ.get("RETRY_MIN_ATTEMPT_SECONDS", "20"))
+
+TRANSIENT_STATUS = {408, 425, 429, 500, 502, 503, 504, 529}
+_TINYFISH_HTTP = re.compile(r"^TinyFish HTTP (\d{3})\b")
+_TINYFISH_TRANSIENT = ("TinyFish stream ended without a COMPLETE event",)
+
+
+def transient_error(error: BaseException) -> str | None:
+    """Why an exception is worth retrying (network trouble, overload), or None."""
+    if isinstance(error, ModelHTTPError):
+        return f"model HTTP {error.status_code}" if error.status_code in TRANSIENT_STATUS else None
+    if isinstance(error, ModelAPIError):
+        return "model connection error"
+    if isinstance(error, httpx.TransportError):
+        return type(error).__name__
+    return None
+
+
+def transient_tinyfish(result: dict) -> str | None:
+    """Why a failed TinyFish result looks like an infrastructure hiccup, or None.
+
+    ERROR events and early aborts describe the site under test, so they are
+    real failures; a 5xx/429 or a stream cut off before COMPLETE is not.
+    """
+    error = result.get("error") or ""
+    if result.get("success") or result.get("aborted") or not error:
+        return None
+    status = _TINYFISH_HTTP.match(error)
+    if status:
+        return f"TinyFish HTTP {status.group(1)}" if int(status.group(1)) in TRANSIENT_STATUS else None
+    return error if error.startswith(_TINYFISH_TRANSIENT) else None
+
+
+def backoff(attempt: int) -> float:
+    """Full-jitter exponential backoff before retry number `attempt` (1-based)."""
+    return random.uniform(0, min(RETRY_MAX_DELAY, RETRY_BASE_DELAY * 2 ** (attempt - 1)))
+
+
+class RetryLog:
+    """Attempts of one stage: how many, why they failed, what they cost."""
+
+    def __init__(self, stage: str):
+        self.stage = stage
+        self.attempts = 0
+        self.errors: list[str] = []
+        self.wait_ms = 0
+        self.failed_ms = 0
+
+    @property
+    def retries(self) -> int:
+        return max(0, self.attempts - 1)
+
+    def summary(self) -> dict:
+        # overhead = time spent in failed attempts plus backoff sleeps
+        return {
+            "attempts": self.attempts,
+            "errors": self.errors,
+            "wait_ms": self.wait_ms,
+            "overhead_ms": self.wait_ms + self.failed_ms,
+        }
+
+
+async def with_retries(
+    log: RetryLog,
+    call: Callable[[int], Awaitable[Any]],
+    deadline: float | None = None,
+    check_result: Callable[[Any], str | None] | None = None,
+    on_retry: Callable[[str, int, str, float], Awaitable[None]] | None = None,
+) -> Any:
+    """Call `call(attempt)` until it succeeds, fails for real, or retries run out.
+
+    Exceptions are classified by `transient_error`, returned values by
+    `check_result`. `deadline` (time.monotonic()) bounds the retries: one is
+    skipped when its backoff would leave under RETRY_MIN_ATTEMPT_SECONDS.
+    The last outcome is returned or raised as-is.
+    """
+    while True:
+        log.attempts += 1
+        started = time.monotonic()
+        try:
+            result = await call(log.attempts - 1)
+            reason = check_result(result) if check_result else None
+            error = None
+        except Exception as e:
+            reason = transient_error(e)
+            if reason is None:
+                raise
+            error = e
+        if reason is None:
+            return result
+
+        log.errors.append(reason)
+        delay = backoff(log.attempts)
+        left = deadline - time.monotonic() if deadline is not None else float("inf")
+        if log.attempts >= RETRY_MAX_ATTEMPTS or left - delay < RETRY_MIN_ATTEMPT_SECONDS:
+            if error:
+                raise error
+            return result
+
+        log.failed_ms += int((time.monotonic() - started) * 1000)
+        print(f"[Retry] {log.stage} attempt {log.attempts} failed ({reason}), retrying in {delay:.1f}s")
+        if on_retry:
+            await on_retry(log.stage, log.attempts, reason, delay)
+        await asyncio.sleep(delay)
+        log.wait_ms += int(delay * 1000)
@@ -1,6 +1,6 @@
 from fastapi import APIRouter, Request
 from fastapi.responses import JSONResponse
-from services.config import get_redis
+from services.config import get_async_redis
 from datetime import datetime, timezone
 
 router = APIRouter(prefix="/api/auth", tags=["auth"])
@@ -21,8 +21,8 @@ async def sync_user(request: Request):
             content={"error": "userId and email are required"}, status_code=400
         )
 
-    redis = get_redis()
-    redis.hset(
+    redis = get_async_redis()
+    await redis.hset(
         f"user:{user_id}",
         values={
             "userId": user_id,
@@ -32,6 +32,6 @@ async def sync_user(request: Request):
             "lastSync": datetime.now(timezone.utc).isoformat(),
         },
     )
-    redis.sadd("users:all", user_id)
+    await redis.sadd("users:all", user_id)
 
     return {"status": "synced", "userId": user_id}
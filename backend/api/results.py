@@ -1,43 +1,35 @@
 import json
+import time
 import asyncio
 from datetime import datetime, timezone
 from fastapi import APIRouter, Query, Request
 from fastapi.responses import JSONResponse, StreamingResponse
 
-from services.config import get_redis
-from services.test_suite import list_test_suites
+from services.config import get_async_redis
+from services.result_store import get_run, load_runs
+from services.uptime import get_uptime_counts
+from services.dashboard import get_dashboard_summary, get_load_forecast
+from services.event_bus import event_bus, fields_to_dict, stream_id_key
 
 router = APIRouter(prefix="/api", tags=["results"])
 
 
 @router.get("/tests/{test_id}/results/{run_id}")
 async def get_run_detail(test_id: str, run_id: str):
-    redis = get_redis()
-    all_results = redis.zrevrange(f"results:{test_id}", 0, -1)
-    for raw in all_results:
-        try:
-            record = json.loads(raw)
-            if record.get("run_id") == run_id:
-                return record
-        except json.JSONDecodeError:
-            continue
-    return JSONResponse(content={"error": "Run not found"}, status_code=404)
+    record = await get_run(test_id, run_id)
+    if record is None:
+        return JSONResponse(content={"error": "Run not found"}, status_code=404)
+    return record
 
 
 @router.get("/tests/{test_id}/results")
 async def get_results(test_id: str, limit: int = Query(20, ge=1, le=100), offset: int = Query(0, ge=0)):
-    redis = get_redis()
+    redis = get_async_redis()
 
-    total = redis.zcard(f"results:{test_id}")
+    total = await redis.zcard(f"results:{test_id}")
 
-    raw_results = redis.zrevrange(f"results:{test_id}", offset, offset + limit - 1)
-
-    results = []
-    for raw in raw_results:
-        try:
-            results.append(json.loads(raw))
-        except json.JSONDecodeError:
-            continue
+    members = await redis.zrevrange(f"results:{test_id}", offset, offset + limit - 1)
+    results = await load_runs(test_id, members)
 
     return {
         "test_id": test_id,
@@ -50,11 +42,11 @@ async def get_results(test_id: str, limit: int = Query(20, ge=1, le=100), offset
 
 @router.get("/tests/{test_id}/timing")
 async def get_timing(test_id: str, limit: int = Query(50, ge=1, le=200)):
-    redis = get_redis()
+    redis = get_async_redis()
 
-    total = redis.zcard(f"timing:{test_id}")
+    total = await redis.zcard(f"timing:{test_id}")
 
-    raw_entries = redis.zrevrange(f"timing:{test_id}", 0, limit - 1, withscores=True)
+    raw_entries = await redis.zrevrange(f"timing:{test_id}", 0, limit - 1, withscores=True)
 
     timing = []
     for member, score in raw_entries:
@@ -81,23 +73,7 @@ async def get_timing(test_id: str, limit: int = Query(50, ge=1, le=200)):
 
 @router.get("/tests/{test_id}/uptime")
 async def get_uptime(test_id: str, hours: int = Query(24, ge=1, le=720)):
-    redis = get_redis()
-
-    now = datetime.now(timezone.utc)
-    min_timestamp = now.timestamp() - (hours * 3600)
-
-    raw_results = redis.zrangebyscore(f"results:{test_id}", min_timestamp, "+inf")
-
-    total_runs = 0
-    passed_runs = 0
-    for raw in raw_results:
-        try:
-            record = json.loads(raw)
-            total_runs += 1
-            if record.get("passed"):
-                passed_runs += 1
-        except json.JSONDecodeError:
-            continue
+    total_runs, passed_runs = await get_uptime_counts(test_id, hours)
 
     failed_runs = total_runs - passed_runs
     uptime_pct = round((passed_runs / total_runs) * 100, 1) if total_runs > 0 else 100.0
@@ -114,11 +90,11 @@ async def get_uptime(test_id: str, hours: int = Query(24, ge=1, le=720)):
 
 @router.get("/tests/{test_id}/incidents")
 async def get_incidents(test_id: str, limit: int = Query(10, ge=1, le=50)):
-    redis = get_redis()
+    redis = get_async_redis()
 
-    total = redis.llen(f"incidents:{test_id}")
+    total = await redis.llen(f"incidents:{test_id}")
 
-    raw_incidents = redis.lrange(f"incidents:{test_id}", 0, limit - 1)
+    raw_incidents = await redis.lrange(f"incidents:{test_id}", 0, limit - 1)
 
     incidents = []
     for raw in raw_incidents:
@@ -136,135 +112,55 @@ async def get_incidents(test_id: str, limit: int = Query(10, ge=1, le=50)):
 
 @router.get("/dashboard")
 async def get_dashboard():
-    tests = list_test_suites()
-
-    total_tests = len(tests)
-    active_tests = sum(1 for t in tests if t.get("status") == "active")
-    paused_tests = sum(1 for t in tests if t.get("status") == "paused")
-    passing = sum(1 for t in tests if t.get("last_result") == "passed")
-    failing = sum(1 for t in tests if t.get("last_result") == "failed")
-    pending = sum(1 for t in tests if t.get("last_result") in ("pending", "", None))
-
-    sorted_tests = sorted(
-        [t for t in tests if t.get("last_run_at")],
-        key=lambda t: t["last_run_at"],
-        reverse=True,
-    )
-
-    redis = get_redis()
-    recent_runs = []
-    for t in sorted_tests[:5]:
-        run_info = {
-            "test_id": t.get("id"),
-            "test_name": t.get("name"),
-            "test_url": t.get("url"),
-            "last_result": t.get("last_result"),
-            "last_run_at": t.get("last_run_at"),
-            "steps_passed": None,
-            "steps_total": None,
-            "duration_ms": None,
-            "triggered_by": None,
-        }
-        latest = redis.zrevrange(f"results:{t.get('id')}", 0, 0)
-        if latest:
-            try:
-                record = json.loads(latest[0])
-                run_info["steps_passed"] = record.get("steps_passed")
-                run_info["steps_total"] = record.get("steps_total")
-                run_info["duration_ms"] = record.get("duration_ms")
-                run_info["triggered_by"] = record.get("triggered_by")
-            except json.JSONDecodeError:
-                pass
-        recent_runs.append(run_info)
-
-    last_run_at_global = sorted_tests[0]["last_run_at"] if sorted_tests else None
-
-    CRON_INTERVAL_MINUTES = {
-        "*/5 * * * *": 5,
-        "*/15 * * * *": 15,
-        "*/30 * * * *": 30,
-        "0 * * * *": 60,
-        "0 */6 * * *": 360,
-        "0 */12 * * *": 720,
-        "0 9 * * *": 1440,
-    }
+    return await get_dashboard_summary()
 
-    next_run_approx_minutes = None
-    active_scheduled = [t for t in tests if t.get("status") == "active" and t.get("schedule")]
-    if active_scheduled and last_run_at_global:
-        shortest_interval = min(
-            CRON_INTERVAL_MINUTES.get(t["schedule"], 15) for t in active_scheduled
-        )
-        try:
-            last_run_dt = datetime.fromisoformat(last_run_at_global)
-            minutes_since = (datetime.now(timezone.utc) - last_run_dt).total_seconds() / 60
-            next_run_approx_minutes = max(0, int(shortest_interval - minutes_since))
-        except (ValueError, TypeError):
-            next_run_approx_minutes = None
 
-    return {
-        "total_tests": total_tests,
-        "active_tests": active_tests,
-        "paused_tests": paused_tests,
-        "passing": passing,
-        "failing": failing,
-        "pending": pending,
-        "recent_runs": recent_runs,
-        "last_run_at_global": last_run_at_global,
-        "next_run_approx_minutes": next_run_approx_minutes,
-    }
+@router.get("/dashboard/forecast")
+async def get_dashboard_forecast(minutes: int = Query(60, ge=1, le=1440)):
+    return await get_load_forecast(minutes)
 
 
 @router.get("/tests/{test_id}/live")
 async def get_live_events(test_id: str, request: Request):
     async def event_stream():
-        redis = get_redis()
+        redis = get_async_redis()
 
         resume_id = request.headers.get("last-event-id", "")
         last_id = resume_id if resume_id else "0-0"
 
-        if resume_id:
-            existing = redis.xrange(f"events:{test_id}", f"({resume_id}", "+", count=50)
-        else:
-            existing = redis.xrange(f"events:{test_id}", "-", "+", count=50)
-
-        def fields_to_dict(fields):
-            if isinstance(fields, dict):
-                return fields
-            d = {}
-            for i in range(0, len(fields) - 1, 2):
-                d[fields[i]] = fields[i + 1]
-            return d
-
-        for entry in existing:
-            entry_id, fields = entry[0], entry[1]
-            data = json.dumps(fields_to_dict(fields))
-            yield f"id: {entry_id}\ndata: {data}\n\n"
-            last_id = entry_id
-
-        idle_seconds = 0
-        max_idle = 300
-        keepalive_interval = 15
-
-        while idle_seconds < max_idle:
-            if await request.is_disconnected():
-                break
-
-            new_entries = redis.xrange(f"events:{test_id}", f"({last_id}", "+", count=20)
-
-            if new_entries:
-                idle_seconds = 0
-                for entry in new_entries:
-                    entry_id, fields = entry[0], entry[1]
-                    data = json.dumps(fields_to_dict(fields))
-                    yield f"id: {entry_id}\ndata: {data}\n\n"
-                    last_id = entry_id
+        # Subscribe before reading the backlog so nothing written in between is
+        # missed; anything delivered twice is skipped by id below.
+        async with event_bus.subscribe(test_id, last_id) as queue:
+            if resume_id:
+                existing = await redis.xrange(f"events:{test_id}", f"({resume_id}", "+", count=50)
             else:
-                idle_seconds += 1
-                if idle_seconds % keepalive_interval == 0:
+                existing = await redis.xrange(f"events:{test_id}", "-", "+", count=50)
+
+            for entry in existing:
+                entry_id, fields = entry[0], entry[1]
+                data = json.dumps(fields_to_dict(fields))
+                yield f"id: {entry_id}\ndata: {data}\n\n"
+                last_id = entry_id
+            backlog_end = stream_id_key(last_id)
+
+            max_idle = 300
+            keepalive_interval = 15
+            idle_since = time.monotonic()
+
+            while time.monotonic() - idle_since < max_idle:
+                if await request.is_disconnected():
+                    break
+
+                try:
+                    entry_id, fields = await asyncio.wait_for(queue.get(), timeout=keepalive_interval)
+                except asyncio.TimeoutError:
                     yield ":\n\n"
+                    continue
 
-            await asyncio.sleep(1)
+                if stream_id_key(entry_id) <= backlog_end:
+                    continue
+                idle_since = time.monotonic()
+                yield f"id: {entry_id}\ndata: {json.dumps(fields)}\n\n"
 
     return StreamingResponse(
         event_stream(),
@@ -1,40 +1,134 @@
-from fastapi import APIRouter, Request
-from fastapi.responses import JSONResponse
-from models import CreateTestSuite, UpdateTestSuite
+import json
+from datetime import datetime, timedelta, timezone
+from fastapi import APIRouter, Query, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+from models import BulkOperation, CreateTestSuite, UpdateTestSuite
 from services.test_suite import (
+    BULK_MAX_ITEMS,
     create_test_suite,
     list_test_suites,
+    count_test_suites,
     get_test_suite,
     update_test_suite,
     delete_test_suite,
+    bulk_apply,
+    export_test_suites,
 )
 
 router = APIRouter(prefix="/api/tests", tags=["tests"])
 
 
+def _with_next_run(tests: list[dict]) -> list[dict]:
+    """Add `next_run_at` (UTC ISO time, None when paused or unparseable) to each suite.
+
+    Uses the staggered cron and delivery delay QStash was given, if any.
+    """
+    from services.cron import next_fires
+
+    crons = {t.get("id"): t.get("schedule_cron") or t.get("schedule") for t in tests}
+    fires = next_fires([c for c in crons.values() if c], datetime.now(timezone.utc))
+    for t in tests:
+        fire = fires.get(crons[t.get("id")]) if t.get("status") == "active" else None
+        if fire:
+            fire += timedelta(seconds=int(t.get("schedule_delay") or 0))
+        t["next_run_at"] = fire.isoformat() if fire else None
+    return tests
+
+
 @router.post("")
 async def create_test(request: Request):
     try:
         body = await request.json()
         data = CreateTestSuite(**body)
-        test = create_test_suite(data.model_dump())
+        test = await create_test_suite(data.model_dump())
         return test
     except Exception as e:
         return JSONResponse(content={"error": str(e)[:300]}, status_code=400)
 
 
 @router.get("")
-async def list_tests():
-    tests = list_test_suites()
-    return {"tests": tests, "total": len(tests)}
+async def list_tests(
+    limit: int | None = Query(None, ge=1, le=500),
+    offset: int = Query(0, ge=0),
+    order: str = Query("desc", pattern="^(asc|desc)$"),
+):
+    tests = await list_test_suites(limit=limit, offset=offset, newest_first=order == "desc")
+    total = await count_test_suites() if limit is not None or offset else len(tests)
+    return {"tests": _with_next_run(tests), "total": total, "limit": limit, "offset": offset}
+
+
+def _bulk_operation(item) -> dict:
+    """Validate one bulk item; a bare suite (no "op", e.g. an export line) is a create, its id ignored."""
+    if not isinstance(item, dict):
+        raise ValueError("Each operation must be a JSON object")
+    op = BulkOperation(**item) if "op" in item else BulkOperation(op="create", data=item)
+    if op.op == "create":
+        return {"op": "create", "data": CreateTestSuite(**op.data).model_dump()}
+    if not op.id:
+        raise ValueError(f"id is required for {op.op}")
+    if op.op == "update":
+        return {"op": "update", "id": op.id, "data": UpdateTestSuite(**op.data).model_dump(exclude_unset=True)}
+    return {"op": "delete", "id": op.id}
+
+
+@router.post("/bulk")
+async def bulk_tests(request: Request):
+    """Create, update and delete up to BULK_MAX_ITEMS suites in one request.
+
+    The body is {"operations": [...]} or NDJSON with one operation per
+    line, so the output of /api/tests/export can be posted to another
+    instance as-is. Its lines are creates: they always make new suites
+    with new IDs, so importing into the source instance duplicates them.
+    Every item gets a result; invalid items fail without blocking the rest.
+    """
+    body = await request.body()
+    try:
+        if "ndjson" in request.headers.get("content-type", ""):
+            items = [json.loads(line) for line in body.splitlines() if line.strip()]
+        else:
+            items = json.loads(body)["operations"]
+    except Exception:
+        return JSONResponse(content={"error": 'Body must be {"operations": [...]} or NDJSON with one operation per line'}, status_code=400)
+    if not isinstance(items, list) or not items:
+        return JSONResponse(content={"error": "No operations given"}, status_code=400)
+    if len(items) > BULK_MAX_ITEMS:
+        return JSONResponse(content={"error": f"At most {BULK_MAX_ITEMS} operations per request, got {len(items)}"}, status_code=400)
+
+    results: list[dict | None] = [None] * len(items)
+    valid = []
+    for i, item in enumerate(items):
+        try:
+            valid.append((i, _bulk_operation(item)))
+        except Exception as e:
+            item = item if isinstance(item, dict) else {}
+            results[i] = {"op": item.get("op", "create"), "id": item.get("id") if "op" in item else None, "ok": False, "error": str(e)[:300]}
+
+    for (i, _), result in zip(valid, await bulk_apply([op for _, op in valid])):
+        results[i] = result
+    succeeded = sum(1 for r in results if r["ok"])
+    return {
+        "results": [{"index": i, **r} for i, r in enumerate(results)],
+        "succeeded": succeeded,
+        "failed": len(results) - succeeded,
+    }
+
+
+@router.get("/export")
+async def export_tests():
+    """Every suite as NDJSON, streamed page by page; POST it to another instance's /api/tests/bulk to import."""
+    return StreamingResponse(
+        export_test_suites(),
+        media_type="application/x-ndjson",
+        headers={"Content-Disposition": 'attachment; filename="housecat-tests.ndjson"'},
+    )
 
 
 @router.get("/{test_id}")
 async def get_test(test_id: str):
-    test = get_test_suite(test_id)
+    test = await get_test_suite(test_id)
     if not test:
         return JSONResponse(content={"error": "Test not found"}, status_code=404)
-    return test
+    return _with_next_run([test])[0]
 
 
 @router.put("/{test_id}")
@@ -42,7 +136,7 @@ async def update_test(test_id: str, request: Request):
     try:
         body = await request.json()
         data = UpdateTestSuite(**body)
-        test = update_test_suite(test_id, data.model_dump(exclude_unset=True))
+        test = await update_test_suite(test_id, data.model_dump(exclude_unset=True))
         if not test:
             return JSONResponse(content={"error": "Test not found"}, status_code=404)
         return test
@@ -52,7 +146,7 @@ async def update_test(test_id: str, request: Request):
 
 @router.delete("/{test_id}")
 async def delete_test(test_id: str):
-    deleted = delete_test_suite(test_id)
+    deleted = await delete_test_suite(test_id)
     if not deleted:
         return JSONResponse(content={"error": "Test not found"}, status_code=404)
     return {"status": "deleted", "id": test_id}
@@ -63,11 +157,16 @@ async def run_test_now(test_id: str):
     from agents.pipeline import run_test
     from services.result_store import store_run_result
     from services.alert import send_alert_webhook
+    from services.job_queue import run_queue, RunJob
 
-    test = get_test_suite(test_id)
+    test = await get_test_suite(test_id)
     if not test:
         return JSONResponse(content={"error": "Test not found"}, status_code=404)
 
+    # Same lock as queued runs, so a manual run never overlaps a scheduled one.
+    if not await run_queue.claim(RunJob(test_id=test_id, triggered_by="manual")):
+        return JSONResponse(content={"error": "A run of this test is already in progress"}, status_code=409)
+
     try:
         plan, browser_result, final_result = await run_test(
             url=test["url"],
@@ -75,7 +174,7 @@ async def run_test_now(test_id: str):
             test_id=test_id,
         )
 
-        run_record = store_run_result(
+        run_record = await store_run_result(
             test_id=test_id,
             final_result=final_result,
             plan=plan,
@@ -94,3 +193,5 @@ async def run_test_now(test_id: str):
         }
     except Exception as e:
         return JSONResponse(content={"error": f"Pipeline failed: {str(e)[:300]}"}, status_code=500)
+    finally:
+        await run_queue.release(test_id)
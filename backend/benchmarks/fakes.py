@@ -0,0 +1,371 @@
+"""In-memory stand-ins for Upstash Redis used by the offline benchmarks.
+
+Only the commands HouseCat actually issues are implemented, with the same
+argument names and return shapes as `upstash_redis`. An optional per-call
+latency simulates the REST round trip to Upstash.
+"""
+import asyncio
+import bisect
+import fnmatch
+import time
+
+
+class InMemoryRedis:
+    def __init__(self):
+        self._data: dict = {}
+        self._stream_seq = 0
+        self.calls = 0
+
+    # ── keys ────────────────────────────────────────────────────────────
+    def delete(self, *keys: str) -> int:
+        return sum(1 for k in keys if self._data.pop(k, None) is not None)
+
+    def exists(self, *keys: str) -> int:
+        return sum(1 for k in keys if k in self._data)
+
+    def expire(self, key: str, seconds, **_kwargs) -> int:
+        return 1 if key in self._data else 0
+
+    def keys(self, pattern: str) -> list[str]:
+        return [k for k in self._data if fnmatch.fnmatchcase(k, pattern)]
+
+    # ── strings ─────────────────────────────────────────────────────────
+    def get(self, key: str):
+        return self._data.get(key)
+
+    def set(self, key: str, value, nx: bool | None = None, ex: int | None = None, **_kwargs):
+        if nx and key in self._data:
+            return None
+        self._data[key] = str(value)
+        return "OK"
+
+    def mget(self, *keys: str) -> list:
+        return [self._data.get(k) for k in keys]
+
+    def incrby(self, key: str, increment: int) -> int:
+        value = int(self._data.get(key, 0)) + increment
+        self._data[key] = str(value)
+        return value
+
+    def decr(self, key: str) -> int:
+        return self.incrby(key, -1)
+
+    def incr(self, key: str) -> int:
+        return self.incrby(key, 1)
+
+    # ── hashes ──────────────────────────────────────────────────────────
+    def hset(self, key: str, field: str | None = None, value=None, values: dict | None = None) -> int:
+        h = self._data.setdefault(key, {})
+        items = dict(values or {})
+        if field is not None:
+            items[field] = value
+        added = sum(1 for f in items if f not in h)
+        h.update({f: str(v) for f, v in items.items()})
+        return added
+
+    def hsetnx(self, key: str, field: str, value) -> int:
+        h = self._data.setdefault(key, {})
+        if field in h:
+            return 0
+        h[field] = str(value)
+        return 1
+
+    def hget(self, key: str, field: str):
+        return self._data.get(key, {}).get(field)
+
+    def hgetall(self, key: str) -> dict:
+        return dict(self._data.get(key, {}))
+
+    def hmget(self, key: str, *fields: str) -> list:
+        h = self._data.get(key, {})
+        return [h.get(f) for f in fields]
+
+    def hincrby(self, key: str, field: str, increment: int) -> int:
+        h = self._data.setdefault(key, {})
+        value = int(h.get(field, 0)) + increment
+        h[field] = str(value)
+        return value
+
+    def hkeys(self, key: str) -> list[str]:
+        return list(self._data.get(key, {}))
+
+    def hdel(self, key: str, *fields: str) -> int:
+        h = self._data.get(key, {})
+        return sum(1 for f in fields if h.pop(f, None) is not None)
+
+    # ── sets ────────────────────────────────────────────────────────────
+    def sadd(self, key: str, *members: str) -> int:
+        s = self._data.setdefault(key, set())
+        before = len(s)
+        s.update(members)
+        return len(s) - before
+
+    def srem(self, key: str, *members: str) -> int:
+        s = self._data.get(key, set())
+        before = len(s)
+        s.difference_update(members)
+        return before - len(s)
+
+    def smembers(self, key: str) -> list[str]:
+        return list(self._data.get(key, set()))
+
+    def scard(self, key: str) -> int:
+        return len(self._data.get(key, set()))
+
+    # ── sorted sets ─────────────────────────────────────────────────────
+    def _zset(self, key: str) -> dict:
+        return self._data.setdefault(key, {})
+
+    def _zsorted(self, key: str) -> list[tuple[str, float]]:
+        return sorted(self._data.get(key, {}).items(), key=lambda kv: (kv[1], kv[0]))
+
+    def zadd(self, key: str, scores: dict, nx: bool = False, **_kwargs) -> int:
+        z = self._zset(key)
+        added = 0
+        for member, score in scores.items():
+            if member not in z:
+                added += 1
+            elif nx:
+                continue
+            z[member] = float(score)
+        return added
+
+    def zrem(self, key: str, *members: str) -> int:
+        z = self._data.get(key, {})
+        return sum(1 for m in members if z.pop(m, None) is not None)
+
+    def zcard(self, key: str) -> int:
+        return len(self._data.get(key, {}))
+
+    def zrank(self, key: str, member: str):
+        for rank, (m, _score) in enumerate(self._zsorted(key)):
+            if m == member:
+                return rank
+        return None
+
+    def zscore(self, key: str, member: str):
+        return self._data.get(key, {}).get(member)
+
+    @staticmethod
+    def _slice(items: list, start: int, stop: int) -> list:
+        n = len(items)
+        start = max(n + start, 0) if start < 0 else start
+        stop = n + stop if stop < 0 else stop
+        return items[start:stop + 1]
+
+    @staticmethod
+    def _with_scores(items: list, withscores: bool) -> list:
+        return [(m, s) for m, s in items] if withscores else [m for m, _ in items]
+
+    def zrange(self, key: str, start: int, stop: int, withscores: bool = False, rev: bool = False, **_kwargs) -> list:
+        items = self._zsorted(key)
+        if rev:
+            items.reverse()
+        return self._with_scores(self._slice(items, start, stop), withscores)
+
+    def zrevrange(self, key: str, start: int, stop: int, withscores: bool = False) -> list:
+        return self.zrange(key, start, stop, withscores=withscores, rev=True)
+
+    @staticmethod
+    def _bound(value, default: float) -> tuple[float, bool]:
+        if value in ("-inf", "+inf", "inf"):
+            return (float(value), False)
+        if isinstance(value, str) and value.startswith("("):
+            return (float(value[1:]), True)
+        return (float(value) if value is not None else default, False)
+
+    def _in_range(self, score: float, lo, hi) -> bool:
+        lo_v, lo_ex = self._bound(lo, float("-inf"))
+        hi_v, hi_ex = self._bound(hi, float("inf"))
+        above = score > lo_v if lo_ex else score >= lo_v
+        below = score < hi_v if hi_ex else score <= hi_v
+        return above and below
+
+    def zrangebyscore(self, key: str, min, max, withscores: bool = False, offset: int | None = None, count: int | None = None) -> list:
+        items = [(m, s) for m, s in self._zsorted(key) if self._in_range(s, min, max)]
+        if offset is not None and count is not None:
+            items = items[offset:offset + count]
+        return self._with_scores(items, withscores)
+
+    def zcount(self, key: str, min, max) -> int:
+        return len(self.zrangebyscore(key, min, max))
+
+    def zremrangebyscore(self, key: str, min, max) -> int:
+        z = self._data.get(key, {})
+        doomed = [m for m, s in z.items() if self._in_range(s, min, max)]
+        for m in doomed:
+            del z[m]
+        return len(doomed)
+
+    def zremrangebyrank(self, key: str, start: int, stop: int) -> int:
+        doomed = self._slice(self._zsorted(key), start, stop)
+        z = self._data.get(key, {})
+        for m, _ in doomed:
+            del z[m]
+        return len(doomed)
+
+    # ── lists ───────────────────────────────────────────────────────────
+    def lpush(self, key: str, *elements: str) -> int:
+        lst = self._data.setdefault(key, [])
+        for e in elements:
+            lst.insert(0, e)
+        return len(lst)
+
+    def rpush(self, key: str, *elements: str) -> int:
+        lst = self._data.setdefault(key, [])
+        lst.extend(elements)
+        return len(lst)
+
+    def lrange(self, key: str, start: int, stop: int) -> list:
+        return self._slice(self._data.get(key, []), start, stop)
+
+    def llen(self, key: str) -> int:
+        return len(self._data.get(key, []))
+
+    def lset(self, key: str, index: int, element: str) -> str:
+        self._data[key][index] = element
+        return "OK"
+
+    def ltrim(self, key: str, start: int, stop: int) -> str:
+        if key in self._data:
+            self._data[key] = self._slice(self._data[key], start, stop)
+        return "OK"
+
+    # ── streams ─────────────────────────────────────────────────────────
+    def xadd(self, key: str, id: str, data: dict, maxlen: int | None = None, **_kwargs) -> str:
+        stream = self._data.setdefault(key, [])
+        self._stream_seq += 1
+        entry_id = f"{int(time.time() * 1000)}-{self._stream_seq}"
+        flat = []
+        for k, v in data.items():
+            flat.extend([k, str(v)])
+        stream.append([entry_id, flat])
+        if maxlen is not None and len(stream) > maxlen:
+            del stream[: len(stream) - maxlen]
+        return entry_id
+
+    @staticmethod
+    def _id_key(entry_id: str) -> tuple[int, int]:
+        ms, _, seq = entry_id.partition("-")
+        return (int(ms), int(seq or 0))
+
+    def xrange(self, key: str, start: str = "-", end: str = "+", count: int | None = None) -> list:
+        stream = self._data.get(key, [])
+        keys = [self._id_key(e[0]) for e in stream]
+        if start == "-":
+            lo = 0
+        elif start.startswith("("):
+            lo = bisect.bisect_right(keys, self._id_key(start[1:]))
+        else:
+            lo = bisect.bisect_left(keys, self._id_key(start))
+        hi = len(stream) if end == "+" else bisect.bisect_right(keys, self._id_key(end))
+        entries = stream[lo:hi]
+        return entries[:count] if count else entries
+
+    def xread(self, streams: dict, count: int | None = None) -> list:
+        result = []
+        for key, last_id in streams.items():
+            entries = self.xrange(key, f"({last_id}", "+", count=count)
+            if entries:
+                result.append([key, entries])
+        return result
+
+    def xlen(self, key: str) -> int:
+        return len(self._data.get(key, []))
+
+    def xtrim(self, key: str, maxlen: int | None = None, **_kwargs) -> int:
+        stream = self._data.get(key, [])
+        if maxlen is None or len(stream) <= maxlen:
+            return 0
+        removed = len(stream) - maxlen
+        del stream[:removed]
+        return removed
+
+
+class _SyncPipeline:
+    def __init__(self, client: "FakeRedis"):
+        self._client = client
+        self._stack: list = []
+
+    def __getattr__(self, name: str):
+        def queue(*args, **kwargs):
+            self._stack.append((name, args, kwargs))
+            return self
+        return queue
+
+    def exec(self) -> list:
+        self._client._wait()
+        stack, self._stack = self._stack, []
+        return [getattr(self._client.store, n)(*a, **kw) for n, a, kw in stack]
+
+
+class _AsyncPipeline(_SyncPipeline):
+    async def exec(self) -> list:
+        await self._client._await()
+        stack, self._stack = self._stack, []
+        return [getattr(self._client.store, n)(*a, **kw) for n, a, kw in stack]
+
+
+class FakeRedis:
+    """Blocking facade: each command sleeps `latency` seconds like a REST call."""
+
+    def __init__(self, store: InMemoryRedis, latency: float = 0.0):
+        self.store = store
+        self.latency = latency
+
+    def _wait(self) -> None:
+        self.store.calls += 1
+        if self.latency:
+            time.sleep(self.latency)
+
+    def pipeline(self) -> _SyncPipeline:
+        return _SyncPipeline(self)
+
+    def close(self) -> None:
+        pass
+
+    def __getattr__(self, name: str):
+        command = getattr(self.store, name)
+
+        def call(*args, **kwargs):
+            self._wait()
+            return command(*args, **kwargs)
+        return call
+
+
+class FakeAsyncRedis:
+    """Async facade: each command awaits `latency` seconds like a REST call."""
+
+    def __init__(self, store: InMemoryRedis, latency: float = 0.0):
+        self.store = store
+        self.latency = latency
+
+    async def _await(self) -> None:
+        self.store.calls += 1
+        if self.latency:
+            await asyncio.sleep(self.latency)
+
+    def pipeline(self) -> _AsyncPipeline:
+        return _AsyncPipeline(self)
+
+    async def close(self) -> None:
+        pass
+
+    def __getattr__(self, name: str):
+        command = getattr(self.store, name)
+
+        async def call(*args, **kwargs):
+            await self._await()
+            return command(*args, **kwargs)
+        return call
+
+
+def install(store: InMemoryRedis, latency: float = 0.0) -> None:
+    """Point services.config's shared clients at the in-memory store.
+
+    Must be called from inside the event loop that will issue the commands.
+    """
+    from services import config
+
+    config._redis = FakeRedis(store, latency)
+    config._async_redis[asyncio.get_running_loop()] = FakeAsyncRedis(store, latency)
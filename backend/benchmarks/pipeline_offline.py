@@ -0,0 +1,328 @@
+"""End-to-end pipeline benchmark with every upstream replaced by a local stand-in.
+
+- TinyFish: recorded SSE streams (fixtures/tinyfish/) replayed by a local
+  HTTP server, so `call_tinyfish` does its real streaming and parsing
+- Anthropic: planner and evaluator agents overridden with stub models
+- Upstash: the in-memory store from benchmarks.fakes
+
+Measures, per commit:
+- `run_test` latency and Redis commands per run (pass / fail / error / abort mix)
+- `store_run_result` cost and Redis commands per stored run
+- API throughput for the dashboard, test list and run history endpoints
+- memory per run (tracemalloc peak and retained bytes), measured with the
+  command counts on sequential runs so concurrent runs do not interleave
+
+Each run is compared with the latest entry of a different commit in the
+history file; metrics that got worse by more than the threshold are
+reported as regressions (exit code 1 with --check). --save appends this
+run to the history.
+
+Usage (from backend/):
+    python -m benchmarks.pipeline_offline [--runs 60] [--concurrency 10] [--save] [--check]
+"""
+import os
+
+# Before any service module is imported: the limiters read these at import time
+# and must not throttle the benchmark.
+os.environ.setdefault("PYDANTIC_AI_NO_BANNER", "1")
+os.environ.setdefault("ANTHROPIC_API_KEY", "offline-benchmark")
+os.environ.setdefault("TINYFISH_API_KEY", "offline-benchmark")
+for _name in ("TINYFISH", "ANTHROPIC"):
+    os.environ.setdefault(f"{_name}_MAX_CONCURRENCY", "1000")
+    os.environ.setdefault(f"{_name}_RATE_PER_MINUTE", "1000000")
+os.environ.setdefault("LIMITER_JITTER_MS", "0")
+# Measure the dashboard read itself, not the in-process cache in front of it.
+os.environ.setdefault("DASHBOARD_CACHE_SECONDS", "0")
+
+import argparse
+import asyncio
+import contextlib
+import gc
+import io
+import json
+import platform
+import subprocess
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timezone
+from pathlib import Path
+
+import httpx
+
+from benchmarks.fakes import InMemoryRedis, install
+from benchmarks.upstreams import TinyFishReplay, stub_evaluator, stub_planner
+
+HISTORY = Path(__file__).parent / "history.jsonl"
+SCENARIOS = ("pass", "fail", "error", "abort")
+
+# metric → (direction, tolerance). Tolerance None uses --threshold. Command
+# counts barely move between runs (only event batching depends on timing),
+# so a small increase already counts.
+METRICS = {
+    "run_test_p50_ms": ("lower", None),
+    "run_test_p95_ms": ("lower", None),
+    "run_test_runs_per_s": ("higher", None),
+    "run_test_redis_calls": ("lower", 0.05),
+    "store_run_p50_ms": ("lower", None),
+    "store_run_redis_calls": ("lower", 0.05),
+    "api_dashboard_rps": ("higher", None),
+    "api_tests_rps": ("higher", None),
+    "api_results_rps": ("higher", None),
+    "api_run_detail_rps": ("higher", None),
+    "memory_peak_kb_per_run": ("lower", None),
+    "memory_retained_kb_per_run": ("lower", None),
+}
+
+
+def _percentile(sorted_values: list[float], pct: float) -> float:
+    if not sorted_values:
+        return 0.0
+    rank = max(1, -(-len(sorted_values) * pct // 100))
+    return sorted_values[int(rank) - 1]
+
+
+def _seed_tests(store: InMemoryRedis, count: int) -> list[str]:
+    now = datetime.now(timezone.utc).isoformat()
+    test_ids = []
+    for i in range(count):
+        test_id = f"bench{i:03d}"
+        scenario = SCENARIOS[i % len(SCENARIOS)]
+        store.hset(f"test:{test_id}", values={
+            "id": test_id,
+            "name": f"Benchmark {scenario} {i}",
+            "url": f"https://bench.local/{i}/{scenario}",
+            "goal": f"Run the recorded {scenario} flow",
+            "schedule": "*/15 * * * *",
+            "alert_webhook": "",
+            "variables": "[]",
+            "evaluator_mode": "auto",
+            "status": "active",
+            "last_result": "pending",
+            "last_run_at": "",
+            "created_at": now,
+            "updated_at": now,
+            "schedule_id": "",
+        })
+        store.sadd("tests:all", test_id)
+        store.zadd("tests:by_created", {test_id: time.time() + i})
+        test_ids.append(test_id)
+    return test_ids
+
+
+async def _bench_pipeline(store: InMemoryRedis, test_ids: list[str], runs: int, concurrency: int) -> dict:
+    from agents.pipeline import run_test
+    from services.result_store import store_run_result
+
+    semaphore = asyncio.Semaphore(concurrency)
+    run_ms: list[float] = []
+    store_ms: list[float] = []
+    verdicts = {"passed": 0, "failed": 0}
+
+    async def one(i: int):
+        test_id = test_ids[i % len(test_ids)]
+        test = store.hgetall(f"test:{test_id}")
+        async with semaphore:
+            t0 = time.perf_counter()
+            plan, browser_result, final_result = await run_test(test["url"], test["goal"], test_id=test_id)
+            run_ms.append((time.perf_counter() - t0) * 1000)
+
+            t0 = time.perf_counter()
+            await store_run_result(test_id, final_result, plan, browser_result, triggered_by="benchmark")
+            store_ms.append((time.perf_counter() - t0) * 1000)
+
+            verdicts["passed" if final_result.passed else "failed"] += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(runs)))
+    elapsed = time.perf_counter() - start
+
+    run_ms.sort()
+    store_ms.sort()
+    return {
+        "run_test_p50_ms": round(_percentile(run_ms, 50), 2),
+        "run_test_p95_ms": round(_percentile(run_ms, 95), 2),
+        "run_test_runs_per_s": round(runs / elapsed, 1),
+        "store_run_p50_ms": round(_percentile(store_ms, 50), 2),
+        **{f"verdicts_{k}": v for k, v in verdicts.items()},
+    }
+
+
+async def _bench_api(test_ids: list[str], run_ids: dict[str, str], requests: int, concurrency: int) -> dict:
+    from main import app
+
+    transport = httpx.ASGITransport(app=app)
+    semaphore = asyncio.Semaphore(concurrency)
+    test_id = test_ids[0]
+    paths = {
+        "api_dashboard_rps": "/api/dashboard",
+        "api_tests_rps": "/api/tests",
+        "api_results_rps": f"/api/tests/{test_id}/results?limit=20",
+        "api_run_detail_rps": f"/api/tests/{test_id}/results/{run_ids[test_id]}",
+    }
+
+    results = {}
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        for metric, path in paths.items():
+            async def one():
+                async with semaphore:
+                    response = await client.get(path)
+                    response.raise_for_status()
+
+            start = time.perf_counter()
+            await asyncio.gather(*(one() for _ in range(requests)))
+            results[metric] = round(requests / (time.perf_counter() - start), 1)
+    return results
+
+
+async def _bench_sequential(store: InMemoryRedis, test_ids: list[str], runs: int) -> dict:
+    """One run at a time: exact Redis command counts and memory per run."""
+    from agents.pipeline import run_test
+    from services.result_store import store_run_result
+
+    peaks = []
+    run_calls = []
+    store_calls = []
+    gc.collect()
+    tracemalloc.start()
+    baseline = tracemalloc.get_traced_memory()[0]
+    for i in range(runs):
+        test_id = test_ids[i % len(test_ids)]
+        test = store.hgetall(f"test:{test_id}")
+        tracemalloc.reset_peak()
+        before = tracemalloc.get_traced_memory()[0]
+        calls = store.calls
+        plan, browser_result, final_result = await run_test(test["url"], test["goal"], test_id=test_id)
+        run_calls.append(store.calls - calls)
+        calls = store.calls
+        await store_run_result(test_id, final_result, plan, browser_result, triggered_by="benchmark")
+        store_calls.append(store.calls - calls)
+        peaks.append(tracemalloc.get_traced_memory()[1] - before)
+        del plan, browser_result, final_result
+    gc.collect()
+    retained = tracemalloc.get_traced_memory()[0] - baseline
+    tracemalloc.stop()
+
+    peaks.sort()
+    return {
+        "run_test_redis_calls": round(sum(run_calls) / runs, 1),
+        "store_run_redis_calls": round(sum(store_calls) / runs, 1),
+        "memory_peak_kb_per_run": round(_percentile(peaks, 50) / 1024, 1),
+        # Includes what the in-memory store keeps per run (records, events).
+        "memory_retained_kb_per_run": round(retained / runs / 1024, 1),
+    }
+
+
+def _git_commit() -> tuple[str, bool]:
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+        dirty = bool(subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"], capture_output=True, text=True).stdout.strip())
+        return commit, dirty
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown", False
+
+
+def _load_history(path: Path) -> list[dict]:
+    if not path.exists():
+        return []
+    return [json.loads(line) for line in path.read_text().splitlines() if line.strip()]
+
+
+def compare(current: dict, previous: dict, threshold: float) -> list[dict]:
+    """Metrics of `current` that are worse than `previous` beyond tolerance."""
+    regressions = []
+    for name, (direction, tolerance) in METRICS.items():
+        old, new = previous["metrics"].get(name), current["metrics"].get(name)
+        if old in (None, 0) or new is None:
+            continue
+        change = (new - old) / old
+        worse = change if direction == "lower" else -change
+        if worse > (threshold if tolerance is None else tolerance):
+            regressions.append({"metric": name, "previous": old, "current": new, "change_pct": round(change * 100, 1)})
+    return regressions
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tests", type=int, default=12, help="stored test suites (pass/fail/error/abort mix)")
+    parser.add_argument("--runs", type=int, default=60)
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--requests", type=int, default=300, help="requests per API endpoint")
+    parser.add_argument("--sequential-runs", type=int, default=20)
+    parser.add_argument("--redis-latency-ms", type=float, default=0.0, help="simulated Upstash round trip")
+    parser.add_argument("--model-latency-ms", type=float, default=0.0, help="simulated planner/evaluator call time")
+    parser.add_argument("--replay-speed", type=float, default=0.0, help="TinyFish event gaps: 0 = back to back, 1 = as recorded")
+    parser.add_argument("--history", type=Path, default=HISTORY)
+    parser.add_argument("--threshold", type=float, default=0.25, help="relative change counted as a regression")
+    parser.add_argument("--save", action="store_true", help="append this run to the history file")
+    parser.add_argument("--check", action="store_true", help="exit 1 when a regression is found")
+    args = parser.parse_args()
+
+    tinyfish = await TinyFishReplay(speed=args.replay_speed).start()
+    os.environ["TINYFISH_URL"] = tinyfish.url
+
+    from agents.planner import planner_agent
+    from agents.evaluator import evaluator_agent
+    from services.result_store import flush_events
+    from services.config import close_http_clients
+
+    store = InMemoryRedis()
+    install(store, latency=args.redis_latency_ms / 1000)
+    test_ids = _seed_tests(store, args.tests)
+
+    model_latency = args.model_latency_ms / 1000
+    # Pipeline progress is printed per step; keep it out of the report.
+    with planner_agent.override(model=stub_planner(model_latency)), \
+            evaluator_agent.override(model=stub_evaluator(model_latency)), \
+            contextlib.redirect_stdout(io.StringIO()):
+        pipeline = await _bench_pipeline(store, test_ids, args.runs, args.concurrency)
+        await flush_events()
+        sequential = await _bench_sequential(store, test_ids, args.sequential_runs)
+        await flush_events()
+
+    run_ids = {}
+    for test_id in test_ids:
+        latest = store.zrevrange(f"results:{test_id}", 0, 0)
+        if latest:
+            run_ids[test_id] = latest[0]
+    api = await _bench_api(test_ids, run_ids, args.requests, args.concurrency)
+    await close_http_clients()
+    await tinyfish.stop()
+
+    commit, dirty = _git_commit()
+    entry = {
+        "commit": commit,
+        "dirty": dirty,
+        "recorded_at": datetime.now(timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "params": {k: getattr(args, k) for k in ("tests", "runs", "concurrency", "requests", "sequential_runs",
+                                                  "redis_latency_ms", "model_latency_ms", "replay_speed")},
+        "metrics": {**pipeline, **sequential, **api},
+        "tinyfish_requests": tinyfish.requests,
+    }
+
+    history = _load_history(args.history)
+    previous = next(
+        (h for h in reversed(history) if h["commit"] != commit and h.get("params") == entry["params"]),
+        None,
+    )
+    regressions = compare(entry, previous, args.threshold) if previous else []
+    print(json.dumps({
+        **entry,
+        "compared_with": previous["commit"] if previous else None,
+        "regressions": regressions,
+    }, indent=2))
+
+    if args.save:
+        with args.history.open("a") as f:
+            f.write(json.dumps(entry) + "\n")
+
+    if regressions:
+        for r in regressions:
+            print(f"[Bench] Regression in {r['metric']}: {r['previous']} → {r['current']} ({r['change_pct']:+}%)", file=sys.stderr)
+        if args.check:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
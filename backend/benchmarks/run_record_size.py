@@ -0,0 +1,125 @@
+"""Stored size of a run record: legacy full JSON vs compact summary + blob.
+
+Builds run records shaped exactly like `agents.pipeline.run_test` output
+(every StepExecution carries the full TinyFish payload) and reports the
+bytes Redis holds per run in each format, plus what a history page pulls.
+
+Usage (from backend/):
+    python -m benchmarks.run_record_size [--steps 5] [--runs 200]
+"""
+import argparse
+import json
+import random
+
+from models import BrowserResult, StepExecution, StepResult, TestPlan, TestResult, TestStep
+from services.result_store import pack_run, unpack_run
+
+
+def _realistic_run(steps: int, seed: int) -> dict:
+    rng = random.Random(seed)
+    plan = TestPlan(
+        tinyfish_goal="\n".join(
+            f"STEP {i}: Navigate to the pricing section, click the 'Compare plans' button and verify the table lists "
+            f"the Starter, Pro and Enterprise tiers with monthly and annual prices."
+            for i in range(1, steps + 1)
+        ) + '\nReturn JSON: {"success": true/false, "action_performed": "...", "verification": "...", "error": null}',
+        steps=[
+            TestStep(
+                step_number=i,
+                description=f"Open the pricing page and verify tier {i} is listed with its price",
+                success_criteria=f"Tier {i} card visible with a monthly price and a 'Start trial' button",
+                tinyfish_goal=f"STEP {i}: Verify tier {i} is listed on the pricing page. Return JSON with success.",
+            )
+            for i in range(1, steps + 1)
+        ],
+        total_steps=steps,
+    )
+    tinyfish_data = {
+        "success": True,
+        "action_performed": "Navigated to pricing, opened the comparison table and inspected every tier card.",
+        "verification": "All tiers rendered with prices; the annual toggle updated prices to the discounted amounts.",
+        "error": None,
+        "step_results": [
+            {
+                "step": i,
+                "success": rng.random() > 0.1,
+                "action_performed": f"Located tier {i} card in the comparison table after scrolling {rng.randint(100, 900)}px",
+                "verification": f"Card shows '${rng.randint(9, 99)}/mo', feature list of {rng.randint(4, 12)} items and CTA button",
+            }
+            for i in range(1, steps + 1)
+        ],
+        "page_title": "Pricing — Example SaaS",
+        "observed_text": " ".join(rng.choice(["plan", "seat", "billing", "annual", "monthly", "feature", "support"]) for _ in range(120)),
+    }
+    raw = json.dumps(tinyfish_data)
+    streaming_url = f"https://stream.tinyfish.ai/session/{rng.getrandbits(64):016x}"
+
+    executions = [
+        StepExecution(
+            step_number=s.step_number,
+            description=s.description,
+            tinyfish_goal=s.tinyfish_goal,
+            tinyfish_raw=raw,
+            tinyfish_data=tinyfish_data["step_results"][s.step_number - 1] if s.step_number % 2 else tinyfish_data,
+            streaming_url=streaming_url,
+            passed=True,
+            details=tinyfish_data["step_results"][s.step_number - 1]["verification"],
+        )
+        for s in plan.steps
+    ]
+    step_results = [StepResult(step_number=e.step_number, passed=e.passed, details=e.details) for e in executions]
+    browser = BrowserResult(success=True, step_results=step_results, step_executions=executions, raw_result=raw, streaming_url=streaming_url)
+    result = TestResult(passed=True, duration_ms=48213, steps_passed=steps, steps_total=steps, details="All pricing tiers rendered correctly.", step_results=step_results)
+
+    return {
+        "run_id": f"{seed:08x}",
+        "test_id": "bench",
+        "passed": result.passed,
+        "duration_ms": result.duration_ms,
+        "steps_passed": result.steps_passed,
+        "steps_total": result.steps_total,
+        "details": result.details,
+        "step_results": [sr.model_dump() for sr in result.step_results],
+        "error": None,
+        "triggered_by": "qstash",
+        "started_at": "2026-03-01T12:00:00+00:00",
+        "completed_at": "2026-03-01T12:00:48+00:00",
+        "plan": plan.model_dump(),
+        "tinyfish_raw": raw,
+        "tinyfish_data": tinyfish_data,
+        "streaming_url": streaming_url,
+        "step_executions": [e.model_dump() for e in browser.step_executions],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--steps", type=int, default=5)
+    parser.add_argument("--runs", type=int, default=200)
+    args = parser.parse_args()
+
+    legacy_bytes = summary_bytes = blob_bytes = 0
+    for seed in range(args.runs):
+        record = _realistic_run(args.steps, seed)
+        summary, blob = pack_run(record)
+        assert unpack_run(json.loads(json.dumps(summary)), blob) == record, "round trip mismatch"
+
+        legacy_bytes += len(json.dumps(record).encode())
+        summary_bytes += len(json.dumps(summary).encode())
+        blob_bytes += len(blob.encode())
+
+    compact_bytes = summary_bytes + blob_bytes
+    print(json.dumps({
+        "runs": args.runs,
+        "steps_per_run": args.steps,
+        "legacy_bytes_per_run": legacy_bytes // args.runs,
+        "compact_bytes_per_run": compact_bytes // args.runs,
+        "summary_bytes_per_run": summary_bytes // args.runs,
+        "blob_bytes_per_run": blob_bytes // args.runs,
+        "storage_reduction_pct": round(100 * (1 - compact_bytes / legacy_bytes), 1),
+        "history_page_reduction_pct": round(100 * (1 - summary_bytes / legacy_bytes), 1),
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,158 @@
+"""Local scheduler simulation: two replicas, a simulated clock, no network.
+
+Suites are created through services.test_suite with SCHEDULER_BACKEND=local
+against the in-memory store, then two LocalScheduler replicas run passes
+on a simulated clock, each sleeping as long as its real loop would
+(`seconds_until_next`), with dispatches recorded instead of queued. Along
+the way one suite is paused and resumed, one is deleted, and the leader
+crashes halfway through: it stops running passes and its lease lapses
+SCHEDULER_LEASE_SECONDS later.
+
+Every dispatch is checked against the cron times of the suites' staggered
+schedules: a slot must be dispatched once, within a second of its time.
+Slots that fell due between the crash and the takeover must be caught up
+by the new leader at takeover. Exits 1 on duplicate, unexpected or missed
+dispatches.
+
+Usage (from backend/):
+    python -m benchmarks.scheduler_offline [--suites 50] [--hours 2]
+"""
+import os
+
+os.environ["SCHEDULER_BACKEND"] = "local"
+
+import argparse
+import asyncio
+import json
+import sys
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+
+from benchmarks.fakes import InMemoryRedis, install
+
+SCHEDULES = ("*/5 * * * *", "*/15 * * * *", "0 * * * *", "*/30 * * * *")
+
+
+def _expected(cron: str, delay: int, start: datetime, end: datetime) -> list[datetime]:
+    from services.scheduler import _fire_after
+
+    fires, t = [], start
+    while (t := _fire_after(cron, delay, t)) and t <= end:
+        fires.append(t)
+    return fires
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--suites", type=int, default=50)
+    parser.add_argument("--hours", type=float, default=2.0)
+    args = parser.parse_args()
+
+    from services import test_suite as ts
+    from services.scheduler import LocalScheduler, LEADER_KEY, SCHEDULER_LEASE_SECONDS
+
+    store = InMemoryRedis()
+    install(store)
+
+    suites = [
+        await ts.create_test_suite({"name": f"Sim {i}", "url": f"https://sim.local/{i}", "goal": "g", "schedule": SCHEDULES[i % len(SCHEDULES)]})
+        for i in range(args.suites)
+    ]
+    paused, deleted = suites[0]["id"], suites[1]["id"]
+
+    dispatched: list[tuple[str, str, datetime]] = []
+    now = datetime(2026, 1, 1, tzinfo=timezone.utc)
+
+    def recorder(replica: str):
+        async def dispatch(test_id: str) -> bool:
+            dispatched.append((replica, test_id, now))
+            return True
+        return dispatch
+
+    replicas = {name: LocalScheduler(dispatch=recorder(name), instance_id=name) for name in ("a", "b")}
+    start, end = now, now + timedelta(hours=args.hours)
+    planned = {
+        "pause": start + (end - start) * 0.2,
+        "delete": start + (end - start) * 0.3,
+        "resume": start + (end - start) * 0.4,
+        "crash": start + (end - start) * 0.5,
+    }
+    done: dict[str, datetime] = {}
+    crashed, takeover_at = None, None
+
+    next_pass = dict.fromkeys(replicas, start)
+    passes, calls_before = 0, store.calls
+    while (now := min(t for name, t in next_pass.items() if name != crashed)) <= end:
+        for event in [e for e, at in planned.items() if e not in done and now >= at]:
+            if event == "pause":
+                await ts.update_test_suite(paused, {"status": "paused"})
+            elif event == "resume":
+                await ts.update_test_suite(paused, {"status": "active"})
+            elif event == "delete":
+                await ts.delete_test_suite(deleted)
+            elif event == "crash":
+                crashed = next(name for name, r in replicas.items() if r.is_leader)
+            done[event] = now
+        if "crash" in done and "lapse" not in done and now >= done["crash"] + timedelta(seconds=SCHEDULER_LEASE_SECONDS):
+            store.delete(LEADER_KEY)  # the in-memory store has no TTLs: lapse the lease by hand
+            done["lapse"] = now
+        for name, replica in replicas.items():
+            if name == crashed or next_pass[name] > now:
+                continue
+            await replica.tick(now)
+            passes += 1
+            if crashed and takeover_at is None and replica.is_leader:
+                takeover_at = now
+            next_pass[name] = now + timedelta(seconds=replica.seconds_until_next(now))
+
+    expected = []
+    for suite in suites:
+        cron, delay = suite["schedule_cron"], int(suite["schedule_delay"])
+        fires = _expected(cron, delay, start, end)
+        if suite["id"] == paused:
+            fires = [t for t in fires if t < done["pause"] or t > done["resume"]]
+        elif suite["id"] == deleted:
+            fires = [t for t in fires if t < done["delete"]]
+        expected += [(suite["id"], t) for t in fires]
+
+    slack = timedelta(seconds=1)
+    got = Counter((test_id, t) for _, test_id, t in dispatched)
+    matched, lags, caught_up, missed = set(), [], [], []
+    for test_id, fire_at in expected:
+        handover = takeover_at and done["crash"] <= fire_at <= takeover_at
+        latest = takeover_at + slack if handover else fire_at + slack
+        hit = next((t for (tid, t) in got if tid == test_id and fire_at <= t < latest), None)
+        if hit is None:
+            missed.append((test_id, fire_at))
+        elif handover:
+            matched.add((test_id, hit))
+            caught_up.append((hit - fire_at).total_seconds())
+        else:
+            matched.add((test_id, hit))
+            lags.append((hit - fire_at).total_seconds())
+    duplicates = sum(n - 1 for n in got.values() if n > 1)
+    unexpected = [key for key in got if key not in matched]
+    leaders = Counter(replica for replica, _, _ in dispatched)
+
+    print(json.dumps({
+        "suites": args.suites,
+        "simulated_hours": args.hours,
+        "passes": passes,
+        "redis_calls_per_pass": round((store.calls - calls_before) / passes, 2),
+        "expected_runs": len(expected),
+        "dispatched": len(dispatched),
+        "dispatched_by": dict(leaders),
+        "max_lag_s": max(lags, default=0),
+        "caught_up_in_handover": len(caught_up),
+        "max_catch_up_lag_s": max(caught_up, default=0),
+        "takeover_after_s": (takeover_at - done["crash"]).total_seconds() if takeover_at else None,
+        "missed": len(missed),
+        "duplicates": duplicates,
+        "unexpected": len(unexpected),
+    }, indent=2))
+    if missed or duplicates or unexpected:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
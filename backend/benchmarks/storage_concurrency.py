@@ -0,0 +1,106 @@
+"""Concurrent-request throughput: blocking vs async Redis storage path.
+
+Runs the same results-listing workload against two FastAPI apps backed by
+an in-memory store with simulated Upstash latency:
+
+- before: the pre-async handler, which called the blocking client from an
+  `async def` route and therefore stalled the event loop on every command
+- after:  the current `api.results` router on the async client
+
+Usage (from backend/):
+    python -m benchmarks.storage_concurrency [--requests 200] [--concurrency 50] [--latency-ms 20]
+"""
+import argparse
+import asyncio
+import json
+import time
+
+import httpx
+from fastapi import FastAPI, Query
+
+from benchmarks.fakes import InMemoryRedis, install
+
+
+def _seed(store: InMemoryRedis, test_id: str, runs: int = 50) -> None:
+    now = time.time()
+    for i in range(runs):
+        record = {"run_id": f"r{i:04d}", "test_id": test_id, "passed": i % 7 != 0, "duration_ms": 30000 + i}
+        store.zadd(f"results:{test_id}", {json.dumps(record): now - i * 900})
+
+
+def _legacy_app() -> FastAPI:
+    from services.config import get_redis
+
+    app = FastAPI()
+
+    @app.get("/api/tests/{test_id}/results")
+    async def get_results(test_id: str, limit: int = Query(20), offset: int = Query(0)):
+        redis = get_redis()
+        total = redis.zcard(f"results:{test_id}")
+        raw_results = redis.zrevrange(f"results:{test_id}", offset, offset + limit - 1)
+        return {"results": [json.loads(r) for r in raw_results], "total": total}
+
+    return app
+
+
+def _async_app() -> FastAPI:
+    from api.results import router
+
+    app = FastAPI()
+    app.include_router(router)
+    return app
+
+
+async def _drive(app: FastAPI, path: str, requests: int, concurrency: int) -> dict:
+    transport = httpx.ASGITransport(app=app)
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies: list[float] = []
+
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        async def one():
+            async with semaphore:
+                t0 = time.perf_counter()
+                response = await client.get(path)
+                response.raise_for_status()
+                latencies.append(time.perf_counter() - t0)
+
+        start = time.perf_counter()
+        await asyncio.gather(*(one() for _ in range(requests)))
+        elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    return {
+        "requests": requests,
+        "elapsed_s": round(elapsed, 3),
+        "throughput_rps": round(requests / elapsed, 1),
+        "p50_ms": round(latencies[len(latencies) // 2] * 1000, 1),
+        "p95_ms": round(latencies[int(len(latencies) * 0.95) - 1] * 1000, 1),
+    }
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--latency-ms", type=float, default=20.0)
+    args = parser.parse_args()
+
+    store = InMemoryRedis()
+    _seed(store, "bench")
+    install(store, latency=args.latency_ms / 1000)
+
+    path = "/api/tests/bench/results?limit=20"
+    before = await _drive(_legacy_app(), path, args.requests, args.concurrency)
+    after = await _drive(_async_app(), path, args.requests, args.concurrency)
+
+    print(json.dumps({
+        "latency_ms_per_redis_call": args.latency_ms,
+        "concurrency": args.concurrency,
+        "before_blocking": before,
+        "after_async": after,
+        "speedup": round(after["throughput_rps"] / before["throughput_rps"], 1),
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,181 @@
+"""Local stand-ins for TinyFish and the Anthropic models used by the offline benchmarks.
+
+- TinyFishReplay: a real HTTP server on 127.0.0.1 that answers the
+  `run-sse` POST by replaying a recorded stream from fixtures/tinyfish/.
+  The fixture is picked by the last path segment of the requested test URL
+  (`https://bench.local/fail` → `fail.sse`), so `call_tinyfish` runs its
+  real streaming/parsing code unchanged.
+- stub_planner / stub_evaluator: pydantic-ai FunctionModels that answer
+  through the agents' output tools, for use with `agent.override(model=...)`.
+"""
+import asyncio
+import json
+import re
+from pathlib import Path
+from urllib.parse import urlparse
+
+from pydantic_ai.messages import ModelResponse, ToolCallPart
+from pydantic_ai.models.function import AgentInfo, FunctionModel
+
+FIXTURES = Path(__file__).parent / "fixtures" / "tinyfish"
+
+
+def load_stream(name: str) -> list[tuple[float, str]]:
+    """Parse a recorded stream into (delay_seconds, event_block) pairs.
+
+    `: +<ms>` comment lines carry the recorded gap before the next event;
+    other comments are dropped.
+    """
+    events = []
+    delay = 0.0
+    block: list[str] = []
+    for line in (FIXTURES / f"{name}.sse").read_text().splitlines():
+        gap = re.fullmatch(r":\s*\+(\d+)ms", line)
+        if gap:
+            delay = int(gap.group(1)) / 1000
+        elif line.startswith(":"):
+            continue
+        elif line:
+            block.append(line)
+        elif block:
+            events.append((delay, "\n".join(block) + "\n\n"))
+            block, delay = [], 0.0
+    if block:
+        events.append((delay, "\n".join(block) + "\n\n"))
+    return events
+
+
+class TinyFishReplay:
+    """Replays recorded TinyFish SSE streams over HTTP/1.1 keep-alive.
+
+    `speed` scales the recorded gaps between events: 0 sends them back to
+    back (pipeline overhead only), 1 replays in real time.
+    """
+
+    def __init__(self, speed: float = 0.0):
+        self.speed = speed
+        self.streams = {p.stem: load_stream(p.stem) for p in FIXTURES.glob("*.sse")}
+        self.requests = 0
+        self._server: asyncio.AbstractServer | None = None
+        self._connections: dict[asyncio.Task, asyncio.StreamWriter] = {}
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.sockets[0].getsockname()[:2]
+        return f"http://{host}:{port}/v1/automation/run-sse"
+
+    async def start(self) -> "TinyFishReplay":
+        self._server = await asyncio.start_server(self._handle, "127.0.0.1", 0)
+        return self
+
+    async def stop(self) -> None:
+        if self._server:
+            self._server.close()
+            # Idle keep-alive connections end on EOF rather than by cancellation.
+            for writer in self._connections.values():
+                writer.close()
+            await asyncio.gather(*self._connections, return_exceptions=True)
+            await self._server.wait_closed()
+
+    def _pick(self, body: bytes) -> str:
+        try:
+            target = json.loads(body).get("url", "")
+        except ValueError:
+            target = ""
+        name = urlparse(target).path.rstrip("/").rsplit("/", 1)[-1]
+        return name if name in self.streams else "pass"
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        task = asyncio.current_task()
+        self._connections[task] = writer
+        try:
+            while True:
+                head = await reader.readuntil(b"\r\n\r\n")
+                length = 0
+                for line in head.decode("latin-1").split("\r\n")[1:]:
+                    name, _, value = line.partition(":")
+                    if name.strip().lower() == "content-length":
+                        length = int(value)
+                body = await reader.readexactly(length)
+                self.requests += 1
+
+                writer.write(
+                    b"HTTP/1.1 200 OK\r\n"
+                    b"Content-Type: text/event-stream\r\n"
+                    b"Transfer-Encoding: chunked\r\n\r\n"
+                )
+                for delay, event in self.streams[self._pick(body)]:
+                    if delay and self.speed:
+                        await asyncio.sleep(delay * self.speed)
+                    data = event.encode()
+                    writer.write(b"%x\r\n%s\r\n" % (len(data), data))
+                    await writer.drain()
+                writer.write(b"0\r\n\r\n")
+                await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            self._connections.pop(task, None)
+            writer.close()
+
+
+def _prompt(messages) -> str:
+    return "".join(
+        part.content for msg in messages for part in getattr(msg, "parts", [])
+        if isinstance(getattr(part, "content", None), str)
+    )
+
+
+def _output(info: AgentInfo, args: dict) -> ModelResponse:
+    return ModelResponse(parts=[ToolCallPart(info.output_tools[0].name, args)])
+
+
+def stub_planner(latency: float = 0.0) -> FunctionModel:
+    """Three-step plan derived from the prompt, like the real planner returns."""
+
+    async def plan(messages, info: AgentInfo) -> ModelResponse:
+        if latency:
+            await asyncio.sleep(latency)
+        goal = _prompt(messages).split("Test Goal:", 1)[-1].strip()
+        steps = [
+            {
+                "step_number": i,
+                "description": f"{verb} ({goal[:60]})",
+                "success_criteria": f"{verb} completed without errors",
+                "tinyfish_goal": f"STEP {i}: {verb}",
+            }
+            for i, verb in enumerate(("Open the page", "Perform the action", "Verify the outcome"), start=1)
+        ]
+        tinyfish_goal = "\n".join(s["tinyfish_goal"] for s in steps) + (
+            '\nReturn JSON: {"success": true/false, "step_results": [...], "error": null}'
+        )
+        return _output(info, {"tinyfish_goal": tinyfish_goal, "steps": steps, "total_steps": len(steps)})
+
+    return FunctionModel(plan)
+
+
+def stub_evaluator(latency: float = 0.0) -> FunctionModel:
+    """Verdict read off the per-step results in the evaluator prompt."""
+
+    async def evaluate(messages, info: AgentInfo) -> ModelResponse:
+        if latency:
+            await asyncio.sleep(latency)
+        prompt = _prompt(messages)
+        match = re.search(r"Step Results:\s*(\[.*\])\s*\n\nEvaluate", prompt, re.S)
+        try:
+            steps = json.loads(match.group(1)) if match else []
+        except ValueError:
+            steps = []
+        passed = sum(1 for s in steps if s.get("passed"))
+        return _output(info, {
+            "passed": bool(steps) and passed == len(steps),
+            "steps_passed": passed,
+            "steps_total": len(steps),
+            "details": f"{passed}/{len(steps)} steps passed according to the browser run.",
+            "step_results": [
+                {"step_number": s.get("step_number", i), "passed": bool(s.get("passed")), "details": s.get("details") or ""}
+                for i, s in enumerate(steps, start=1)
+            ],
+        })
+
+    return FunctionModel(evaluate)
@@ -1,5 +1,7 @@
 import os
 import json
+import asyncio
+from contextlib import asynccontextmanager
 from pathlib import Path
 from dotenv import load_dotenv
 from fastapi import FastAPI, Request
@@ -7,14 +9,42 @@ from fastapi import FastAPI, Request
 load_dotenv(Path(__file__).resolve().parent.parent / ".env")
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import FileResponse, JSONResponse
+from fastapi.responses import FileResponse, JSONResponse, PlainTextResponse
 
 from api.tests import router as tests_router
 from api.results import router as results_router
 from api.auth import router as auth_router
-from services.config import get_redis, get_qstash, get_public_url
+from services.config import (
+    get_async_redis, get_async_qstash, get_public_url, redis_pool_stats, close_redis,
+    get_http_client, request_timeout, close_http_clients,
+)
+
 
-app = FastAPI(title="HouseCat", version="0.1.0")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    from services.retention import retention_sweeper
+    from services.job_queue import run_queue
+    from services.tinyfish import TINYFISH_HOST
+    from services.result_store import flush_events
+    from services.test_suite import SCHEDULER_BACKEND
+
+    sweeper = asyncio.create_task(retention_sweeper())
+    get_http_client(TINYFISH_HOST)
+    run_queue.start()
+    if SCHEDULER_BACKEND == "local":
+        from services.scheduler import local_scheduler
+        local_scheduler.start()
+    yield
+    sweeper.cancel()
+    if SCHEDULER_BACKEND == "local":
+        await local_scheduler.stop()
+    await run_queue.stop()
+    await flush_events()
+    await close_http_clients()
+    await close_redis()
+
+
+app = FastAPI(title="HouseCat", version="0.1.0", lifespan=lifespan)
 app.include_router(tests_router)
 app.include_router(results_router)
 app.include_router(auth_router)
@@ -35,19 +65,25 @@ async def health():
     status = {}
 
     try:
-        redis = get_redis()
-        redis.set("health:ping", "pong")
-        val = redis.get("health:ping")
+        redis = get_async_redis()
+        await redis.set("health:ping", "pong")
+        val = await redis.get("health:ping")
         status["redis"] = "connected" if val == "pong" else "error"
     except Exception as e:
         status["redis"] = f"error: {str(e)[:100]}"
 
-    try:
-        qstash = get_qstash()
-        qstash.schedule.list()
-        status["qstash"] = "connected"
-    except Exception as e:
-        status["qstash"] = f"error: {str(e)[:100]}"
+    from services.test_suite import SCHEDULER_BACKEND
+    if SCHEDULER_BACKEND == "local":
+        from services.scheduler import local_scheduler
+        status["qstash"] = "not_used"
+        status["scheduler"] = local_scheduler.snapshot()
+    else:
+        try:
+            qstash = get_async_qstash()
+            await qstash.schedule.list()
+            status["qstash"] = "connected"
+        except Exception as e:
+            status["qstash"] = f"error: {str(e)[:100]}"
 
     tinyfish_key = os.environ.get("TINYFISH_API_KEY", "")
     status["tinyfish"] = "key_set" if len(tinyfish_key) > 0 else "missing"
@@ -56,9 +92,25 @@ async def health():
     status["anthropic"] = "key_set" if len(anthropic_key) > 0 else "missing"
 
     status["publicUrl"] = get_public_url()
+    status["redisPool"] = redis_pool_stats()
+
+    from services.job_queue import run_queue
+    from services.limiter import limiter_stats
+    from services.event_bus import event_bus
+    from services.event_writer import event_writer
+    status["runQueue"] = run_queue.snapshot()
+    status["limiters"] = limiter_stats()
+    status["eventBus"] = event_bus.snapshot()
+    status["eventWriter"] = event_writer.snapshot()
+
+    try:
+        from services.plan_cache import get_plan_cache_stats
+        status["planCache"] = await get_plan_cache_stats()
+    except Exception as e:
+        status["planCache"] = f"error: {str(e)[:100]}"
 
     all_ok = all(
-        status[k] in ("connected", "key_set")
+        status[k] in ("connected", "key_set", "not_used")
         for k in ["redis", "qstash", "tinyfish", "anthropic"]
     )
     status["overallStatus"] = "all_green" if all_ok else "issues_detected"
@@ -69,10 +121,7 @@ async def health():
 @app.post("/api/callback/{test_id}")
 async def qstash_callback(test_id: str, request: Request):
     from services.test_suite import get_test_suite
-    from services.result_store import store_run_result, log_event
-    from services.alert import send_alert_webhook
-    from agents.pipeline import run_test
-    from datetime import datetime, timezone
+    from services.job_queue import run_queue, RunJob, QueueFull
     from qstash import Receiver
 
     upstash_signature = request.headers.get("upstash-signature", "")
@@ -93,59 +142,51 @@ async def qstash_callback(test_id: str, request: Request):
 
     print(f"QStash callback verified for test: {test_id}")
 
-    test = get_test_suite(test_id)
+    test = await get_test_suite(test_id)
     if not test:
         return JSONResponse(content={"error": "Test not found"}, status_code=404)
 
     if test.get("status") == "paused":
         return {"status": "skipped", "reason": "test is paused"}
 
+    job = RunJob(test_id=test_id, triggered_by="qstash")
     try:
-        plan, browser_result, final_result = await run_test(
-            url=test["url"],
-            goal=test["goal"],
-            test_id=test_id,
+        queued = await run_queue.enqueue(job)
+    except QueueFull as e:
+        # QStash retries non-2xx deliveries, so shed load instead of queueing unboundedly.
+        return JSONResponse(
+            content={"error": str(e), "test_id": test_id},
+            status_code=503,
+            headers={"Retry-After": "30"},
         )
 
-        run_record = store_run_result(
-            test_id=test_id,
-            final_result=final_result,
-            plan=plan,
-            browser_result=browser_result,
-            triggered_by="qstash",
-        )
+    if not queued:
+        return {"status": "skipped", "reason": "run already in progress", "test_id": test_id}
 
-        if not final_result.passed and test.get("alert_webhook"):
-            alert_sent = await send_alert_webhook(test["alert_webhook"], test, run_record)
-            if alert_sent:
-                redis = get_redis()
-                import json as _json
-                incidents = redis.lrange(f"incidents:{test_id}", 0, -1)
-                for idx, raw in enumerate(incidents):
-                    incident = _json.loads(raw)
-                    if incident.get("run_id") == run_record["run_id"]:
-                        incident["alert_sent"] = True
-                        redis.lset(f"incidents:{test_id}", idx, _json.dumps(incident))
-                        break
+    return JSONResponse(
+        content={"status": "queued", "test_id": test_id, "job_id": job.job_id},
+        status_code=202,
+    )
 
-        return {
-            "status": "completed",
-            "test_id": test_id,
-            "passed": final_result.passed,
-            "run_id": run_record["run_id"],
-        }
 
-    except Exception as e:
-        log_event(test_id, "error", f"Pipeline error: {str(e)}")
-        redis = get_redis()
-        redis.hset(f"test:{test_id}", values={
-            "last_result": "error",
-            "last_run_at": datetime.now(timezone.utc).isoformat(),
-        })
-        return JSONResponse(
-            content={"error": str(e), "test_id": test_id},
-            status_code=500,
-        )
+@app.get("/api/queue/stats")
+async def queue_stats():
+    from services.job_queue import run_queue
+    from services.limiter import limiter_stats
+    from services.test_suite import SCHEDULER_BACKEND
+
+    stats = {**run_queue.snapshot(), "limiters": limiter_stats()}
+    if SCHEDULER_BACKEND == "local":
+        from services.scheduler import local_scheduler
+        stats["scheduler"] = local_scheduler.snapshot()
+    return stats
+
+
+@app.get("/metrics")
+async def metrics():
+    from services.metrics import render_metrics
+
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4; charset=utf-8")
 
 
 @app.post("/api/run-test")
@@ -199,42 +240,41 @@ async def test_tinyfish():
 
 @app.post("/api/test/agent")
 async def test_agent():
-    import httpx
-
     anthropic_key = os.environ.get("ANTHROPIC_API_KEY")
     if not anthropic_key:
         return {"success": False, "error": "ANTHROPIC_API_KEY not set"}
 
     try:
-        async with httpx.AsyncClient(timeout=httpx.Timeout(30.0)) as client:
-            response = await client.post(
-                "https://api.anthropic.com/v1/messages",
-                headers={
-                    "x-api-key": anthropic_key,
-                    "anthropic-version": "2023-06-01",
-                    "content-type": "application/json",
-                },
-                json={
-                    "model": "claude-haiku-4-5-20251001",
-                    "max_tokens": 100,
-                    "messages": [
-                        {
-                            "role": "user",
-                            "content": "What is 2 + 2? Answer with just the number.",
-                        }
-                    ],
-                },
-            )
-
-            if response.status_code != 200:
-                return {
-                    "success": False,
-                    "error": f"HTTP {response.status_code}: {response.text[:200]}",
-                }
-
-            data = response.json()
-            answer = data.get("content", [{}])[0].get("text", str(data.get("content")))
-            return {"success": True, "output": {"answer": answer}}
+        client = get_http_client("api.anthropic.com")
+        response = await client.post(
+            "https://api.anthropic.com/v1/messages",
+            headers={
+                "x-api-key": anthropic_key,
+                "anthropic-version": "2023-06-01",
+                "content-type": "application/json",
+            },
+            json={
+                "model": "claude-haiku-4-5-20251001",
+                "max_tokens": 100,
+                "messages": [
+                    {
+                        "role": "user",
+                        "content": "What is 2 + 2? Answer with just the number.",
+                    }
+                ],
+            },
+            timeout=request_timeout(30.0),
+        )
+
+        if response.status_code != 200:
+            return {
+                "success": False,
+                "error": f"HTTP {response.status_code}: {response.text[:200]}",
+            }
+
+        data = response.json()
+        answer = data.get("content", [{}])[0].get("text", str(data.get("content")))
+        return {"success": True, "output": {"answer": answer}}
     except Exception as e:
         return {"success": False, "error": str(e)[:200]}
 
@@ -242,10 +282,10 @@ async def test_agent():
 @app.post("/api/test/qstash")
 async def test_qstash():
     try:
-        qstash = get_qstash()
+        qstash = get_async_qstash()
         public_url = get_public_url()
 
-        result = qstash.message.publish_json(
+        result = await qstash.message.publish_json(
             url=f"{public_url}/api/callback/qstash-sanity-test",
             body={"test": True},
         )
@@ -0,0 +1,106 @@
+import asyncio
+import sys
+from pathlib import Path
+
+from dotenv import load_dotenv
+
+load_dotenv(Path(__file__).resolve().parent.parent / ".env")
+
+
+async def migrate_run_index():
+    """Move every legacy `results:{id}` JSON member into `run:{id}:{run_id}` keys."""
+    from services.config import get_async_redis
+    from services.result_store import RUN_INDEX_MIGRATED, migrate_legacy_runs
+
+    redis = get_async_redis()
+    test_ids = await redis.smembers("tests:all")
+    total = 0
+    for test_id in test_ids:
+        migrated = await migrate_legacy_runs(test_id)
+        if migrated:
+            print(f"[Migrate] {test_id}: {migrated} runs moved to per-run keys")
+        total += migrated
+
+    await redis.set(RUN_INDEX_MIGRATED, "1")
+    print(f"[Migrate] run-index complete: {total} runs across {len(test_ids)} tests")
+
+
+async def migrate_compact_runs():
+    """Rewrite v1 per-run records into the compact summary + blob format."""
+    from services.config import get_async_redis
+    from services.result_store import compact_runs
+
+    redis = get_async_redis()
+    test_ids = await redis.smembers("tests:all")
+    total = 0
+    for test_id in test_ids:
+        compacted = await compact_runs(test_id)
+        if compacted:
+            print(f"[Migrate] {test_id}: {compacted} runs compacted")
+        total += compacted
+
+    print(f"[Migrate] compact-runs complete: {total} runs across {len(test_ids)} tests")
+
+
+async def migrate_uptime_buckets():
+    """Count runs stored before hourly uptime counters existed into the buckets."""
+    from services.config import get_async_redis
+    from services.uptime import rebuild_uptime_buckets
+
+    redis = get_async_redis()
+    test_ids = await redis.smembers("tests:all")
+    total = 0
+    for test_id in test_ids:
+        counted = await rebuild_uptime_buckets(test_id)
+        if counted:
+            print(f"[Migrate] {test_id}: {counted} runs counted into uptime buckets")
+        total += counted
+
+    print(f"[Migrate] uptime-buckets complete: {total} runs across {len(test_ids)} tests")
+
+
+async def migrate_dashboard():
+    """Rebuild the materialized dashboard hash from the suites and their latest runs."""
+    from services.config import get_async_redis
+    from services.dashboard import DASHBOARD_KEY, rebuild_dashboard
+
+    await get_async_redis().delete(DASHBOARD_KEY)
+    total = await rebuild_dashboard()
+    print(f"[Migrate] dashboard complete: {total} tests")
+
+
+async def migrate_rebalance_schedules():
+    """Stagger existing schedules and move them to SCHEDULER_BACKEND (`--dry-run` only lists the changes)."""
+    from services.test_suite import rebalance_schedules
+
+    dry_run = "--dry-run" in sys.argv
+    changed = await rebalance_schedules(dry_run=dry_run)
+    for entry in changed:
+        (from_cron, from_delay), (to_cron, to_delay) = entry["from"], entry["to"]
+        status = f"failed: {entry['error']}" if "error" in entry else ("would move" if dry_run else "moved")
+        backend = f" (to {entry['backend']})" if "backend" in entry else ""
+        print(f"[Migrate] {entry['id']} {entry['name']}: {status}{backend} '{from_cron}' +{from_delay}s -> '{to_cron}' +{to_delay}s")
+    failed = sum(1 for entry in changed if "error" in entry)
+    print(f"[Migrate] rebalance-schedules {'dry run ' if dry_run else ''}complete: {len(changed) - failed} schedules {'to move' if dry_run else 'moved'}, {failed} failed")
+
+
+MIGRATIONS = {
+    "run-index": migrate_run_index,
+    "compact-runs": migrate_compact_runs,
+    "uptime-buckets": migrate_uptime_buckets,
+    "dashboard": migrate_dashboard,
+    "rebalance-schedules": migrate_rebalance_schedules,
+}
+
+
+async def main():
+    if len(sys.argv) < 2 or sys.argv[1] not in MIGRATIONS:
+        print("Usage: python migrate.py <migration> [--dry-run]")
+        print(f"Available: {', '.join(MIGRATIONS)}")
+        sys.exit(1)
+
+    await MIGRATIONS[sys.argv[1]]()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -1,4 +1,5 @@
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, field_validator
+from pydantic.json_schema import SkipJsonSchema
 
 
 class TestStep(BaseModel):
@@ -50,6 +51,8 @@ class TestResult(BaseModel):
     details: str = Field(description="Overall assessment of the test")
     step_results: list[StepResult] = Field(description="Per-step breakdown")
     error: str | None = Field(default=None, description="Error details if failed")
+    # Filled in by the pipeline, not the evaluator; hidden from the LLM output schema.
+    meta: SkipJsonSchema[dict] = Field(default_factory=dict)
 
 
 class Variable(BaseModel):
@@ -58,6 +61,12 @@ class Variable(BaseModel):
     hidden: bool = Field(default=False, description="Whether to mask the value in the UI")
 
 
+def _check_timeout(v: int | None) -> int | None:
+    if v and v < 30:
+        raise ValueError("timeout_seconds must be 0 (default) or at least 30")
+    return v
+
+
 class CreateTestSuite(BaseModel):
     name: str = Field(min_length=1, max_length=100, description="Test suite name")
     url: str = Field(description="Target URL to test")
@@ -65,6 +74,15 @@ class CreateTestSuite(BaseModel):
     schedule: str = Field(default="*/15 * * * *", description="Cron expression for scheduling")
     alert_webhook: str | None = Field(default=None, description="Webhook URL for failure alerts")
     variables: list[Variable] = Field(default_factory=list, description="Per-test variables for {{placeholder}} substitution")
+    evaluator_mode: str = Field(default="auto", pattern="^(auto|llm|rules)$", description="auto: rule-based verdict, LLM only when ambiguous; llm: always LLM; rules: never LLM")
+    timeout_seconds: int | None = Field(default=None, ge=0, le=1800, description="Time budget for one run (plan, browser, verdict); 0 or unset uses RUN_TIMEOUT_SECONDS")
+    status: str = Field(default="active", pattern="^(active|paused)$", description="paused: store the suite without registering its schedule")
+    stagger: bool = Field(default=True, description="Offset `*/n` and hourly schedules within their period (derived from the test ID) so suites do not all fire at once; explicit times of day are kept")
+
+    @field_validator("timeout_seconds")
+    @classmethod
+    def _timeout_range(cls, v: int | None) -> int | None:
+        return _check_timeout(v)
 
 
 class UpdateTestSuite(BaseModel):
@@ -75,6 +93,20 @@ class UpdateTestSuite(BaseModel):
     alert_webhook: str | None = None
     status: str | None = Field(default=None, pattern="^(active|paused)$")
     variables: list[Variable] | None = None
+    evaluator_mode: str | None = Field(default=None, pattern="^(auto|llm|rules)$")
+    timeout_seconds: int | None = Field(default=None, ge=0, le=1800, description="0 resets to the default run budget")
+    stagger: bool | None = None
+
+    @field_validator("timeout_seconds")
+    @classmethod
+    def _timeout_range(cls, v: int | None) -> int | None:
+        return _check_timeout(v)
+
+
+class BulkOperation(BaseModel):
+    op: str = Field(pattern="^(create|update|delete)$")
+    id: str | None = Field(default=None, description="Test ID, required for update and delete")
+    data: dict = Field(default_factory=dict, description="CreateTestSuite fields (create) or UpdateTestSuite fields (update)")
 
 
 class TestSuiteResponse(BaseModel):
@@ -86,6 +118,11 @@ class TestSuiteResponse(BaseModel):
     schedule_id: str | None = None
     alert_webhook: str | None = None
     variables: list[Variable] = Field(default_factory=list, description="Per-test variables")
+    evaluator_mode: str = "auto"
+    timeout_seconds: int | None = None
+    stagger: bool = True
+    schedule_cron: str | None = Field(default=None, description="Cron QStash runs: `schedule` with the stagger offset applied")
+    schedule_delay: int = Field(default=0, description="Seconds QStash delays each delivery (stagger)")
     status: str = "active"
     last_result: str = "pending"
     last_run_at: str | None = None
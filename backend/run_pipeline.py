@@ -1,11 +1,19 @@
 import asyncio
+import contextlib
 import sys
 import json
+import time
+import argparse
+from pathlib import Path
 
 
 async def main():
+    if len(sys.argv) > 1 and sys.argv[1] == "batch":
+        sys.exit(await run_batch(sys.argv[2:]))
+
     if len(sys.argv) < 3:
         print("Usage: python -m backend.run_pipeline <url> <goal>")
+        print("       python -m backend.run_pipeline batch [--file suites.yaml] [--concurrency N] [--output results.jsonl]")
         print('Example: python -m backend.run_pipeline "https://example.com" "Verify the page has a heading"')
         sys.exit(1)
 
@@ -20,5 +28,138 @@ async def main():
     print(json.dumps(final_result.model_dump(), indent=2))
 
 
+def load_suite_file(path: str) -> list[dict]:
+    """Read suites from a JSON or YAML file: a list, or {"tests": [...]}.
+
+    Each entry needs `url` and `goal`; `name`, `variables`,
+    `evaluator_mode` and `timeout_seconds` are optional.
+    """
+    text = Path(path).read_text()
+    if path.endswith((".yaml", ".yml")):
+        try:
+            import yaml
+        except ImportError:
+            raise SystemExit("YAML suite files need PyYAML: pip install pyyaml")
+        data = yaml.safe_load(text)
+    else:
+        data = json.loads(text)
+
+    suites = data.get("tests", []) if isinstance(data, dict) else data
+    for i, suite in enumerate(suites):
+        if not suite.get("url") or not suite.get("goal"):
+            raise SystemExit(f"{path}: entry {i} needs both 'url' and 'goal'")
+        suite.setdefault("name", f"{path}#{i}")
+    return suites
+
+
+async def load_stored_suites(include_paused: bool) -> list[dict]:
+    from services.test_suite import list_test_suites
+
+    suites = await list_test_suites(newest_first=False)
+    return [s for s in suites if include_paused or s.get("status") != "paused"]
+
+
+def percentile(sorted_values: list[float], pct: float) -> float:
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, -(-len(sorted_values) * pct // 100))
+    return sorted_values[int(rank) - 1]
+
+
+async def run_batch(argv: list[str]) -> int:
+    parser = argparse.ArgumentParser(prog="run_pipeline batch", description="Run many test suites concurrently.")
+    parser.add_argument("--file", help="JSON/YAML file of suites; default: every stored suite in Redis")
+    parser.add_argument("--concurrency", type=int, default=5, help="suites running at once (default 5)")
+    parser.add_argument("--output", help="write JSON Lines here instead of stdout")
+    parser.add_argument("--include-paused", action="store_true", help="also run stored suites that are paused")
+    parser.add_argument("--record", action="store_true", help="store results of stored suites in their run history")
+    args = parser.parse_args(argv)
+
+    from dotenv import load_dotenv
+    load_dotenv(Path(__file__).resolve().parent.parent / ".env")
+
+    from agents.pipeline import run_test
+    from agents.deadline import run_timeout
+    from services.result_store import store_run_result
+    from services.job_queue import run_queue, RunJob
+
+    suites = load_suite_file(args.file) if args.file else await load_stored_suites(args.include_paused)
+    if not suites:
+        print("No suites to run", file=sys.stderr)
+        return 0
+
+    out = open(args.output, "w") if args.output else sys.stdout
+    semaphore = asyncio.Semaphore(max(1, args.concurrency))
+    latencies: list[float] = []
+    counts = {"passed": 0, "failed": 0, "error": 0}
+
+    async def run_one(suite: dict) -> None:
+        async with semaphore:
+            test_id = suite.get("id")
+            # Only a recorded run touches the suite's live state (events
+            # stream, plan cache outcomes), and then under its run lock.
+            record = args.record and test_id
+            started = time.perf_counter()
+            line = {"name": suite.get("name"), "test_id": test_id, "url": suite["url"]}
+            try:
+                if record and not await run_queue.claim(RunJob(test_id=test_id, triggered_by="batch")):
+                    raise RuntimeError("A run of this test is already in progress")
+                try:
+                    plan, browser_result, final_result = await run_test(
+                        url=suite["url"],
+                        goal=suite["goal"],
+                        test_id=test_id if record else None,
+                        evaluator_mode=suite.get("evaluator_mode"),
+                        variables=suite.get("variables"),
+                        timeout_seconds=run_timeout(suite),
+                    )
+                    if record:
+                        await store_run_result(test_id, final_result, plan, browser_result, triggered_by="batch")
+                finally:
+                    if record:
+                        await run_queue.release(test_id)
+                line.update({
+                    "status": "passed" if final_result.passed else "failed",
+                    "steps_passed": final_result.steps_passed,
+                    "steps_total": final_result.steps_total,
+                    "details": final_result.details,
+                    "error": final_result.error,
+                    **final_result.meta,
+                })
+            except Exception as e:
+                line.update({"status": "error", "error": str(e)[:500]})
+
+            elapsed_ms = int((time.perf_counter() - started) * 1000)
+            line["duration_ms"] = elapsed_ms
+            latencies.append(elapsed_ms)
+            counts[line["status"]] += 1
+            print(json.dumps(line), file=out, flush=True)
+
+    started = time.perf_counter()
+    # Pipeline progress goes to stderr so stdout stays valid JSON Lines.
+    with contextlib.redirect_stdout(sys.stderr):
+        await asyncio.gather(*(run_one(suite) for suite in suites))
+        from services.result_store import flush_events
+        await flush_events()
+    wall = time.perf_counter() - started
+
+    if out is not sys.stdout:
+        out.close()
+
+    latencies.sort()
+    print(
+        f"\n[Batch] {len(suites)} suites in {wall:.1f}s "
+        f"({len(suites) / wall * 60:.1f}/min, concurrency {args.concurrency}): "
+        f"{counts['passed']} passed, {counts['failed']} failed, {counts['error']} errors\n"
+        f"[Batch] latency p50 {percentile(latencies, 50) / 1000:.1f}s  "
+        f"p95 {percentile(latencies, 95) / 1000:.1f}s  "
+        f"p99 {percentile(latencies, 99) / 1000:.1f}s  "
+        f"max {latencies[-1] / 1000:.1f}s",
+        file=sys.stderr,
+    )
+    return 0 if counts["failed"] == 0 and counts["error"] == 0 else 1
+
+
 if __name__ == "__main__":
     asyncio.run(main())
@@ -2,6 +2,8 @@ import httpx
 from urllib.parse import urlparse
 from datetime import datetime, timezone
 
+from services.config import get_http_client, request_timeout, WEBHOOK_POOL, WEBHOOK_MAX_CONNECTIONS
+
 
 async def send_alert_webhook(webhook_url: str, test_data: dict, run_record: dict) -> bool:
     if not webhook_url:
@@ -25,16 +27,17 @@ async def send_alert_webhook(webhook_url: str, test_data: dict, run_record: dict
         "timestamp": datetime.now(timezone.utc).isoformat(),
     }
 
+    parsed = urlparse(webhook_url)
     try:
-        async with httpx.AsyncClient(timeout=10) as client:
-            response = await client.post(
-                webhook_url,
-                json=payload,
-                headers={"Content-Type": "application/json"},
-            )
-            return response.status_code < 400
+        client = get_http_client(WEBHOOK_POOL, WEBHOOK_MAX_CONNECTIONS)
+        response = await client.post(
+            webhook_url,
+            json=payload,
+            headers={"Content-Type": "application/json"},
+            timeout=request_timeout(10),
+        )
+        return response.status_code < 400
     except httpx.HTTPError as e:
-        parsed = urlparse(webhook_url)
         sanitized_url = f"{parsed.scheme}://{parsed.netloc}"
         print(f"Alert webhook failed for {sanitized_url}: {e}")
         return False
@@ -1,15 +1,238 @@
 import os
+import time
+import asyncio
+import threading
+import weakref
+import httpx
 from upstash_redis import Redis
-from qstash import QStash
+from upstash_redis.asyncio import Redis as AsyncRedis
+from qstash import QStash, AsyncQStash
 
+from services.metrics import redis_seconds, redis_requests
 
-def get_redis() -> Redis:
-    return Redis(
-        url=os.environ.get("UPSTASH_REDIS_REST_URL", ""),
-        token=os.environ.get("UPSTASH_REDIS_REST_TOKEN", ""),
+REDIS_POOL_SIZE = int(os.environ.get("REDIS_POOL_SIZE", "20"))
+REDIS_KEEPALIVE_EXPIRY = float(os.environ.get("REDIS_KEEPALIVE_EXPIRY", "60"))
+HTTP_CONNECT_TIMEOUT = float(os.environ.get("HTTP_CONNECT_TIMEOUT", "10"))
+HTTP_MAX_CONNECTIONS_PER_HOST = int(os.environ.get("HTTP_MAX_CONNECTIONS_PER_HOST", "10"))
+HTTP_KEEPALIVE_EXPIRY = float(os.environ.get("HTTP_KEEPALIVE_EXPIRY", "60"))
+# Alert webhooks go to user-supplied hosts, so they share one small pool
+# instead of getting a pool per host.
+WEBHOOK_POOL = "webhooks"
+WEBHOOK_MAX_CONNECTIONS = int(os.environ.get("WEBHOOK_MAX_CONNECTIONS", "4"))
+
+_redis: Redis | None = None
+_async_redis: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, AsyncRedis]" = weakref.WeakKeyDictionary()
+_async_qstash: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, AsyncQStash]" = weakref.WeakKeyDictionary()
+_redis_lock = threading.Lock()
+_http_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, dict[str, httpx.AsyncClient]]" = weakref.WeakKeyDictionary()
+_closing: set[asyncio.Task] = set()
+
+_pool_counters = {
+    "clients_created": 0,
+    "client_reuses": 0,
+    "requests": 0,
+    "connections_opened": 0,
+}
+
+
+def _redis_limits() -> httpx.Limits:
+    return httpx.Limits(
+        max_connections=REDIS_POOL_SIZE,
+        max_keepalive_connections=REDIS_POOL_SIZE,
+        keepalive_expiry=REDIS_KEEPALIVE_EXPIRY,
     )
 
 
+def _count_connection(event_name: str, info: dict) -> None:
+    if event_name == "connection.connect_tcp.complete":
+        _pool_counters["connections_opened"] += 1
+
+
+async def _acount_connection(event_name: str, info: dict) -> None:
+    _count_connection(event_name, info)
+
+
+def _trace_request(request: httpx.Request) -> None:
+    _pool_counters["requests"] += 1
+    request.extensions["trace"] = _count_connection
+    request.extensions["started"] = time.perf_counter()
+
+
+async def _atrace_request(request: httpx.Request) -> None:
+    _trace_request(request)
+    request.extensions["trace"] = _acount_connection
+
+
+def _observe_response(response: httpx.Response) -> None:
+    """Time each Upstash round trip (to response headers) for /metrics."""
+    request = response.request
+    kind = "pipeline" if request.url.path.rstrip("/").endswith(("pipeline", "multi-exec")) else "command"
+    started = request.extensions.get("started")
+    if started is not None:
+        redis_seconds.observe(time.perf_counter() - started, kind=kind)
+    redis_requests.inc(kind=kind, status=response.status_code)
+
+
+async def _aobserve_response(response: httpx.Response) -> None:
+    _observe_response(response)
+
+
+def _use_http_client(redis_client: Redis | AsyncRedis, http_client: httpx.Client | httpx.AsyncClient) -> None:
+    """Make an upstash client send its requests through `http_client`.
+
+    upstash-redis has no option for pool limits or httpx event hooks, so the
+    pool size and the Upstash metrics depend on replacing its private
+    `_http._client` (recheck on upstash-redis upgrades). The client it
+    created itself is closed here; an async one on the running loop.
+    """
+    replaced = redis_client._http._client
+    redis_client._http._client = http_client
+    if isinstance(replaced, httpx.AsyncClient):
+        task = asyncio.get_running_loop().create_task(replaced.aclose())
+        _closing.add(task)
+        task.add_done_callback(_closing.discard)
+    else:
+        replaced.close()
+
+
+def _redis_credentials() -> tuple[str, str]:
+    return (
+        os.environ.get("UPSTASH_REDIS_REST_URL", ""),
+        os.environ.get("UPSTASH_REDIS_REST_TOKEN", ""),
+    )
+
+
+def get_redis() -> Redis:
+    """Return the process-wide blocking Redis client.
+
+    The client is created once and keeps a pool of keep-alive HTTPS
+    connections to the Upstash REST endpoint, so repeated calls reuse
+    connections instead of paying a fresh TLS handshake each time.
+    """
+    global _redis
+    if _redis is not None:
+        _pool_counters["client_reuses"] += 1
+        return _redis
+
+    with _redis_lock:
+        if _redis is None:
+            url, token = _redis_credentials()
+            client = Redis(url=url, token=token)
+            _use_http_client(client, httpx.Client(
+                timeout=None,
+                limits=_redis_limits(),
+                event_hooks={"request": [_trace_request], "response": [_observe_response]},
+            ))
+            _redis = client
+            _pool_counters["clients_created"] += 1
+        else:
+            _pool_counters["client_reuses"] += 1
+    return _redis
+
+
+def get_async_redis() -> AsyncRedis:
+    """Return the async Redis client for the running event loop.
+
+    httpx async connections are bound to the loop that opened them, so one
+    pooled client is kept per loop (in practice: one for the FastAPI app).
+    """
+    loop = asyncio.get_running_loop()
+    client = _async_redis.get(loop)
+    if client is not None:
+        _pool_counters["client_reuses"] += 1
+        return client
+
+    url, token = _redis_credentials()
+    client = AsyncRedis(url=url, token=token)
+    _use_http_client(client, httpx.AsyncClient(
+        timeout=None,
+        limits=_redis_limits(),
+        event_hooks={"request": [_atrace_request], "response": [_aobserve_response]},
+    ))
+    _async_redis[loop] = client
+    _pool_counters["clients_created"] += 1
+    return client
+
+
+def _open_connections(redis_client) -> int:
+    http_client = getattr(getattr(redis_client, "_http", None), "_client", None)
+    pool = getattr(getattr(http_client, "_transport", None), "_pool", None)
+    return len(getattr(pool, "connections", []) or [])
+
+
+def redis_pool_stats() -> dict:
+    """Snapshot of the shared Redis client pool counters."""
+    open_connections = 0
+    if _redis is not None:
+        open_connections += _open_connections(_redis)
+    for client in list(_async_redis.values()):
+        open_connections += _open_connections(client)
+
+    requests = _pool_counters["requests"]
+    opened = _pool_counters["connections_opened"]
+    return {
+        "pool_size": REDIS_POOL_SIZE,
+        "open_connections": open_connections,
+        "clients_created": _pool_counters["clients_created"],
+        "client_reuses": _pool_counters["client_reuses"],
+        "requests": requests,
+        "connections_opened": opened,
+        "connections_reused": max(0, requests - opened),
+    }
+
+
+async def close_redis() -> None:
+    """Close every pooled Redis client (called on app shutdown)."""
+    global _redis
+    with _redis_lock:
+        if _redis is not None:
+            _redis.close()
+            _redis = None
+
+    client = _async_redis.pop(asyncio.get_running_loop(), None)
+    if client is not None:
+        await client.close()
+
+
+def get_http_client(host: str, max_connections: int = HTTP_MAX_CONNECTIONS_PER_HOST) -> httpx.AsyncClient:
+    """Return the shared outbound HTTP client for `host` on the running loop.
+
+    One keep-alive pool per fixed upstream (TinyFish, the Anthropic probe
+    in /api/test/agent) plus one shared WEBHOOK_POOL for all alert webhooks,
+    so each gets its own connection limit and a burst of webhooks cannot
+    starve TinyFish sessions. Planner and evaluator calls do not use these:
+    pydantic-ai's Anthropic provider keeps its own client. Never key this by a user-supplied host: pools are kept for
+    the life of the loop. The read timeout is left to each request: SSE
+    streams need a long one.
+    """
+    loop = asyncio.get_running_loop()
+    clients = _http_clients.setdefault(loop, {})
+    client = clients.get(host)
+    if client is None or client.is_closed:
+        client = httpx.AsyncClient(
+            timeout=httpx.Timeout(30.0, connect=HTTP_CONNECT_TIMEOUT),
+            limits=httpx.Limits(
+                max_connections=max_connections,
+                max_keepalive_connections=max_connections,
+                keepalive_expiry=HTTP_KEEPALIVE_EXPIRY,
+            ),
+        )
+        clients[host] = client
+    return client
+
+
+def request_timeout(read: float) -> httpx.Timeout:
+    """Timeout for one request on a shared client: short connect, given read."""
+    return httpx.Timeout(read, connect=HTTP_CONNECT_TIMEOUT)
+
+
+async def close_http_clients() -> None:
+    """Close the shared outbound HTTP clients (called on app shutdown)."""
+    clients = _http_clients.pop(asyncio.get_running_loop(), {})
+    for client in clients.values():
+        await client.aclose()
+
+
 def get_qstash() -> QStash:
     token = os.environ.get("QSTASH_TOKEN", "")
     url = os.environ.get("QSTASH_URL")
@@ -18,6 +241,18 @@ def get_qstash() -> QStash:
     return QStash(token)
 
 
+def get_async_qstash() -> AsyncQStash:
+    """Return the async QStash client for the running event loop."""
+    loop = asyncio.get_running_loop()
+    client = _async_qstash.get(loop)
+    if client is None:
+        token = os.environ.get("QSTASH_TOKEN", "")
+        url = os.environ.get("QSTASH_URL")
+        client = AsyncQStash(token, base_url=url) if url else AsyncQStash(token)
+        _async_qstash[loop] = client
+    return client
+
+
 def get_public_url() -> str:
     domain = os.environ.get("REPLIT_DEV_DOMAIN", "")
     if domain:
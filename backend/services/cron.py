@@ -0,0 +1,185 @@
+import hashlib
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+from functools import lru_cache
+
+# Standard 5-field cron (minute hour day-of-month month day-of-week), as
+# QStash schedules use it, evaluated in UTC. Fields take `*`, numbers,
+# names (jan, mon), ranges, steps and lists; `@hourly`-style macros too.
+FIELDS = (
+    ("minute", 0, 59),
+    ("hour", 0, 23),
+    ("day of month", 1, 31),
+    ("month", 1, 12),
+    ("day of week", 0, 7),
+)
+NAMES = {
+    3: {m: i for i, m in enumerate(("jan", "feb", "mar", "apr", "may", "jun", "jul", "aug", "sep", "oct", "nov", "dec"), 1)},
+    4: {d: i for i, d in enumerate(("sun", "mon", "tue", "wed", "thu", "fri", "sat"))},
+}
+MACROS = {
+    "@yearly": "0 0 1 1 *",
+    "@annually": "0 0 1 1 *",
+    "@monthly": "0 0 1 * *",
+    "@weekly": "0 0 * * 0",
+    "@daily": "0 0 * * *",
+    "@midnight": "0 0 * * *",
+    "@hourly": "0 * * * *",
+}
+# next_fire gives up after this many skips (e.g. "0 0 30 2 *" never fires).
+MAX_SEARCH_STEPS = 5000
+
+
+def _value(token: str, index: int) -> int:
+    names = NAMES.get(index, {})
+    if token.lower() in names:
+        return names[token.lower()]
+    if not token.isdigit():
+        raise ValueError(f"bad {FIELDS[index][0]} value {token!r}")
+    return int(token)
+
+
+def _parse_field(text: str, index: int) -> frozenset[int]:
+    name, low, high = FIELDS[index]
+    values: set[int] = set()
+    for part in text.split(","):
+        base, _, step_text = part.partition("/")
+        step = int(step_text) if step_text.isdigit() else None
+        if step_text and not step:
+            raise ValueError(f"bad step in {name} field {part!r}")
+        if base == "*":
+            start, end = low, high
+        elif "-" in base:
+            first, _, last = base.partition("-")
+            start, end = _value(first, index), _value(last, index)
+        else:
+            start = _value(base, index)
+            end = high if step else start
+        if not (low <= start <= high and low <= end <= high) or start > end:
+            raise ValueError(f"{name} field {part!r} out of range {low}-{high}")
+        values.update(range(start, end + 1, step or 1))
+    if index == 4 and 7 in values:
+        values = (values - {7}) | {0}
+    return frozenset(values)
+
+
+class CronExpr:
+    """A compiled cron expression: the allowed values of each field."""
+
+    def __init__(self, expr: str):
+        self.expr = expr
+        fields = MACROS.get(expr.strip().lower(), expr).split()
+        if len(fields) != 5:
+            raise ValueError(f"cron expression needs 5 fields, got {len(fields)}: {expr!r}")
+        self.minutes, self.hours, self.days, self.months, self.weekdays = (
+            _parse_field(text, i) for i, text in enumerate(fields)
+        )
+        # Vixie cron: when both day fields are restricted, either may match.
+        self.day_or = not fields[2].startswith("*") and not fields[4].startswith("*")
+
+    def _day_matches(self, dt: datetime) -> bool:
+        in_month = dt.day in self.days
+        in_week = (dt.weekday() + 1) % 7 in self.weekdays
+        return in_month or in_week if self.day_or else in_month and in_week
+
+    def matches(self, dt: datetime) -> bool:
+        return (
+            dt.minute in self.minutes
+            and dt.hour in self.hours
+            and dt.month in self.months
+            and self._day_matches(dt)
+        )
+
+    def next_fire(self, after: datetime) -> datetime | None:
+        """First firing time strictly after `after` (UTC), or None if it never fires."""
+        t = after.astimezone(timezone.utc).replace(second=0, microsecond=0) + timedelta(minutes=1)
+        for _ in range(MAX_SEARCH_STEPS):
+            if t.month not in self.months:
+                t = (t.replace(day=1, hour=0, minute=0) + timedelta(days=32)).replace(day=1)
+            elif not self._day_matches(t):
+                t = t.replace(hour=0, minute=0) + timedelta(days=1)
+            elif t.hour not in self.hours:
+                t = t.replace(minute=0) + timedelta(hours=1)
+            else:
+                minute = min((m for m in self.minutes if m >= t.minute), default=None)
+                if minute is None:
+                    t = t.replace(minute=0) + timedelta(hours=1)
+                else:
+                    return t.replace(minute=minute)
+        return None
+
+
+@lru_cache(maxsize=1024)
+def compile_cron(expr: str) -> CronExpr:
+    """Parse `expr` once; raises ValueError when it is not a valid cron expression."""
+    return CronExpr(expr)
+
+
+def next_run_at(expr: str | None, after: datetime | None = None) -> datetime | None:
+    """Next firing time of a schedule, or None when it is missing or invalid."""
+    if not expr:
+        return None
+    try:
+        return compile_cron(expr).next_fire(after or datetime.now(timezone.utc))
+    except ValueError:
+        return None
+
+
+def stagger(expr: str, key: str) -> tuple[str, int]:
+    """Spread a schedule across its period with an offset derived from `key`.
+
+    Returns (cron, delay_seconds). Only the parts that say "every n" are
+    moved: a `*/n` minute becomes an offset minute (`*/15` → `7-59/15`), a
+    `*/n` hour an offset hour, and the `0` minute of an hourly or `*/n`-hour
+    schedule (`0 * * * *`, `0 */6 * * *`) some other minute. A time of day
+    the user picked (`0 9 * * *`, `30 14 * * 1-5`) keeps its hour and
+    minute, and ranges and lists are left alone. Every schedule gets a
+    0-59s delivery delay, so its minute never changes. The same key always
+    gets the same offsets.
+    """
+    try:
+        compile_cron(expr)
+    except ValueError:
+        return expr, 0
+    fields = MACROS.get(expr.strip().lower(), expr).split()
+    digest = int.from_bytes(hashlib.sha256(key.encode()).digest()[:8], "big")
+    minute_seed, hour_seed, second = digest % 3600, digest // 3600 % 3600, digest // 12960000 % 60
+
+    minute, hour = fields[0], fields[1]
+    hour_step = hour.startswith("*/") and hour[2:].isdigit()
+    if minute.startswith("*/") and minute[2:].isdigit():
+        step = int(minute[2:])
+        fields[0] = f"{minute_seed % step}-59/{step}"
+    elif minute == "0" and (hour == "*" or hour_step):
+        fields[0] = str(minute_seed % 60)
+    if hour_step:
+        step = int(hour[2:])
+        fields[1] = f"{hour_seed % step}-23/{step}"
+    return " ".join(fields), second
+
+
+def next_fires(schedules: list[str], after: datetime | None = None) -> dict[str, datetime | None]:
+    """Next firing time of each distinct schedule (computed once per expression)."""
+    after = after or datetime.now(timezone.utc)
+    return {expr: next_run_at(expr, after) for expr in set(schedules)}
+
+
+def load_forecast(schedules: list[str], start: datetime, minutes: int) -> list[int]:
+    """Scheduled runs per minute for `minutes` minutes from `start`.
+
+    Suites are grouped by expression, so each distinct schedule is matched
+    against the window once and weighted by how many suites share it.
+    Invalid expressions are skipped.
+    """
+    start = start.astimezone(timezone.utc).replace(second=0, microsecond=0)
+    window = [start + timedelta(minutes=i) for i in range(minutes)]
+    counts = [0] * minutes
+    for expr, suites in Counter(schedules).items():
+        try:
+            cron = compile_cron(expr)
+        except ValueError:
+            continue
+        for i, dt in enumerate(window):
+            if cron.matches(dt):
+                counts[i] += suites
+    return counts
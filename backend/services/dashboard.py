@@ -0,0 +1,198 @@
+import os
+import json
+import time
+from datetime import datetime, timedelta, timezone
+
+from services.config import get_async_redis
+from services.cron import next_fires, load_forecast
+
+# One hash holds everything the dashboard shows, maintained on write:
+# `{test_id}` → the suite (name, url, status, schedule), written by
+# create/update; `{test_id}:run` → its latest run, written by
+# store_run_result. Each writer replaces only its own field, so concurrent
+# writers never need a read-modify-write. `_built` marks a complete hash.
+# The queue_* helpers only append to a pipeline: call
+# invalidate_dashboard_cache() once it has run.
+DASHBOARD_KEY = "dashboard"
+BUILT = "_built"
+DASHBOARD_CACHE_SECONDS = float(os.environ.get("DASHBOARD_CACHE_SECONDS", "2"))
+RECENT_RUNS = 5
+FORECAST_PEAKS = 5
+
+_cache: dict = {"expires": 0.0, "summary": None, "generation": 0}
+
+
+def invalidate_dashboard_cache() -> None:
+    """Drop the cached summary after dashboard rows were written."""
+    _cache["expires"] = 0.0
+    _cache["generation"] += 1
+
+
+def _suite_row(test: dict) -> str:
+    row = {k: test.get(k) for k in ("name", "url", "status", "schedule")}
+    # the cron and delivery delay the scheduler actually runs (staggered)
+    row["cron"] = test.get("schedule_cron") or test.get("schedule")
+    row["delay"] = int(test.get("schedule_delay") or 0)
+    return json.dumps(row)
+
+
+def _run_row(last_result: str, last_run_at: str, record: dict | None = None) -> str:
+    record = record or {}
+    return json.dumps({
+        "last_result": last_result,
+        "last_run_at": last_run_at,
+        **{k: record.get(k) for k in ("steps_passed", "steps_total", "duration_ms", "triggered_by")},
+    })
+
+
+def queue_suite(pipe, test: dict) -> None:
+    """Append the dashboard row of a created or updated suite to a write pipeline."""
+    pipe.hset(DASHBOARD_KEY, values={test["id"]: _suite_row(test)})
+
+
+def queue_run(pipe, test_id: str, last_result: str, last_run_at: str, record: dict | None = None) -> None:
+    """Append a suite's latest run (or run error) to a write pipeline."""
+    pipe.hset(DASHBOARD_KEY, values={f"{test_id}:run": _run_row(last_result, last_run_at, record)})
+
+
+def queue_remove(pipe, test_id: str) -> None:
+    pipe.hdel(DASHBOARD_KEY, test_id, f"{test_id}:run")
+
+
+async def rebuild_dashboard() -> int:
+    """Fill the dashboard hash from the suites and their latest runs.
+
+    Uses HSETNX, so rows written by live writers meanwhile win over this
+    snapshot. Returns the number of suites written.
+    """
+    from services.test_suite import list_test_suites
+    from services.result_store import load_runs
+
+    redis = get_async_redis()
+    if not await redis.set("dashboard:rebuild", "1", nx=True, ex=120):
+        return 0
+
+    tests = await list_test_suites()
+    pipe = redis.pipeline()
+    for t in tests:
+        pipe.hsetnx(DASHBOARD_KEY, t["id"], _suite_row(t))
+        if t.get("last_run_at"):
+            latest = await redis.zrevrange(f"results:{t['id']}", 0, 0)
+            records = await load_runs(t["id"], latest)
+            row = _run_row(t.get("last_result"), t["last_run_at"], records[0] if records else None)
+            pipe.hsetnx(DASHBOARD_KEY, f"{t['id']}:run", row)
+    pipe.hset(DASHBOARD_KEY, values={BUILT: datetime.now(timezone.utc).isoformat()})
+    await pipe.exec()
+    await redis.delete("dashboard:rebuild")
+    return len(tests)
+
+
+def _split_rows(rows: dict) -> tuple[dict, dict]:
+    """Dashboard hash → ({test_id: suite}, {test_id: latest run})."""
+    suites, runs = {}, {}
+    for field, raw in rows.items():
+        if field == BUILT:
+            continue
+        try:
+            value = json.loads(raw)
+        except (json.JSONDecodeError, TypeError):
+            continue
+        if field.endswith(":run"):
+            runs[field[:-4]] = value
+        else:
+            suites[field] = value
+    return suites, runs
+
+
+def _active_schedules(suites: dict) -> list[str]:
+    return [s.get("cron") or s["schedule"] for s in suites.values() if s.get("status") == "active" and s.get("schedule")]
+
+
+def summarize(rows: dict, now: datetime | None = None) -> dict:
+    """The /api/dashboard payload from the raw dashboard hash."""
+    now = now or datetime.now(timezone.utc)
+    suites, runs = _split_rows(rows)
+
+    counts = {"active": 0, "paused": 0, "passed": 0, "failed": 0, "pending": 0}
+    for test_id, suite in suites.items():
+        if suite.get("status") in counts:
+            counts[suite["status"]] += 1
+        last_result = runs.get(test_id, {}).get("last_result") or "pending"
+        if last_result in counts:
+            counts[last_result] += 1
+
+    ran = sorted(
+        (test_id for test_id in suites if runs.get(test_id, {}).get("last_run_at")),
+        key=lambda test_id: runs[test_id]["last_run_at"],
+        reverse=True,
+    )
+    recent_runs = [
+        {
+            "test_id": test_id,
+            "test_name": suites[test_id].get("name"),
+            "test_url": suites[test_id].get("url"),
+            **runs[test_id],
+        }
+        for test_id in ran[:RECENT_RUNS]
+    ]
+    last_run_at_global = runs[ran[0]]["last_run_at"] if ran else None
+
+    active = [s for s in suites.values() if s.get("status") == "active" and s.get("schedule")]
+    fires = next_fires([s.get("cron") or s["schedule"] for s in active], now)
+    upcoming = [
+        fire + timedelta(seconds=int(s.get("delay") or 0))
+        for s in active
+        if (fire := fires.get(s.get("cron") or s["schedule"]))
+    ]
+    next_run = min(upcoming) if upcoming else None
+
+    return {
+        "total_tests": len(suites),
+        "active_tests": counts["active"],
+        "paused_tests": counts["paused"],
+        "passing": counts["passed"],
+        "failing": counts["failed"],
+        "pending": counts["pending"],
+        "recent_runs": recent_runs,
+        "last_run_at_global": last_run_at_global,
+        "next_run_at": next_run.isoformat() if next_run else None,
+        "next_run_approx_minutes": int((next_run - now).total_seconds() // 60) if next_run else None,
+    }
+
+
+async def _load_rows() -> dict:
+    redis = get_async_redis()
+    rows = await redis.hgetall(DASHBOARD_KEY) or {}
+    if BUILT not in rows:
+        await rebuild_dashboard()
+        rows = await redis.hgetall(DASHBOARD_KEY) or {}
+    return rows
+
+
+async def get_dashboard_summary() -> dict:
+    """Dashboard payload from one HGETALL, cached in-process for DASHBOARD_CACHE_SECONDS."""
+    now = time.monotonic()
+    if _cache["summary"] is not None and now < _cache["expires"]:
+        return _cache["summary"]
+
+    generation = _cache["generation"]
+    summary = summarize(await _load_rows())
+    # A write that landed while this read was in flight may be missing from it.
+    if generation == _cache["generation"]:
+        _cache.update(summary=summary, expires=now + DASHBOARD_CACHE_SECONDS)
+    return summary
+
+
+async def get_load_forecast(minutes: int) -> dict:
+    """Scheduled runs per minute over the next `minutes` minutes, with the busiest minutes."""
+    suites, _ = _split_rows(await _load_rows())
+    start = datetime.now(timezone.utc).replace(second=0, microsecond=0) + timedelta(minutes=1)
+    counts = load_forecast(_active_schedules(suites), start, minutes)
+    busiest = sorted((i for i, n in enumerate(counts) if n), key=lambda i: (-counts[i], i))[:FORECAST_PEAKS]
+    return {
+        "start": start.isoformat(),
+        "minutes": minutes,
+        "runs_per_minute": counts,
+        "total_runs": sum(counts),
+        "peaks": [{"at": (start + timedelta(minutes=i)).isoformat(), "runs": counts[i]} for i in busiest],
+    }
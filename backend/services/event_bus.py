@@ -0,0 +1,119 @@
+import os
+import asyncio
+from contextlib import asynccontextmanager
+
+from services.config import get_async_redis
+
+EVENT_POLL_SECONDS = float(os.environ.get("EVENT_POLL_SECONDS", "1"))
+SUBSCRIBER_QUEUE_MAX = 1000
+
+
+def stream_id_key(entry_id: str) -> tuple[int, int]:
+    ms, _, seq = entry_id.partition("-")
+    return int(ms or 0), int(seq or 0)
+
+
+def fields_to_dict(fields) -> dict:
+    if isinstance(fields, dict):
+        return fields
+    d = {}
+    for i in range(0, len(fields) - 1, 2):
+        d[fields[i]] = fields[i + 1]
+    return d
+
+
+class _Topic:
+    def __init__(self, cursor: str):
+        self.subscribers: set[asyncio.Queue] = set()
+        # Read position of the shared reader. Local publishes do not move it,
+        # so entries written meanwhile by other processes are still picked up.
+        self.cursor = cursor
+        # Ids already delivered by publish(), skipped when the reader sees them.
+        self.published: set[str] = set()
+
+
+class EventBus:
+    """Fans live run events out to SSE clients in this process.
+
+    Events written by this process are published straight to subscribers
+    by log_event. Events written by other processes are picked up by one
+    shared reader that polls XREAD for every watched stream in a single
+    request, so the Redis cost is one request per interval no matter how
+    many clients or tests are being watched. Upstash's REST API has no
+    blocking XREAD, hence the polling.
+    """
+
+    def __init__(self):
+        self._topics: dict[str, _Topic] = {}
+        self._reader: asyncio.Task | None = None
+        self.stats = {"published": 0, "polled": 0, "delivered": 0, "dropped": 0}
+
+    @asynccontextmanager
+    async def subscribe(self, test_id: str, after_id: str = "0-0"):
+        queue: asyncio.Queue = asyncio.Queue(maxsize=SUBSCRIBER_QUEUE_MAX)
+        topic = self._topics.get(test_id)
+        if topic is None:
+            topic = self._topics[test_id] = _Topic(after_id)
+        topic.subscribers.add(queue)
+        if self._reader is None or self._reader.done():
+            self._reader = asyncio.create_task(self._read())
+        try:
+            yield queue
+        finally:
+            topic.subscribers.discard(queue)
+            if not topic.subscribers:
+                self._topics.pop(test_id, None)
+
+    def publish(self, test_id: str, entry_id: str, fields: dict) -> None:
+        """Deliver an event that was just written to the stream."""
+        topic = self._topics.get(test_id)
+        if topic is None:
+            return
+        self.stats["published"] += 1
+        if len(topic.published) >= SUBSCRIBER_QUEUE_MAX:
+            cursor = stream_id_key(topic.cursor)
+            topic.published = {i for i in topic.published if stream_id_key(i) > cursor}
+        topic.published.add(entry_id)
+        self._fan_out(topic, entry_id, fields)
+
+    def _on_read(self, test_id: str, entry_id: str, fields: dict) -> None:
+        topic = self._topics.get(test_id)
+        if topic is None:
+            return
+        topic.cursor = entry_id
+        if entry_id in topic.published:
+            topic.published.discard(entry_id)
+            return
+        self._fan_out(topic, entry_id, fields)
+
+    def _fan_out(self, topic: _Topic, entry_id: str, fields: dict) -> None:
+        for queue in list(topic.subscribers):
+            try:
+                queue.put_nowait((entry_id, fields))
+                self.stats["delivered"] += 1
+            except asyncio.QueueFull:
+                self.stats["dropped"] += 1
+
+    async def _read(self) -> None:
+        while self._topics:
+            streams = {f"events:{test_id}": topic.cursor for test_id, topic in self._topics.items()}
+            try:
+                response = await get_async_redis().xread(streams, count=100)
+                self.stats["polled"] += 1
+                for key, entries in response or []:
+                    test_id = key.split(":", 1)[1]
+                    for entry_id, fields in entries:
+                        self._on_read(test_id, entry_id, fields_to_dict(fields))
+            except Exception as e:
+                print(f"[EventBus] Stream read failed: {e}")
+            await asyncio.sleep(EVENT_POLL_SECONDS)
+
+    def snapshot(self) -> dict:
+        return {
+            "topics": len(self._topics),
+            "subscribers": sum(len(t.subscribers) for t in self._topics.values()),
+            **self.stats,
+        }
+
+
+event_bus = EventBus()
@@ -0,0 +1,81 @@
+import os
+import asyncio
+from collections import deque
+
+from services.config import get_async_redis
+
+EVENT_FLUSH_SECONDS = float(os.environ.get("EVENT_FLUSH_MS", "50")) / 1000
+EVENT_FLUSH_TIMEOUT = float(os.environ.get("EVENT_FLUSH_TIMEOUT", "2"))
+EVENT_BUFFER_MAX = int(os.environ.get("EVENT_BUFFER_MAX", "2000"))
+EVENT_BATCH_SIZE = 100
+
+
+class EventWriter:
+    """Buffers live events in memory and writes them in pipelined batches.
+
+    enqueue() never waits on Redis. A single flusher drains the buffer in
+    FIFO order every EVENT_FLUSH_MS, so events keep the order they were
+    logged in. When Redis is slow or down, batches that fail or time out
+    are dropped and counted rather than backing up into run_test.
+    """
+
+    def __init__(self):
+        self._buffer: deque[tuple[str, dict]] = deque()
+        self._pending: asyncio.Event | None = None
+        self._lock: asyncio.Lock | None = None
+        self._task: asyncio.Task | None = None
+        self.stats = {"queued": 0, "written": 0, "dropped": 0, "flushes": 0, "failed_flushes": 0}
+
+    def _ensure_flusher(self) -> None:
+        loop = asyncio.get_running_loop()
+        if self._task is None or self._task.done() or self._task.get_loop() is not loop:
+            self._pending = asyncio.Event()
+            self._lock = asyncio.Lock()
+            self._task = loop.create_task(self._run())
+
+    def enqueue(self, test_id: str, fields: dict) -> None:
+        if len(self._buffer) >= EVENT_BUFFER_MAX:
+            self.stats["dropped"] += 1
+            return
+        self._ensure_flusher()
+        self._buffer.append((test_id, fields))
+        self.stats["queued"] += 1
+        self._pending.set()
+
+    async def _run(self) -> None:
+        while True:
+            await self._pending.wait()
+            await asyncio.sleep(EVENT_FLUSH_SECONDS)
+            await self.flush()
+
+    async def flush(self) -> None:
+        """Write everything buffered so far (called at run end and shutdown)."""
+        if self._lock is None:
+            return
+        from services.event_bus import event_bus
+        from services.retention import EVENTS_MAXLEN
+
+        async with self._lock:
+            while self._buffer:
+                batch = [self._buffer.popleft() for _ in range(min(EVENT_BATCH_SIZE, len(self._buffer)))]
+                pipe = get_async_redis().pipeline()
+                for test_id, fields in batch:
+                    pipe.xadd(f"events:{test_id}", "*", data=fields, maxlen=EVENTS_MAXLEN)
+                try:
+                    entry_ids = await asyncio.wait_for(pipe.exec(), EVENT_FLUSH_TIMEOUT)
+                except Exception as e:
+                    self.stats["failed_flushes"] += 1
+                    self.stats["dropped"] += len(batch)
+                    print(f"[EventLog] Dropped {len(batch)} events, flush failed: {e!r}")
+                    continue
+                self.stats["flushes"] += 1
+                self.stats["written"] += len(batch)
+                for (test_id, fields), entry_id in zip(batch, entry_ids):
+                    event_bus.publish(test_id, entry_id, fields)
+            self._pending.clear()
+
+    def snapshot(self) -> dict:
+        return {"buffered": len(self._buffer), **self.stats}
+
+
+event_writer = EventWriter()
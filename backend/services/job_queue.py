@@ -0,0 +1,231 @@
+import os
+import json
+import time
+import uuid
+import asyncio
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+
+from services.config import get_async_redis
+
+RUN_WORKERS = int(os.environ.get("RUN_WORKERS", "4"))
+RUN_QUEUE_MAX = int(os.environ.get("RUN_QUEUE_MAX", "100"))
+# A run lock outlives its holder by at most this long: holders renew their
+# locks every RUN_LOCK_TTL / 3 seconds for as long as the run is queued or
+# running, however long that is.
+RUN_LOCK_TTL = int(os.environ.get("RUN_LOCK_TTL", "900"))
+# Extra time past a run's own deadline before the worker cancels it outright
+# (run_test normally ends itself with a partial result well before this).
+RUN_DEADLINE_GRACE = int(os.environ.get("RUN_DEADLINE_GRACE", "60"))
+
+
+@dataclass
+class RunJob:
+    test_id: str
+    triggered_by: str = "qstash"
+    job_id: str = field(default_factory=lambda: str(uuid.uuid4())[:8])
+    enqueued_at: float = field(default_factory=time.time)
+
+
+class QueueFull(Exception):
+    pass
+
+
+class RunQueue:
+    """Bounded in-process queue that runs scheduled tests on a worker pool.
+
+    A test is in flight from the moment it is enqueued until its run has
+    been stored. While in flight, further triggers for the same test are
+    dropped — locally via `_in_flight` and across replicas via a
+    `runlock:{test_id}` key. The key's TTL is only a crash safety net: a
+    background task keeps renewing it while the test is in flight.
+
+    Manual runs, which do not go through the queue, take the same lock
+    with claim() and give it back with release().
+    """
+
+    def __init__(self, workers: int = RUN_WORKERS, max_size: int = RUN_QUEUE_MAX):
+        self.workers = workers
+        self.max_size = max_size
+        self._queue: asyncio.Queue[RunJob] | None = None
+        self._tasks: list[asyncio.Task] = []
+        self._renewer: asyncio.Task | None = None
+        self._in_flight: set[str] = set()
+        self._running = 0
+        self.stats = {
+            "enqueued": 0,
+            "completed": 0,
+            "failed": 0,
+            "deduplicated": 0,
+            "rejected": 0,
+            "wait_ms_total": 0,
+        }
+
+    def start(self) -> None:
+        if self._tasks:
+            return
+        self._queue = asyncio.Queue(maxsize=self.max_size)
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+        self._renewer = asyncio.create_task(self._renew_locks())
+
+    async def stop(self) -> None:
+        tasks = [*self._tasks, self._renewer] if self._renewer else self._tasks
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._tasks, self._renewer = [], None
+
+        # Jobs still waiting are dropped; free their locks so the next
+        # QStash delivery (or another replica) can pick the test up.
+        dropped = []
+        while self._queue is not None and not self._queue.empty():
+            dropped.append(self._queue.get_nowait().test_id)
+        if dropped:
+            await get_async_redis().delete(*[f"runlock:{test_id}" for test_id in dropped])
+        self._in_flight.clear()
+        self._queue = None
+
+    async def claim(self, job: RunJob) -> bool:
+        """Take the test's run lock, here and across replicas. False if it has a run in flight."""
+        self.start()
+        if job.test_id in self._in_flight:
+            self.stats["deduplicated"] += 1
+            return False
+
+        self._in_flight.add(job.test_id)
+        try:
+            locked = await get_async_redis().set(f"runlock:{job.test_id}", job.job_id, nx=True, ex=RUN_LOCK_TTL)
+        except Exception:
+            self._in_flight.discard(job.test_id)
+            raise
+        if not locked:
+            self._in_flight.discard(job.test_id)
+            self.stats["deduplicated"] += 1
+            return False
+        return True
+
+    async def release(self, test_id: str) -> None:
+        self._in_flight.discard(test_id)
+        try:
+            await get_async_redis().delete(f"runlock:{test_id}")
+        except Exception as e:
+            print(f"[RunQueue] Failed to release run lock for {test_id}: {e}")
+
+    async def enqueue(self, job: RunJob) -> bool:
+        """Queue a run. Returns False if the test already has one in flight.
+
+        Raises QueueFull when the queue is at capacity so the caller can ask
+        QStash to retry later instead of piling up work.
+        """
+        self.start()
+        if self._queue.full() and job.test_id not in self._in_flight:
+            self.stats["rejected"] += 1
+            raise QueueFull(f"Run queue is full ({self.max_size} jobs)")
+        if not await self.claim(job):
+            return False
+
+        try:
+            self._queue.put_nowait(job)
+        except asyncio.QueueFull:
+            await self.release(job.test_id)
+            self.stats["rejected"] += 1
+            raise QueueFull(f"Run queue is full ({self.max_size} jobs)")
+        self.stats["enqueued"] += 1
+        return True
+
+    def snapshot(self) -> dict:
+        started = self.stats["completed"] + self.stats["failed"] + self._running
+        return {
+            "avg_wait_ms": round(self.stats["wait_ms_total"] / started) if started else 0,
+            "workers": self.workers,
+            "max_size": self.max_size,
+            "depth": self._queue.qsize() if self._queue else 0,
+            "running": self._running,
+            "in_flight": len(self._in_flight),
+            **self.stats,
+        }
+
+    async def _worker(self) -> None:
+        while True:
+            job = await self._queue.get()
+            self._running += 1
+            self.stats["wait_ms_total"] += int((time.time() - job.enqueued_at) * 1000)
+            try:
+                await execute_scheduled_run(job.test_id, job.triggered_by)
+                self.stats["completed"] += 1
+            except Exception as e:
+                self.stats["failed"] += 1
+                print(f"[RunQueue] Job {job.job_id} for {job.test_id} failed: {e}")
+            finally:
+                self._running -= 1
+                await self.release(job.test_id)
+                self._queue.task_done()
+
+    async def _renew_locks(self) -> None:
+        """Push back the TTL of every lock held here, so long queue waits and runs keep theirs."""
+        while True:
+            await asyncio.sleep(RUN_LOCK_TTL / 3)
+            if not self._in_flight:
+                continue
+            pipe = get_async_redis().pipeline()
+            for test_id in self._in_flight:
+                pipe.expire(f"runlock:{test_id}", RUN_LOCK_TTL)
+            try:
+                await pipe.exec()
+            except Exception as e:
+                print(f"[RunQueue] Failed to renew run locks: {e}")
+
+
+run_queue = RunQueue()
+
+
+async def execute_scheduled_run(test_id: str, triggered_by: str = "qstash") -> dict | None:
+    """Run the pipeline for a stored test, persist the result and alert on failure."""
+    from services.test_suite import get_test_suite
+    from services.result_store import store_run_result, log_event
+    from services.alert import send_alert_webhook
+    from agents.pipeline import run_test
+    from agents.deadline import run_timeout
+
+    test = await get_test_suite(test_id)
+    if not test or test.get("status") == "paused":
+        return None
+
+    redis = get_async_redis()
+    try:
+        plan, browser_result, final_result = await asyncio.wait_for(
+            run_test(url=test["url"], goal=test["goal"], test_id=test_id),
+            run_timeout(test) + RUN_DEADLINE_GRACE,
+        )
+
+        run_record = await store_run_result(
+            test_id=test_id,
+            final_result=final_result,
+            plan=plan,
+            browser_result=browser_result,
+            triggered_by=triggered_by,
+        )
+
+        if not final_result.passed and test.get("alert_webhook"):
+            alert_sent = await send_alert_webhook(test["alert_webhook"], test, run_record)
+            if alert_sent:
+                incidents = await redis.lrange(f"incidents:{test_id}", 0, -1)
+                for idx, raw in enumerate(incidents):
+                    incident = json.loads(raw)
+                    if incident.get("run_id") == run_record["run_id"]:
+                        incident["alert_sent"] = True
+                        await redis.lset(f"incidents:{test_id}", idx, json.dumps(incident))
+                        break
+
+        return run_record
+
+    except Exception as e:
+        await log_event(test_id, "error", f"Pipeline error: {str(e)}")
+        from services.dashboard import queue_run, invalidate_dashboard_cache
+        now = datetime.now(timezone.utc).isoformat()
+        pipe = redis.pipeline()
+        pipe.hset(f"test:{test_id}", values={"last_result": "error", "last_run_at": now})
+        queue_run(pipe, test_id, "error", now)
+        await pipe.exec()
+        invalidate_dashboard_cache()
+        raise
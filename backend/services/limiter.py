@@ -0,0 +1,165 @@
+import os
+import time
+import uuid
+import random
+import asyncio
+from contextlib import asynccontextmanager
+
+from services.config import get_async_redis
+
+LIMITER_JITTER_MS = int(os.environ.get("LIMITER_JITTER_MS", "1500"))
+LIMITER_MAX_WAIT = float(os.environ.get("LIMITER_MAX_WAIT", "300"))
+LIMITER_POLL_SECONDS = 0.5
+
+# name → (max concurrent calls, max call starts per minute, lease seconds).
+# A lease is renewed every third of its length while the call runs, so it
+# only runs out when its holder has died.
+LIMITS = {
+    "tinyfish": (
+        int(os.environ.get("TINYFISH_MAX_CONCURRENCY", "5")),
+        int(os.environ.get("TINYFISH_RATE_PER_MINUTE", "30")),
+        int(os.environ.get("TINYFISH_LEASE_SECONDS", "300")),
+    ),
+    "anthropic": (
+        int(os.environ.get("ANTHROPIC_MAX_CONCURRENCY", "10")),
+        int(os.environ.get("ANTHROPIC_RATE_PER_MINUTE", "50")),
+        int(os.environ.get("ANTHROPIC_LEASE_SECONDS", "120")),
+    ),
+}
+
+_stats: dict[str, dict] = {
+    name: {"acquired": 0, "waited": 0, "wait_ms_total": 0, "wait_ms_max": 0, "timeouts": 0, "errors": 0}
+    for name in LIMITS
+}
+
+
+class LimiterTimeout(Exception):
+    pass
+
+
+async def _reserve_start(redis, name: str, rate: int, deadline: float) -> float:
+    """Reserve a start slot in the per-minute schedule; return when it begins.
+
+    Each minute window has `rate` evenly spaced slots. INCR on the window
+    counter hands out slots in order across all processes, so a burst of
+    callers at :00 is spread over the minute instead of hitting the API at
+    once. Once a window is exhausted the caller moves to the next one.
+    Raises LimiterTimeout when the first free slot starts after `deadline`,
+    handing that slot back.
+    """
+    now = time.time()
+    window = int(now // 60 * 60)
+    spacing = 60 / rate
+    while window <= deadline:
+        key = f"limiter:{name}:rate:{window}"
+        pipe = redis.pipeline()
+        pipe.incr(key)
+        pipe.expire(key, 120)
+        slot = (await pipe.exec())[0]
+        if slot <= rate:
+            start_at = max(now, window + (slot - 1) * spacing)
+            if start_at <= deadline:
+                return start_at
+            await redis.decr(key)
+            break
+        window += 60
+    raise LimiterTimeout(f"No {name} start slot within {LIMITER_MAX_WAIT:.0f}s")
+
+
+async def _try_lease(redis, name: str, token: str, limit: int, lease: int) -> bool:
+    """Take one of `limit` concurrency leases, shared by every process.
+
+    Leases are members of a sorted set scored by expiry, so a worker that
+    dies mid-call frees its slot after `lease` seconds. A newcomer's lease
+    expires after every live one, so its rank is the number held before it.
+    """
+    key = f"limiter:{name}:leases"
+    now = time.time()
+    pipe = redis.pipeline()
+    pipe.zremrangebyscore(key, "-inf", now)
+    pipe.zadd(key, {token: now + lease})
+    pipe.zrank(key, token)
+    rank = (await pipe.exec())[-1]
+    if rank is not None and rank < limit:
+        return True
+    await redis.zrem(key, token)
+    return False
+
+
+async def _renew_lease(redis, name: str, token: str, lease: int) -> None:
+    """Keep pushing a held lease's expiry back until cancelled."""
+    key = f"limiter:{name}:leases"
+    while True:
+        await asyncio.sleep(lease / 3)
+        try:
+            await redis.zadd(key, {token: time.time() + lease}, xx=True)
+        except Exception as e:
+            print(f"[Limiter] Failed to renew {name} lease: {e}")
+
+
+@asynccontextmanager
+async def acquire(name: str):
+    """Hold a rate- and concurrency-limited slot for an upstream call.
+
+    Fails open: if Redis is unavailable the call proceeds unthrottled rather
+    than failing the test run.
+    """
+    limit, rate, lease = LIMITS[name]
+    stats = _stats[name]
+    redis = get_async_redis()
+    token = str(uuid.uuid4())
+    started = time.time()
+    deadline = started + LIMITER_MAX_WAIT
+    leased = False
+
+    try:
+        start_at = await _reserve_start(redis, name, rate, deadline)
+        if start_at > time.time():
+            start_at = min(deadline, start_at + random.uniform(0, LIMITER_JITTER_MS / 1000))
+            await asyncio.sleep(max(0.0, start_at - time.time()))
+
+        while not await _try_lease(redis, name, token, limit, lease):
+            if time.time() >= deadline:
+                raise LimiterTimeout(f"Waited over {LIMITER_MAX_WAIT:.0f}s for a {name} slot")
+            await asyncio.sleep(LIMITER_POLL_SECONDS + random.uniform(0, LIMITER_POLL_SECONDS))
+        leased = True
+    except LimiterTimeout:
+        stats["timeouts"] += 1
+        raise
+    except Exception as e:
+        stats["errors"] += 1
+        print(f"[Limiter] {name} limiter unavailable, proceeding without it: {e}")
+
+    waited_ms = int((time.time() - started) * 1000)
+    stats["acquired"] += 1
+    stats["wait_ms_total"] += waited_ms
+    stats["wait_ms_max"] = max(stats["wait_ms_max"], waited_ms)
+    if waited_ms >= 1000:
+        stats["waited"] += 1
+        print(f"[Limiter] {name} call waited {waited_ms}ms for a slot")
+
+    renewer = asyncio.create_task(_renew_lease(redis, name, token, lease)) if leased else None
+    try:
+        yield waited_ms
+    finally:
+        if renewer:
+            renewer.cancel()
+            await asyncio.gather(renewer, return_exceptions=True)
+            try:
+                await redis.zrem(f"limiter:{name}:leases", token)
+            except Exception as e:
+                print(f"[Limiter] Failed to release {name} lease: {e}")
+
+
+def limiter_stats() -> dict:
+    """Per-limiter configuration and wait-time counters for this process."""
+    result = {}
+    for name, (limit, rate, _lease) in LIMITS.items():
+        stats = _stats[name]
+        result[name] = {
+            "max_concurrency": limit,
+            "rate_per_minute": rate,
+            **stats,
+            "avg_wait_ms": round(stats["wait_ms_total"] / stats["acquired"]) if stats["acquired"] else 0,
+        }
+    return result
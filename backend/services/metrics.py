@@ -0,0 +1,140 @@
+import time
+from contextlib import contextmanager
+
+# Seconds; spans range from Redis round trips to multi-minute TinyFish sessions.
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(pairs: tuple[tuple[str, str], ...], extra: str = "") -> str:
+    parts = [f'{k}="{_escape(v)}"' for k, v in pairs]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+class Counter:
+    def __init__(self, name: str, help: str):
+        self.name = name
+        self.help = help
+        self._values: dict[tuple, float] = {}
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        key = tuple(sorted(labels.items()))
+        self._values[key] = self._values.get(key, 0) + amount
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        lines += [f"{self.name}{_labels(key)} {value}" for key, value in self._values.items()]
+        return lines
+
+
+class Histogram:
+    """Cumulative-bucket histogram in the Prometheus text format."""
+
+    def __init__(self, name: str, help: str, buckets: tuple[float, ...] = DURATION_BUCKETS):
+        self.name = name
+        self.help = help
+        self.buckets = buckets
+        self._series: dict[tuple, list] = {}
+
+    def observe(self, value: float, **labels) -> None:
+        key = tuple(sorted(labels.items()))
+        series = self._series.get(key)
+        if series is None:
+            # per-bucket counts, then sum and count
+            series = self._series[key] = [0] * len(self.buckets) + [0.0, 0]
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                series[i] += 1
+                break
+        series[-2] += value
+        series[-1] += 1
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        for key, series in self._series.items():
+            cumulative = 0
+            for bound, count in zip(self.buckets, series):
+                cumulative += count
+                le = f'le="{bound}"'
+                lines.append(f"{self.name}_bucket{_labels(key, le)} {cumulative}")
+            le = 'le="+Inf"'
+            lines.append(f"{self.name}_bucket{_labels(key, le)} {series[-1]}")
+            lines.append(f"{self.name}_sum{_labels(key)} {round(series[-2], 6)}")
+            lines.append(f"{self.name}_count{_labels(key)} {series[-1]}")
+        return lines
+
+
+stage_seconds = Histogram(
+    "housecat_stage_duration_seconds",
+    "Duration of pipeline stages (TinyFish stages are measured from the start of the request).",
+)
+redis_seconds = Histogram(
+    "housecat_redis_request_duration_seconds",
+    "Upstash REST round trips, single commands and pipelines.",
+)
+redis_requests = Counter("housecat_redis_requests_total", "Upstash REST requests by kind and HTTP status.")
+retries = Counter("housecat_retries_total", "Stage attempts retried after a transient TinyFish or model failure.")
+tinyfish_aborts = Counter("housecat_tinyfish_aborts_total", "TinyFish sessions stopped early because a step kept failing.")
+
+
+def record_stage(spans: dict | None, name: str, ms: int) -> None:
+    """Add a stage duration to a run's spans and to the stage histogram."""
+    if spans is not None:
+        spans[name] = ms
+    stage_seconds.observe(ms / 1000, stage=name)
+
+
+@contextmanager
+def stage(spans: dict | None, name: str):
+    """Time the body as stage `name` (recorded even when it raises)."""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        record_stage(spans, name, int((time.perf_counter() - started) * 1000))
+
+
+def _gauge(name: str, help: str, value, kind: str = "gauge") -> list[str]:
+    return [f"# HELP {name} {help}", f"# TYPE {name} {kind}", f"{name} {value}"]
+
+
+def render_metrics() -> str:
+    """Everything /metrics exposes, in the Prometheus text format (0.0.4)."""
+    from services.config import redis_pool_stats
+    from services.job_queue import run_queue
+    from services.limiter import limiter_stats
+    from services.event_writer import event_writer
+
+    lines = stage_seconds.render() + redis_seconds.render() + redis_requests.render() + retries.render() + tinyfish_aborts.render()
+
+    pool = redis_pool_stats()
+    lines += _gauge("housecat_redis_open_connections", "Open keep-alive connections to Upstash.", pool["open_connections"])
+    lines += _gauge("housecat_redis_connections_opened_total", "Connections opened to Upstash.", pool["connections_opened"], "counter")
+
+    queue = run_queue.snapshot()
+    lines += _gauge("housecat_run_queue_depth", "Scheduled runs waiting for a worker.", queue["depth"])
+    lines += _gauge("housecat_run_queue_running", "Scheduled runs being executed.", queue["running"])
+    lines += _gauge("housecat_run_queue_workers", "Run queue workers.", queue["workers"])
+    lines += ["# HELP housecat_run_queue_jobs_total Scheduled run jobs by outcome.", "# TYPE housecat_run_queue_jobs_total counter"]
+    for outcome in ("enqueued", "completed", "failed", "deduplicated", "rejected"):
+        lines.append(f'housecat_run_queue_jobs_total{{outcome="{outcome}"}} {queue[outcome]}')
+    lines += _gauge("housecat_run_queue_wait_seconds_total", "Time jobs spent queued.", queue["wait_ms_total"] / 1000, "counter")
+
+    limiters = limiter_stats()
+    lines += ["# HELP housecat_limiter_wait_seconds_total Time calls waited for an upstream slot.", "# TYPE housecat_limiter_wait_seconds_total counter"]
+    lines += [f'housecat_limiter_wait_seconds_total{{limiter="{n}"}} {s["wait_ms_total"] / 1000}' for n, s in limiters.items()]
+    lines += ["# HELP housecat_limiter_acquired_total Upstream slots acquired.", "# TYPE housecat_limiter_acquired_total counter"]
+    lines += [f'housecat_limiter_acquired_total{{limiter="{n}"}} {s["acquired"]}' for n, s in limiters.items()]
+    lines += ["# HELP housecat_limiter_timeouts_total Calls that gave up waiting for a slot.", "# TYPE housecat_limiter_timeouts_total counter"]
+    lines += [f'housecat_limiter_timeouts_total{{limiter="{n}"}} {s["timeouts"]}' for n, s in limiters.items()]
+
+    events = event_writer.snapshot()
+    lines += _gauge("housecat_event_buffer_size", "Live events waiting to be written.", events["buffered"])
+    lines += _gauge("housecat_events_dropped_total", "Live events dropped (buffer full or failed flush).", events["dropped"], "counter")
+
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,66 @@
+import os
+import json
+import hashlib
+from datetime import datetime, timezone
+
+from models import TestPlan
+from services.config import get_async_redis
+
+PLAN_CACHE_TTL = int(os.environ.get("PLAN_CACHE_TTL", str(7 * 86400)))
+# Consecutive failed runs on a cached plan before it is re-planned (0 = never).
+PLAN_REPLAN_AFTER_FAILURES = int(os.environ.get("PLAN_REPLAN_AFTER_FAILURES", "3"))
+PLAN_STATS = "plan:stats"
+
+
+def plan_cache_key(url: str, goal: str, planner_version: str) -> str:
+    """Content address of a plan: same URL, resolved goal and planner → same plan."""
+    digest = hashlib.sha256(f"{planner_version}\n{url}\n{goal}".encode()).hexdigest()
+    return f"plan:{digest}"
+
+
+async def get_cached_plan(key: str) -> tuple[TestPlan | None, str]:
+    """Look up a cached plan. Returns (plan, status) with status hit/miss/replan."""
+    redis = get_async_redis()
+    raw_plan, failures = await redis.hmget(key, "plan", "failures")
+    if not raw_plan:
+        return None, "miss"
+    if PLAN_REPLAN_AFTER_FAILURES and int(failures or 0) >= PLAN_REPLAN_AFTER_FAILURES:
+        return None, "replan"
+    try:
+        return TestPlan.model_validate_json(raw_plan), "hit"
+    except ValueError:
+        return None, "miss"
+
+
+async def store_plan(key: str, plan: TestPlan) -> None:
+    redis = get_async_redis()
+    pipe = redis.pipeline()
+    pipe.hset(key, values={
+        "plan": plan.model_dump_json(),
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "failures": 0,
+    })
+    pipe.expire(key, PLAN_CACHE_TTL)
+    await pipe.exec()
+
+
+async def record_plan_outcome(key: str, status: str, passed: bool) -> None:
+    """Count the lookup, track consecutive failures of the plan and refresh its TTL."""
+    redis = get_async_redis()
+    pipe = redis.pipeline()
+    pipe.hincrby(PLAN_STATS, status, 1)
+    if passed:
+        pipe.hset(key, "failures", 0)
+    else:
+        pipe.hincrby(key, "failures", 1)
+    pipe.expire(key, PLAN_CACHE_TTL)
+    await pipe.exec()
+
+
+async def get_plan_cache_stats() -> dict:
+    counts = {k: int(v) for k, v in (await get_async_redis().hgetall(PLAN_STATS) or {}).items()}
+    lookups = sum(counts.values())
+    return {
+        **counts,
+        "hit_rate": round(counts.get("hit", 0) / lookups, 3) if lookups else None,
+    }
@@ -1,11 +1,109 @@
 import json
+import time
 import uuid
+import zlib
+import base64
 from datetime import datetime, timezone
-from services.config import get_redis
+from services.config import get_async_redis
+from services.metrics import record_stage
+from services.dashboard import queue_run, invalidate_dashboard_cache
 
+RUN_INDEX_MIGRATED = "migrations:run_index"
 
-def store_run_result(test_id: str, final_result, plan, browser_result, triggered_by: str = "manual") -> dict:
-    redis = get_redis()
+# v2 run records keep a small summary under run:{test_id}:{run_id} and the
+# bulky detail (plan, raw TinyFish output, step executions) compressed under
+# run:{test_id}:{run_id}:blob, with the raw payload stored exactly once.
+RUN_FORMAT_VERSION = 2
+DETAIL_FIELDS = ("plan", "tinyfish_raw", "tinyfish_data", "step_executions")
+
+
+def run_key(test_id: str, run_id: str) -> str:
+    return f"run:{test_id}:{run_id}"
+
+
+def blob_key(test_id: str, run_id: str) -> str:
+    return f"run:{test_id}:{run_id}:blob"
+
+
+def _compress(payload: dict) -> str:
+    data = json.dumps(payload, separators=(",", ":")).encode("utf-8")
+    return "z:" + base64.b64encode(zlib.compress(data, 6)).decode("ascii")
+
+
+def _decompress(blob: str) -> dict:
+    if blob.startswith("z:"):
+        return json.loads(zlib.decompress(base64.b64decode(blob[2:])))
+    return json.loads(blob)
+
+
+def pack_run(record: dict) -> tuple[dict, str]:
+    """Split a full run record into its summary and a compressed detail blob.
+
+    Step executions that carry the same raw TinyFish payload (or the same
+    parsed data) as the run itself get a reference flag instead of a copy.
+    The top-level `tinyfish_data` is not stored; it is re-parsed from the
+    raw payload on load.
+    """
+    raw = record.get("tinyfish_raw")
+    parsed = record.get("tinyfish_data")
+
+    step_executions = []
+    for se in record.get("step_executions") or []:
+        se = dict(se)
+        if raw is not None and se.get("tinyfish_raw") == raw:
+            del se["tinyfish_raw"]
+            se["raw_ref"] = True
+        if parsed is not None and se.get("tinyfish_data") == parsed:
+            del se["tinyfish_data"]
+            se["data_ref"] = True
+        step_executions.append(se)
+
+    summary = {k: v for k, v in record.items() if k not in DETAIL_FIELDS}
+    summary["v"] = RUN_FORMAT_VERSION
+    detail = {
+        "plan": record.get("plan"),
+        "tinyfish_raw": raw,
+        "step_executions": step_executions,
+    }
+    return summary, _compress(detail)
+
+
+def unpack_run(summary: dict, blob: str | None) -> dict:
+    """Rebuild the full run record shape from a summary and its detail blob."""
+    record = {k: v for k, v in summary.items() if k != "v"}
+    detail = _decompress(blob) if blob else {}
+
+    raw = detail.get("tinyfish_raw")
+    parsed = None
+    if raw:
+        try:
+            parsed = json.loads(raw)
+        except (json.JSONDecodeError, TypeError):
+            pass
+
+    step_executions = []
+    for se in detail.get("step_executions") or []:
+        if se.pop("raw_ref", False):
+            se["tinyfish_raw"] = raw
+        if se.pop("data_ref", False):
+            se["tinyfish_data"] = parsed
+        step_executions.append(se)
+
+    record["plan"] = detail.get("plan")
+    record["tinyfish_raw"] = raw
+    record["tinyfish_data"] = parsed
+    record["step_executions"] = step_executions
+    return record
+
+
+def _summarize(record: dict) -> dict:
+    """List views only need the summary; drop detail fields from v1 records."""
+    return {k: v for k, v in record.items() if k not in DETAIL_FIELDS and k != "v"}
+
+
+async def store_run_result(test_id: str, final_result, plan, browser_result, triggered_by: str = "manual") -> dict:
+    started = time.perf_counter()
+    redis = get_async_redis()
     now = datetime.now(timezone.utc)
     run_id = str(uuid.uuid4())[:8]
 
@@ -45,18 +143,26 @@ def store_run_result(test_id: str, final_result, plan, browser_result, triggered
         "tinyfish_data": tinyfish_data,
         "streaming_url": browser_result.streaming_url,
         "step_executions": step_executions if isinstance(step_executions, list) else [],
+        "meta": getattr(final_result, "meta", None) or {},
     }
 
     timestamp = now.timestamp()
 
-    redis.zadd(f"results:{test_id}", {json.dumps(run_record): timestamp})
+    summary, blob = pack_run(run_record)
 
-    redis.zadd(f"timing:{test_id}", {f"{run_id}:{final_result.duration_ms}": timestamp})
+    pipe = redis.pipeline()
+    pipe.set(run_key(test_id, run_id), json.dumps(summary))
+    pipe.set(blob_key(test_id, run_id), blob)
+    pipe.zadd(f"results:{test_id}", {run_id: timestamp})
 
-    redis.hset(f"test:{test_id}", values={
-        "last_result": "passed" if final_result.passed else "failed",
+    pipe.zadd(f"timing:{test_id}", {f"{run_id}:{final_result.duration_ms}": timestamp})
+
+    last_result = "passed" if final_result.passed else "failed"
+    pipe.hset(f"test:{test_id}", values={
+        "last_result": last_result,
         "last_run_at": now.isoformat(),
     })
+    queue_run(pipe, test_id, last_result, now.isoformat(), summary)
 
     if not final_result.passed:
         incident = {
@@ -67,17 +173,158 @@ def store_run_result(test_id: str, final_result, plan, browser_result, triggered
             "started_at": now.isoformat(),
             "alert_sent": False,
         }
-        redis.lpush(f"incidents:{test_id}", json.dumps(incident))
+        pipe.lpush(f"incidents:{test_id}", json.dumps(incident))
+
+    from services.uptime import queue_run_counters
+    from services.retention import queue_retention, downsample_runs
+    queue_run_counters(pipe, test_id, timestamp, final_result.passed, final_result.duration_ms)
+    queue_retention(pipe, test_id, timestamp)
+
+    expired = (await pipe.exec())[-1]
+    invalidate_dashboard_cache()
+    if expired:
+        try:
+            await downsample_runs(test_id, expired)
+        except Exception as e:
+            print(f"[Retention] Downsampling failed for {test_id}: {e}")
 
+    # Written after the record itself, so it is only exported on /metrics.
+    record_stage(None, "storage", int((time.perf_counter() - started) * 1000))
     return run_record
 
 
-def log_event(test_id: str, event_type: str, message: str, **extra_fields):
-    redis = get_redis()
+def _is_legacy_member(member: str) -> bool:
+    """Before the run index, `results:{id}` members were whole JSON records."""
+    return member.startswith("{")
+
+
+async def load_runs(test_id: str, members: list[str]) -> list[dict]:
+    """Resolve `results:{id}` members to run summaries, preserving order.
+
+    Members are run IDs whose records live under `run:{test_id}:{run_id}`
+    and are fetched with one MGET. Legacy JSON members that have not been
+    migrated yet are decoded in place. Detail fields are never loaded here;
+    use get_run() for the full record.
+    """
+    redis = get_async_redis()
+    run_ids = [m for m in members if not _is_legacy_member(m)]
+    fetched = dict(zip(run_ids, await redis.mget(*[run_key(test_id, r) for r in run_ids]))) if run_ids else {}
+
+    records = []
+    for member in members:
+        raw = member if _is_legacy_member(member) else fetched.get(member)
+        if not raw:
+            continue
+        try:
+            records.append(_summarize(json.loads(raw)))
+        except json.JSONDecodeError:
+            continue
+    return records
+
+
+async def get_run(test_id: str, run_id: str) -> dict | None:
+    """Load the full run record, decompressing its detail blob if present."""
+    redis = get_async_redis()
+    raw, blob = await redis.mget(run_key(test_id, run_id), blob_key(test_id, run_id))
+    if raw is None and not await redis.get(RUN_INDEX_MIGRATED):
+        if await migrate_legacy_runs(test_id):
+            raw = await redis.get(run_key(test_id, run_id))
+    if raw is None:
+        return None
+    try:
+        record = json.loads(raw)
+        if record.get("v") == RUN_FORMAT_VERSION:
+            return unpack_run(record, blob)
+        return record
+    except (json.JSONDecodeError, zlib.error, ValueError):
+        return None
+
+
+async def migrate_legacy_runs(test_id: str) -> int:
+    """Move legacy JSON members of `results:{id}` into per-run keys.
+
+    Each record is written in the compact format to `run:{test_id}:{run_id}`
+    (+ `:blob`) and its sorted-set member is replaced by the bare run ID with the same score. Returns the
+    number of records migrated.
+    """
+    redis = get_async_redis()
+    entries = await redis.zrange(f"results:{test_id}", 0, -1, withscores=True)
+    legacy = [(m, score) for m, score in entries if _is_legacy_member(m)]
+    if not legacy:
+        return 0
+
+    migrated = 0
+    pipe = redis.pipeline()
+    for member, score in legacy:
+        try:
+            record = json.loads(member)
+            run_id = record["run_id"]
+        except (json.JSONDecodeError, KeyError, TypeError):
+            continue
+        summary, blob = pack_run(record)
+        pipe.set(run_key(test_id, run_id), json.dumps(summary))
+        pipe.set(blob_key(test_id, run_id), blob)
+        pipe.zadd(f"results:{test_id}", {run_id: score})
+        migrated += 1
+    pipe.zrem(f"results:{test_id}", *[m for m, _ in legacy])
+    await pipe.exec()
+    return migrated
+
+
+async def compact_runs(test_id: str) -> int:
+    """Rewrite v1 per-run records of a test into the compact v2 format."""
+    redis = get_async_redis()
+    members = [m for m in await redis.zrange(f"results:{test_id}", 0, -1) if not _is_legacy_member(m)]
+    compacted = 0
+    for i in range(0, len(members), 100):
+        chunk = members[i:i + 100]
+        raws = await redis.mget(*[run_key(test_id, m) for m in chunk])
+        pipe = redis.pipeline()
+        queued = False
+        for run_id, raw in zip(chunk, raws):
+            if not raw:
+                continue
+            try:
+                record = json.loads(raw)
+            except json.JSONDecodeError:
+                continue
+            if record.get("v") == RUN_FORMAT_VERSION:
+                continue
+            summary, blob = pack_run(record)
+            pipe.set(run_key(test_id, run_id), json.dumps(summary))
+            pipe.set(blob_key(test_id, run_id), blob)
+            queued = True
+            compacted += 1
+        if queued:
+            await pipe.exec()
+    return compacted
+
+
+async def delete_run_records(test_id: str) -> None:
+    """Delete every per-run summary and blob key referenced by `results:{id}`."""
+    redis = get_async_redis()
+    members = await redis.zrange(f"results:{test_id}", 0, -1)
+    keys = []
+    for member in members:
+        if not _is_legacy_member(member):
+            keys.extend([run_key(test_id, member), blob_key(test_id, member)])
+    for i in range(0, len(keys), 500):
+        await redis.delete(*keys[i:i + 500])
+
+
+async def log_event(test_id: str, event_type: str, message: str, **extra_fields):
+    """Queue a live event; it is written to `events:{test_id}` within EVENT_FLUSH_MS."""
     fields = {
         "type": event_type,
         "message": message,
         "timestamp": datetime.now(timezone.utc).isoformat(),
     }
     fields.update({k: str(v) for k, v in extra_fields.items() if v is not None})
-    redis.xadd(f"events:{test_id}", "*", data=fields)
+
+    from services.event_writer import event_writer
+    event_writer.enqueue(test_id, fields)
+
+
+async def flush_events() -> None:
+    from services.event_writer import event_writer
+    await event_writer.flush()
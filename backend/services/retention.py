@@ -0,0 +1,123 @@
+import os
+import time
+import asyncio
+
+from services.config import get_async_redis
+from services.result_store import run_key, blob_key
+from services.uptime import COUNTED_FROM, rollup_key, queue_bucket_counts
+
+RESULTS_RETENTION_DAYS = float(os.environ.get("RESULTS_RETENTION_DAYS", "30"))
+ROLLUP_RETENTION_DAYS = float(os.environ.get("ROLLUP_RETENTION_DAYS", "365"))
+EVENTS_MAXLEN = int(os.environ.get("EVENTS_MAXLEN", "500"))
+INCIDENTS_MAX = int(os.environ.get("INCIDENTS_MAX", "200"))
+RETENTION_SWEEP_SECONDS = int(os.environ.get("RETENTION_SWEEP_SECONDS", "3600"))
+RETENTION_BATCH = 500
+
+
+def results_cutoff(now: float | None = None) -> float:
+    return (now or time.time()) - RESULTS_RETENTION_DAYS * 86400
+
+
+def queue_retention(pipe, test_id: str, now: float | None = None) -> None:
+    """Append the cheap per-write trims to an existing pipeline.
+
+    Incidents are capped, timing points past retention are dropped, and the
+    final queued command returns up to RETENTION_BATCH expired run members
+    (with scores) for downsample_runs(). In steady state that list is empty,
+    so retention costs no extra round trip on the write path.
+    """
+    cutoff = results_cutoff(now)
+    pipe.ltrim(f"incidents:{test_id}", 0, INCIDENTS_MAX - 1)
+    pipe.zremrangebyscore(f"timing:{test_id}", "-inf", f"({cutoff}")
+    pipe.zrangebyscore(
+        f"results:{test_id}", "-inf", f"({cutoff}",
+        withscores=True, offset=0, count=RETENTION_BATCH,
+    )
+
+
+async def downsample_runs(test_id: str, expired: list[tuple[str, float]]) -> int:
+    """Fold expired runs into hourly aggregates, then delete the full records.
+
+    Aggregates live in the `rollup:{test_id}` hash as `{hour}:runs`,
+    `{hour}:passed` and `{hour}:duration_ms` counters. Runs stored since
+    `counted_from` were already counted on write and are only deleted. A
+    short per-test lock keeps concurrent writers and the sweeper from
+    counting a batch twice.
+    """
+    if not expired:
+        return 0
+
+    redis = get_async_redis()
+    lock = f"retention:lock:{test_id}"
+    if not await redis.set(lock, "1", nx=True, ex=60):
+        return 0
+
+    try:
+        counted_from = await redis.hget(rollup_key(test_id), COUNTED_FROM)
+        counted_from = float(counted_from) if counted_from is not None else float("inf")
+
+        members = [m for m, _ in expired]
+        pipe = redis.pipeline()
+        await queue_bucket_counts(pipe, test_id, [(m, score) for m, score in expired if score < counted_from])
+        run_keys = []
+        for member in members:
+            if not member.startswith("{"):
+                run_keys.extend([run_key(test_id, member), blob_key(test_id, member)])
+        if run_keys:
+            pipe.delete(*run_keys)
+        pipe.zrem(f"results:{test_id}", *members)
+        await pipe.exec()
+        return len(members)
+    finally:
+        await redis.delete(lock)
+
+
+async def prune_rollups(test_id: str, now: float | None = None) -> int:
+    """Drop hourly aggregates older than ROLLUP_RETENTION_DAYS."""
+    redis = get_async_redis()
+    cutoff = (now or time.time()) - ROLLUP_RETENTION_DAYS * 86400
+    fields = await redis.hkeys(rollup_key(test_id))
+    stale = [f for f in fields if f[0].isdigit() and int(f.split(":", 1)[0]) < cutoff]
+    if stale:
+        await redis.hdel(rollup_key(test_id), *stale)
+    return len(stale)
+
+
+async def enforce_retention(test_id: str) -> int:
+    """Apply the full retention policy to one test. Returns runs downsampled."""
+    redis = get_async_redis()
+    downsampled = 0
+    while True:
+        pipe = redis.pipeline()
+        queue_retention(pipe, test_id)
+        expired = (await pipe.exec())[-1]
+        if not expired:
+            break
+        done = await downsample_runs(test_id, expired)
+        downsampled += done
+        if done < RETENTION_BATCH:
+            break
+
+    await redis.xtrim(f"events:{test_id}", maxlen=EVENTS_MAXLEN)
+    await prune_rollups(test_id)
+    return downsampled
+
+
+async def retention_sweeper() -> None:
+    """Background loop that enforces retention on every test periodically.
+
+    Catches tests that have stopped writing (paused or deleted schedules).
+    Only one replica sweeps per interval.
+    """
+    while True:
+        try:
+            redis = get_async_redis()
+            if await redis.set("retention:sweep", "1", nx=True, ex=max(RETENTION_SWEEP_SECONDS - 5, 1)):
+                total = 0
+                for test_id in await redis.smembers("tests:all"):
+                    total += await enforce_retention(test_id)
+                if total:
+                    print(f"[Retention] Downsampled {total} runs")
+        except Exception as e:
+            print(f"[Retention] Sweep failed: {e}")
+        await asyncio.sleep(RETENTION_SWEEP_SECONDS)
@@ -0,0 +1,211 @@
+import os
+import json
+import uuid
+import asyncio
+from datetime import datetime, timedelta, timezone
+from typing import Awaitable, Callable
+
+from services.config import get_async_redis
+from services.cron import compile_cron
+from services.test_suite import Scheduler
+
+SCHEDULER_KEY = "scheduler:local"
+LEADER_KEY = "scheduler:leader"
+# Time of the leader's last completed pass: slots up to it have been dispatched.
+CHECKPOINT_KEY = "scheduler:checkpoint"
+# The leader renews its lease on every pass; a replica that stops renewing
+# (crash, network split) is replaced once the lease runs out.
+SCHEDULER_LEASE_SECONDS = int(os.environ.get("SCHEDULER_LEASE_SECONDS", "30"))
+# Longest sleep between passes; the leader wakes earlier when a schedule is due.
+SCHEDULER_TICK_SECONDS = float(os.environ.get("SCHEDULER_TICK_SECONDS", "5"))
+MIN_SLEEP_SECONDS = 0.05
+
+
+def _fire_after(cron: str, delay: int, after: datetime) -> datetime | None:
+    """First firing time (cron minute plus `delay` seconds) strictly after `after`."""
+    fire = compile_cron(cron).next_fire(after - timedelta(seconds=delay))
+    return fire + timedelta(seconds=delay) if fire else None
+
+
+class LocalScheduler(Scheduler):
+    """In-process cron scheduler that feeds the run queue directly.
+
+    Schedules live in the `scheduler:local` hash ({test_id} → cron and
+    delay), so every replica sees the same set. Only the replica holding
+    the `scheduler:leader` lease dispatches; the others keep checking
+    whether the lease has lapsed. Due runs go straight to run_queue, with
+    no public URL, HTTP callback or signature check in between. A replica
+    that takes over runs the slots missed since the old leader's last
+    pass (at most one lease plus one tick back), once per schedule.
+
+    tick() runs one pass for a given `now` and `dispatch` replaces the run
+    queue, so the whole loop can be driven offline.
+    """
+
+    name = "local"
+
+    def __init__(self, dispatch: Callable[[str], Awaitable[bool]] | None = None, instance_id: str | None = None):
+        self.instance_id = instance_id or str(uuid.uuid4())[:8]
+        self._dispatch = dispatch or _enqueue_run
+        self._due: dict[str, tuple[str, int, datetime | None]] = {}
+        self._task: asyncio.Task | None = None
+        self.is_leader = False
+        self.stats = {"passes": 0, "dispatched": 0, "skipped": 0, "dispatch_errors": 0, "leader_changes": 0, "caught_up": 0}
+
+    async def create(self, test_id: str, cron: str, delay: int = 0, schedule_id: str | None = None) -> str:
+        compile_cron(cron)
+        await get_async_redis().hset(SCHEDULER_KEY, values={test_id: json.dumps({"cron": cron, "delay": delay})})
+        return f"local:{test_id}"
+
+    async def delete(self, schedule_id: str) -> None:
+        await get_async_redis().hdel(SCHEDULER_KEY, schedule_id.removeprefix("local:"))
+
+    def owns(self, schedule_id: str) -> bool:
+        return schedule_id.startswith("local:")
+
+    async def _elect(self, redis) -> tuple[bool, dict | None, str | None]:
+        """Try to take the leader lease; returns (acquired, schedules, checkpoint).
+
+        Schedules are None when another replica leads.
+        """
+        pipe = redis.pipeline()
+        pipe.set(LEADER_KEY, self.instance_id, nx=True, ex=SCHEDULER_LEASE_SECONDS)
+        pipe.get(LEADER_KEY)
+        pipe.hgetall(SCHEDULER_KEY)
+        pipe.get(CHECKPOINT_KEY)
+        acquired, holder, entries, checkpoint = await pipe.exec()
+
+        leader = holder == self.instance_id
+        if leader != self.is_leader:
+            self.is_leader = leader
+            self.stats["leader_changes"] += 1
+            print(f"[Scheduler] {self.instance_id} {'is now' if leader else 'is no longer'} the leader")
+        return bool(acquired), (entries or {}) if leader else None, checkpoint
+
+    @staticmethod
+    def _catch_up_from(checkpoint: str | None, now: datetime) -> datetime | None:
+        """Where a new leader starts: the last checkpoint, bounded by one lease (None = no catch-up)."""
+        if not checkpoint:
+            return None
+        try:
+            since = datetime.fromisoformat(checkpoint)
+        except ValueError:
+            return None
+        return max(since, now - timedelta(seconds=SCHEDULER_LEASE_SECONDS + SCHEDULER_TICK_SECONDS))
+
+    async def tick(self, now: datetime | None = None) -> list[str]:
+        """One scheduling pass: dispatch every schedule due at `now`; returns their test IDs.
+
+        A schedule seen for the first time (or changed) starts at its next
+        firing time. Right after taking the lease, schedules start from the
+        previous leader's checkpoint instead, so slots that fell due while
+        the lease was lapsing still run. Several missed slots of one
+        schedule run once, not once each.
+        """
+        now = now or datetime.now(timezone.utc)
+        self.stats["passes"] += 1
+        redis = get_async_redis()
+        was_leader = self.is_leader
+        acquired, entries, checkpoint = await self._elect(redis)
+        if entries is None:
+            self._due.clear()
+            return []
+        since = self._catch_up_from(checkpoint, now) if not was_leader else None
+
+        due = []
+        for test_id, raw in entries.items():
+            try:
+                entry = json.loads(raw)
+                cron, delay = entry["cron"], int(entry.get("delay") or 0)
+                known = self._due.get(test_id)
+                if known is None or known[:2] != (cron, delay):
+                    fire_at = _fire_after(cron, delay, since if since and known is None else now)
+                else:
+                    fire_at = known[2]
+                if fire_at is not None and fire_at <= now:
+                    due.append(test_id)
+                    if since and fire_at < now - timedelta(seconds=SCHEDULER_TICK_SECONDS):
+                        self.stats["caught_up"] += 1
+                    fire_at = _fire_after(cron, delay, now)
+            except (ValueError, KeyError, TypeError) as e:
+                print(f"[Scheduler] Skipping bad schedule for {test_id}: {e}")
+                continue
+            self._due[test_id] = (cron, delay, fire_at)
+        for test_id in set(self._due) - set(entries):
+            del self._due[test_id]
+
+        for test_id in due:
+            try:
+                if await self._dispatch(test_id):
+                    self.stats["dispatched"] += 1
+                else:
+                    self.stats["skipped"] += 1
+            except Exception as e:
+                self.stats["dispatch_errors"] += 1
+                print(f"[Scheduler] Dispatch failed for {test_id}: {e}")
+
+        pipe = redis.pipeline()
+        if not acquired:
+            pipe.expire(LEADER_KEY, SCHEDULER_LEASE_SECONDS)
+        pipe.set(CHECKPOINT_KEY, now.isoformat())
+        await pipe.exec()
+        return due
+
+    def seconds_until_next(self, now: datetime | None = None) -> float:
+        """How long the loop may sleep: until the next due schedule, at most one tick."""
+        now = now or datetime.now(timezone.utc)
+        upcoming = [fire_at for _, _, fire_at in self._due.values() if fire_at is not None]
+        if not self.is_leader or not upcoming:
+            return SCHEDULER_TICK_SECONDS
+        return max(MIN_SLEEP_SECONDS, min(SCHEDULER_TICK_SECONDS, (min(upcoming) - now).total_seconds()))
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await self.tick()
+            except Exception as e:
+                print(f"[Scheduler] Pass failed: {e}")
+            await asyncio.sleep(self.seconds_until_next())
+
+    def start(self) -> None:
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Stop the loop and hand the lease over right away if this replica holds it."""
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        if self.is_leader:
+            redis = get_async_redis()
+            try:
+                if await redis.get(LEADER_KEY) == self.instance_id:
+                    await redis.delete(LEADER_KEY)
+            except Exception as e:
+                print(f"[Scheduler] Failed to release leader lease: {e}")
+            self.is_leader = False
+        self._due.clear()
+
+    def snapshot(self) -> dict:
+        return {
+            "backend": self.name,
+            "instance_id": self.instance_id,
+            "leader": self.is_leader,
+            "schedules": len(self._due),
+            **self.stats,
+        }
+
+
+async def _enqueue_run(test_id: str) -> bool:
+    from services.job_queue import run_queue, RunJob, QueueFull
+
+    try:
+        return await run_queue.enqueue(RunJob(test_id=test_id, triggered_by="scheduler"))
+    except QueueFull as e:
+        # No delivery retries here (unlike QStash): the slot is skipped.
+        print(f"[Scheduler] {e}, skipping run of {test_id}")
+        return False
+
+
+local_scheduler = LocalScheduler()
@@ -1,27 +1,134 @@
+import os
 import json
 import uuid
+import asyncio
+from abc import ABC, abstractmethod
 from datetime import datetime, timezone
 
-from services.config import get_redis, get_qstash, get_public_url
+from services.config import get_async_redis, get_async_qstash, get_public_url
+from services.result_store import delete_run_records
+from services.dashboard import queue_suite, queue_remove, invalidate_dashboard_cache
+from services.cron import stagger
+
+TESTS_BY_CREATED = "tests:by_created"
+# Spread each suite's schedule across its period by an offset derived from
+# its ID (per-suite opt-out: `stagger: false`).
+SCHEDULE_STAGGER = os.environ.get("SCHEDULE_STAGGER", "1") == "1"
+# "qstash": QStash calls /api/callback/{test_id}; "local": an in-process
+# cron loop (services/scheduler.py) feeds the run queue directly.
+SCHEDULER_BACKEND = os.environ.get("SCHEDULER_BACKEND", "qstash")
+# Bulk requests: max operations per request, and schedule calls in flight at once.
+BULK_MAX_ITEMS = int(os.environ.get("BULK_MAX_ITEMS", "1000"))
+BULK_SCHEDULE_CONCURRENCY = int(os.environ.get("BULK_SCHEDULE_CONCURRENCY", "10"))
+BULK_PIPELINE_CHUNK = 100
+EXPORT_PAGE_SIZE = 200
+EXPORT_FIELDS = ("id", "name", "url", "goal", "schedule", "alert_webhook", "variables", "evaluator_mode", "timeout_seconds", "stagger", "status", "created_at")
+
+
+class Scheduler(ABC):
+    """Where suite schedules are registered and what triggers their runs.
+
+    create() registers a cron for a suite (or overwrites `schedule_id` in
+    place) and returns the schedule ID to store; delete() removes one.
+    Pausing deletes the schedule and resuming creates it again, whichever
+    backend is in use.
+    """
+
+    name = ""
+
+    @abstractmethod
+    async def create(self, test_id: str, cron: str, delay: int = 0, schedule_id: str | None = None) -> str:
+        ...
+
+    @abstractmethod
+    async def delete(self, schedule_id: str) -> None:
+        ...
+
+    @abstractmethod
+    def owns(self, schedule_id: str) -> bool:
+        """Whether `schedule_id` was issued by this backend."""
+
+
+class QStashScheduler(Scheduler):
+    """QStash schedules delivering to /api/callback/{test_id}; `delay` is QStash's delivery delay."""
+
+    name = "qstash"
+
+    async def create(self, test_id: str, cron: str, delay: int = 0, schedule_id: str | None = None) -> str:
+        result = await get_async_qstash().schedule.create(
+            destination=f"{get_public_url()}/api/callback/{test_id}",
+            cron=cron,
+            delay=delay or None,
+            schedule_id=schedule_id,
+        )
+        return result.schedule_id if hasattr(result, "schedule_id") else str(result)
 
+    async def delete(self, schedule_id: str) -> None:
+        await get_async_qstash().schedule.delete(schedule_id)
 
-def create_test_suite(data: dict) -> dict:
-    redis = get_redis()
-    qstash = get_qstash()
-    public_url = get_public_url()
+    def owns(self, schedule_id: str) -> bool:
+        return not schedule_id.startswith("local:")
 
-    test_id = str(uuid.uuid4())[:8]
-    now = datetime.now(timezone.utc).isoformat()
 
-    test = {
-        "id": test_id,
+qstash_scheduler = QStashScheduler()
+
+
+def get_scheduler() -> Scheduler:
+    """The backend new and rewritten schedules go to (SCHEDULER_BACKEND)."""
+    if SCHEDULER_BACKEND == "local":
+        from services.scheduler import local_scheduler
+        return local_scheduler
+    return qstash_scheduler
+
+
+def scheduler_for(schedule_id: str) -> Scheduler:
+    """The backend holding an existing schedule, so it can be deleted after a switch."""
+    scheduler = get_scheduler()
+    if scheduler.owns(schedule_id):
+        return scheduler
+    if qstash_scheduler.owns(schedule_id):
+        return qstash_scheduler
+    from services.scheduler import local_scheduler
+    return local_scheduler
+
+
+async def _delete_schedule(schedule_id: str) -> None:
+    await scheduler_for(schedule_id).delete(schedule_id)
+
+
+def effective_schedule(test_id: str, schedule: str, staggered: bool = True) -> tuple[str, int]:
+    """The (cron, delay seconds) the scheduler is given for a suite's requested schedule."""
+    if SCHEDULE_STAGGER and staggered:
+        return stagger(schedule, test_id)
+    return schedule, 0
+
+
+def _staggered(test: dict) -> bool:
+    return str(test.get("stagger", "1")) not in ("0", "False", "false")
+
+
+async def _create_schedule(scheduler: Scheduler, test_id: str, schedule: str, staggered: bool, schedule_id: str | None = None) -> dict:
+    """Register the schedule (or overwrite `schedule_id`); returns the hash fields to store."""
+    cron, delay = effective_schedule(test_id, schedule, staggered)
+    new_schedule_id = await scheduler.create(test_id, cron, delay, schedule_id)
+    return {"schedule_id": new_schedule_id, "schedule_cron": cron, "schedule_delay": delay}
+
+
+def _new_suite(data: dict) -> dict:
+    """The stored hash of a suite about to be created (not yet scheduled)."""
+    now = datetime.now(timezone.utc).isoformat()
+    return {
+        "id": str(uuid.uuid4())[:8],
         "name": data["name"],
         "url": data["url"],
         "goal": data["goal"],
         "schedule": data.get("schedule", "*/15 * * * *"),
         "alert_webhook": data.get("alert_webhook") or "",
         "variables": json.dumps(data.get("variables", [])),
-        "status": "active",
+        "evaluator_mode": data.get("evaluator_mode") or "auto",
+        "timeout_seconds": data.get("timeout_seconds") or "",
+        "stagger": "0" if data.get("stagger") is False else "1",
+        "status": "paused" if data.get("status") == "paused" else "active",
         "last_result": "pending",
         "last_run_at": "",
         "created_at": now,
@@ -29,43 +136,110 @@ def create_test_suite(data: dict) -> dict:
         "schedule_id": "",
     }
 
-    redis.hset(f"test:{test_id}", values=test)
-    redis.sadd("tests:all", test_id)
 
+def _queue_new_suite(pipe, test: dict) -> None:
+    pipe.hset(f"test:{test['id']}", values=test)
+    pipe.sadd("tests:all", test["id"])
+    pipe.zadd(TESTS_BY_CREATED, {test["id"]: _created_score(test["created_at"])})
+    queue_suite(pipe, test)
+
+
+async def _schedule_new_suite(scheduler: Scheduler, test: dict) -> dict:
+    """Register a new suite's schedule; returns the fields to write back (none when created paused)."""
+    if test["status"] == "paused":
+        return {}
     try:
-        schedule_result = qstash.schedule.create(
-            destination=f"{public_url}/api/callback/{test_id}",
-            cron=test["schedule"],
-        )
-        if hasattr(schedule_result, "schedule_id"):
-            schedule_id = schedule_result.schedule_id
-        else:
-            schedule_id = str(schedule_result)
-        test["schedule_id"] = schedule_id
-        redis.hset(f"test:{test_id}", values={"schedule_id": test["schedule_id"]})
+        return await _create_schedule(scheduler, test["id"], test["schedule"], _staggered(test))
     except Exception as e:
-        test["status"] = "error"
-        redis.hset(f"test:{test_id}", values={"status": "error"})
-        print(f"QStash schedule creation failed for {test_id}: {e}")
+        print(f"{scheduler.name} schedule creation failed for {test['id']}: {e}")
+        return {"status": "error"}
+
+
+async def create_test_suite(data: dict) -> dict:
+    redis = get_async_redis()
+
+    test = _new_suite(data)
+    pipe = redis.pipeline()
+    _queue_new_suite(pipe, test)
+    await pipe.exec()
+    invalidate_dashboard_cache()
+
+    scheduled = await _schedule_new_suite(get_scheduler(), test)
+    if scheduled:
+        test.update(scheduled)
+        pipe = redis.pipeline()
+        pipe.hset(f"test:{test['id']}", values=scheduled)
+        queue_suite(pipe, test)
+        await pipe.exec()
+        invalidate_dashboard_cache()
 
     return test
 
 
-def list_test_suites() -> list[dict]:
-    redis = get_redis()
-    test_ids = redis.smembers("tests:all")
+async def list_test_suites(limit: int | None = None, offset: int = 0, newest_first: bool = True) -> list[dict]:
+    """Return test suites ordered by created_at, optionally one page at a time.
 
+    Ordering and paging come from the `tests:by_created` sorted set, and the
+    hashes for the page are fetched in a single pipelined round trip.
+    """
+    redis = get_async_redis()
+    await _ensure_created_index(redis)
+
+    stop = -1 if limit is None else offset + limit - 1
+    test_ids = await redis.zrange(TESTS_BY_CREATED, offset, stop, rev=newest_first)
     if not test_ids:
         return []
 
-    tests = []
+    pipe = redis.pipeline()
     for test_id in test_ids:
-        data = redis.hgetall(f"test:{test_id}")
-        if data:
-            tests.append(_deserialize_variables(data))
+        pipe.hgetall(f"test:{test_id}")
+    rows = await pipe.exec()
+
+    return [_deserialize_variables(data) for data in rows if data]
+
+
+async def count_test_suites() -> int:
+    redis = get_async_redis()
+    return await redis.scard("tests:all")
+
+
+def _created_score(created_at: str) -> float:
+    try:
+        return datetime.fromisoformat(created_at).timestamp()
+    except (ValueError, TypeError):
+        return 0.0
+
+
+async def _ensure_created_index(redis) -> None:
+    """Rebuild `tests:by_created` from `tests:all` when the two drift apart.
 
-    tests.sort(key=lambda t: t.get("created_at", ""), reverse=True)
-    return tests
+    Covers suites created before the index existed; in steady state this is
+    a single pipelined SCARD + ZCARD.
+    """
+    pipe = redis.pipeline()
+    pipe.scard("tests:all")
+    pipe.zcard(TESTS_BY_CREATED)
+    total, indexed = await pipe.exec()
+    if total == indexed:
+        return
+
+    test_ids = await redis.smembers("tests:all")
+    indexed_ids = await redis.zrange(TESTS_BY_CREATED, 0, -1)
+
+    pipe = redis.pipeline()
+    for test_id in test_ids:
+        pipe.hget(f"test:{test_id}", "created_at")
+    created = await pipe.exec() if test_ids else []
+
+    pipe = redis.pipeline()
+    scores = {test_id: _created_score(c or "") for test_id, c in zip(test_ids, created)}
+    if scores:
+        pipe.zadd(TESTS_BY_CREATED, scores)
+    stale = set(indexed_ids) - set(test_ids)
+    if stale:
+        pipe.zrem(TESTS_BY_CREATED, *stale)
+    if scores or stale:
+        await pipe.exec()
 
 
 def _deserialize_variables(data: dict) -> dict:
@@ -78,101 +252,284 @@ def _deserialize_variables(data: dict) -> dict:
     return data
 
 
-def get_test_suite(test_id: str) -> dict | None:
-    redis = get_redis()
-    data = redis.hgetall(f"test:{test_id}")
+async def get_test_suite(test_id: str) -> dict | None:
+    redis = get_async_redis()
+    data = await redis.hgetall(f"test:{test_id}")
     return _deserialize_variables(data) if data else None
 
 
-def update_test_suite(test_id: str, updates: dict) -> dict | None:
-    redis = get_redis()
-    qstash = get_qstash()
-    public_url = get_public_url()
-
-    existing = redis.hgetall(f"test:{test_id}")
-    if not existing:
-        return None
-
+async def _update_changes(scheduler: Scheduler, test_id: str, existing: dict, updates: dict) -> dict:
+    """The fields to write for an update, after rescheduling, pausing or resuming as needed."""
     changes = {k: v for k, v in updates.items() if v is not None}
     changes["updated_at"] = datetime.now(timezone.utc).isoformat()
 
     if "variables" in changes:
         changes["variables"] = json.dumps(changes["variables"])
-
-    if "schedule" in changes and changes["schedule"] != existing.get("schedule"):
+    if changes.get("timeout_seconds") == 0:
+        changes["timeout_seconds"] = ""
+    if "stagger" in changes:
+        changes["stagger"] = "1" if changes["stagger"] else "0"
+    staggered = _staggered({**existing, **changes})
+
+    rescheduled = any(field in changes and changes[field] != existing.get(field, "1" if field == "stagger" else None) for field in ("schedule", "stagger"))
+    if rescheduled and {**existing, **changes}.get("status") != "paused":
         old_schedule_id = existing.get("schedule_id")
 
         if old_schedule_id:
             try:
-                qstash.schedule.delete(old_schedule_id)
+                await _delete_schedule(old_schedule_id)
             except Exception as e:
-                print(f"Failed to delete old QStash schedule {old_schedule_id}: {e}")
+                print(f"Failed to delete old schedule {old_schedule_id}: {e}")
 
         try:
-            new_result = qstash.schedule.create(
-                destination=f"{public_url}/api/callback/{test_id}",
-                cron=changes["schedule"],
-            )
-            if hasattr(new_result, "schedule_id"):
-                new_schedule_id = new_result.schedule_id
-            else:
-                new_schedule_id = str(new_result)
-            changes["schedule_id"] = new_schedule_id
+            schedule = changes.get("schedule") or existing.get("schedule", "*/15 * * * *")
+            changes.update(await _create_schedule(scheduler, test_id, schedule, staggered))
         except Exception as e:
             changes["status"] = "error"
-            print(f"QStash schedule update failed for {test_id}: {e}")
+            print(f"{scheduler.name} schedule update failed for {test_id}: {e}")
 
     if changes.get("status") == "paused":
         schedule_id = existing.get("schedule_id")
         if schedule_id:
             try:
-                qstash.schedule.delete(schedule_id)
+                await _delete_schedule(schedule_id)
                 changes["schedule_id"] = ""
             except Exception as e:
-                print(f"Failed to pause QStash schedule {schedule_id}: {e}")
+                print(f"Failed to pause schedule {schedule_id}: {e}")
 
-    if changes.get("status") == "active" and existing.get("status") == "paused":
+    if changes.get("status") == "active" and existing.get("status") == "paused" and "schedule_id" not in changes:
         schedule = changes.get("schedule") or existing.get("schedule", "*/15 * * * *")
         try:
-            new_result = qstash.schedule.create(
-                destination=f"{public_url}/api/callback/{test_id}",
-                cron=schedule,
-            )
-            if hasattr(new_result, "schedule_id"):
-                new_schedule_id = new_result.schedule_id
-            else:
-                new_schedule_id = str(new_result)
-            changes["schedule_id"] = new_schedule_id
+            changes.update(await _create_schedule(scheduler, test_id, schedule, staggered))
         except Exception as e:
             changes["status"] = "error"
-            print(f"QStash schedule resume failed for {test_id}: {e}")
+            print(f"{scheduler.name} schedule resume failed for {test_id}: {e}")
 
-    redis.hset(f"test:{test_id}", values=changes)
+    return changes
 
-    return _deserialize_variables(redis.hgetall(f"test:{test_id}"))
 
+def _queue_update(pipe, test_id: str, existing: dict, changes: dict) -> None:
+    pipe.hset(f"test:{test_id}", values=changes)
+    if any(field in changes for field in ("name", "url", "status", "schedule", "schedule_cron", "schedule_delay")):
+        queue_suite(pipe, {**existing, **changes, "id": test_id})
 
-def delete_test_suite(test_id: str) -> bool:
-    redis = get_redis()
-    qstash = get_qstash()
 
-    existing = redis.hgetall(f"test:{test_id}")
+async def update_test_suite(test_id: str, updates: dict) -> dict | None:
+    redis = get_async_redis()
+
+    existing = await redis.hgetall(f"test:{test_id}")
     if not existing:
-        return False
+        return None
+
+    changes = await _update_changes(get_scheduler(), test_id, existing, updates)
+    pipe = redis.pipeline()
+    _queue_update(pipe, test_id, existing, changes)
+    await pipe.exec()
+    invalidate_dashboard_cache()
+
+    return _deserialize_variables(await redis.hgetall(f"test:{test_id}"))
+
 
+async def _release_suite(test_id: str, existing: dict) -> None:
+    """Delete a suite's schedule and per-run records (its keys go in _queue_delete)."""
     schedule_id = existing.get("schedule_id")
     if schedule_id:
         try:
-            qstash.schedule.delete(schedule_id)
+            await _delete_schedule(schedule_id)
         except Exception as e:
-            print(f"Failed to delete QStash schedule {schedule_id}: {e}")
+            print(f"Failed to delete schedule {schedule_id}: {e}")
 
-    redis.delete(f"test:{test_id}")
-    redis.srem("tests:all", test_id)
+    await delete_run_records(test_id)
 
-    redis.delete(f"results:{test_id}")
-    redis.delete(f"timing:{test_id}")
-    redis.delete(f"events:{test_id}")
-    redis.delete(f"incidents:{test_id}")
+
+def _queue_delete(pipe, test_id: str) -> None:
+    pipe.srem("tests:all", test_id)
+    pipe.zrem(TESTS_BY_CREATED, test_id)
+    queue_remove(pipe, test_id)
+    pipe.delete(
+        f"test:{test_id}",
+        f"results:{test_id}",
+        f"timing:{test_id}",
+        f"events:{test_id}",
+        f"incidents:{test_id}",
+        f"rollup:{test_id}",
+    )
+
+
+async def delete_test_suite(test_id: str) -> bool:
+    redis = get_async_redis()
+
+    existing = await redis.hgetall(f"test:{test_id}")
+    if not existing:
+        return False
+
+    await _release_suite(test_id, existing)
+
+    pipe = redis.pipeline()
+    _queue_delete(pipe, test_id)
+    await pipe.exec()
+    invalidate_dashboard_cache()
 
     return True
+
+
+async def _pipelined(redis, items: list, queue) -> list:
+    """Run `queue(pipe, item)` for every item, BULK_PIPELINE_CHUNK items per pipeline; returns all replies."""
+    replies = []
+    for start in range(0, len(items), BULK_PIPELINE_CHUNK):
+        pipe = redis.pipeline()
+        for item in items[start:start + BULK_PIPELINE_CHUNK]:
+            queue(pipe, item)
+        replies.extend(await pipe.exec())
+    return replies
+
+
+async def bulk_apply(operations: list[dict]) -> list[dict]:
+    """Create, update and delete many suites; one result per operation, in order.
+
+    Operations are validated dicts: {"op": "create", "data"}, {"op":
+    "update", "id", "data"} or {"op": "delete", "id"}. Redis work goes out
+    in three pipelined phases (read the targets, write the new suites,
+    write everything else), BULK_PIPELINE_CHUNK items per pipeline, and
+    schedule calls run BULK_SCHEDULE_CONCURRENCY at a time. An item that
+    fails is reported in its result without stopping the rest.
+    """
+    redis = get_async_redis()
+    scheduler = get_scheduler()
+    results = [{"op": op["op"], "id": op.get("id"), "ok": False} for op in operations]
+
+    targets, seen = {}, set()
+    for i, op in enumerate(operations):
+        if op["op"] == "create":
+            continue
+        if op["id"] in seen:
+            results[i]["error"] = "Test appears more than once in this batch"
+            continue
+        seen.add(op["id"])
+        targets[i] = op["id"]
+
+    existing = {}
+    rows = await _pipelined(redis, list(targets.values()), lambda pipe, test_id: pipe.hgetall(f"test:{test_id}"))
+    for i, data in zip(targets, rows):
+        if data:
+            existing[i] = data
+        else:
+            results[i]["error"] = "Test not found"
+
+    # New suites are stored before their schedules exist, as in create_test_suite.
+    created = {i: _new_suite(op["data"]) for i, op in enumerate(operations) if op["op"] == "create"}
+    await _pipelined(redis, list(created.values()), _queue_new_suite)
+    invalidate_dashboard_cache()
+
+    semaphore = asyncio.Semaphore(BULK_SCHEDULE_CONCURRENCY)
+
+    async def schedule(i: int):
+        op = operations[i]
+        async with semaphore:
+            if op["op"] == "create":
+                return await _schedule_new_suite(scheduler, created[i])
+            if op["op"] == "update":
+                return await _update_changes(scheduler, op["id"], existing[i], op["data"])
+            return await _release_suite(op["id"], existing[i])
+
+    pending = sorted([*created, *existing])
+    outcomes = await asyncio.gather(*(schedule(i) for i in pending), return_exceptions=True)
+
+    writes = []
+    for i, outcome in zip(pending, outcomes):
+        op, result = operations[i], results[i]
+        if isinstance(outcome, Exception):
+            result["error"] = str(outcome)[:300]
+            continue
+        writes.append((i, outcome))
+        if op["op"] == "create":
+            created[i].update(outcome)
+            result.update(id=created[i]["id"], test=_deserialize_variables(dict(created[i])))
+        elif op["op"] == "update":
+            result["test"] = _deserialize_variables({**existing[i], **outcome})
+        if outcome and outcome.get("status") == "error":
+            result["error"] = f"{scheduler.name} schedule could not be registered; saved with status error"
+        else:
+            result["ok"] = True
+
+    def queue_write(pipe, write: tuple[int, dict | None]) -> None:
+        i, outcome = write
+        op = operations[i]
+        if op["op"] == "create":
+            if outcome:
+                pipe.hset(f"test:{created[i]['id']}", values=outcome)
+                queue_suite(pipe, created[i])
+        elif op["op"] == "update":
+            _queue_update(pipe, op["id"], existing[i], outcome)
+        else:
+            _queue_delete(pipe, op["id"])
+
+    await _pipelined(redis, writes, queue_write)
+    invalidate_dashboard_cache()
+
+    return results
+
+
+def _export_row(test: dict) -> dict:
+    """A stored suite in the shape POST /api/tests (and bulk create) accepts, plus id/status/created_at."""
+    row = {field: test.get(field) for field in EXPORT_FIELDS}
+    row["alert_webhook"] = row["alert_webhook"] or None
+    row["timeout_seconds"] = int(row["timeout_seconds"]) if row["timeout_seconds"] else None
+    row["stagger"] = _staggered(test)
+    return row
+
+
+async def export_test_suites():
+    """Yield every suite as one NDJSON line, oldest first, EXPORT_PAGE_SIZE suites per Redis round trip."""
+    offset = 0
+    while True:
+        page = await list_test_suites(limit=EXPORT_PAGE_SIZE, offset=offset, newest_first=False)
+        for test in page:
+            yield json.dumps(_export_row(test)) + "\n"
+        if len(page) < EXPORT_PAGE_SIZE:
+            return
+        offset += EXPORT_PAGE_SIZE
+
+
+async def rebalance_schedules(dry_run: bool = False) -> list[dict]:
+    """Move active suites' schedules to their staggered (or opted-out) form.
+
+    Suites whose stored cron/delay already match, on the current
+    SCHEDULER_BACKEND, are left alone. The rest are overwritten in place
+    through their schedule ID, or re-created on the current backend (and
+    removed from the old one) after a backend switch. Returns one entry per
+    suite that needed a change.
+    """
+    redis = get_async_redis()
+    scheduler = get_scheduler()
+    changed = []
+    for test in await list_test_suites():
+        if test.get("status") != "active" or not test.get("schedule_id"):
+            continue
+        cron, delay = effective_schedule(test["id"], test["schedule"], _staggered(test))
+        current = (test.get("schedule_cron") or test["schedule"], int(test.get("schedule_delay") or 0))
+        moved = not scheduler.owns(test["schedule_id"])
+        if current == (cron, delay) and not moved:
+            continue
+        entry = {"id": test["id"], "name": test.get("name"), "from": current, "to": (cron, delay)}
+        if moved:
+            entry["backend"] = scheduler.name
+        if not dry_run:
+            try:
+                schedule_id = None if moved else test["schedule_id"]
+                scheduled = await _create_schedule(scheduler, test["id"], test["schedule"], _staggered(test), schedule_id)
+            except Exception as e:
+                entry["error"] = str(e)[:200]
+            else:
+                pipe = redis.pipeline()
+                pipe.hset(f"test:{test['id']}", values=scheduled)
+                queue_suite(pipe, {**test, **scheduled})
+                await pipe.exec()
+                invalidate_dashboard_cache()
+                if moved:
+                    try:
+                        await _delete_schedule(test["schedule_id"])
+                    except Exception as e:
+                        print(f"Failed to delete old schedule {test['schedule_id']}: {e}")
+        changed.append(entry)
+    return changed
@@ -1,9 +1,14 @@
 import os
 import json
-import httpx
+import time
 from typing import Callable, Awaitable
+from urllib.parse import urlparse
 
-TINYFISH_URL = "https://agent.tinyfish.ai/v1/automation/run-sse"
+from services.config import get_http_client, request_timeout
+from services.limiter import acquire, LimiterTimeout
+
+TINYFISH_URL = os.environ.get("TINYFISH_URL", "https://agent.tinyfish.ai/v1/automation/run-sse")
+TINYFISH_HOST = urlparse(TINYFISH_URL).netloc
 
 
 async def call_tinyfish(
@@ -11,95 +16,149 @@ async def call_tinyfish(
     goal: str,
     timeout: float = 120.0,
     on_streaming_url: Callable[[str], Awaitable[None]] | None = None,
+    on_step: Callable[[dict], Awaitable[str | None]] | None = None,
+) -> dict:
+    """Run a TinyFish session. `timings` in the result holds the limiter wait and
+    connect / first event / complete times, each measured from the request start.
+
+    `on_step` receives each STEP event as it arrives; returning a reason string
+    closes the stream early and the result comes back with `aborted` set.
+    No free TinyFish slot within LIMITER_MAX_WAIT is a failed result too.
+    """
+    timings: dict[str, int] = {}
+    try:
+        async with acquire("tinyfish") as waited_ms:
+            timings["wait_ms"] = waited_ms
+            started = time.perf_counter()
+            try:
+                result = await _stream_run(url, goal, timeout, on_streaming_url, on_step, timings, started)
+            finally:
+                timings["complete_ms"] = int((time.perf_counter() - started) * 1000)
+    except LimiterTimeout as e:
+        result = {"success": False, "data": None, "raw": None, "streaming_url": None, "error": str(e), "steps": []}
+    result["timings"] = timings
+    return result
+
+
+async def _stream_run(
+    url: str,
+    goal: str,
+    timeout: float,
+    on_streaming_url: Callable[[str], Awaitable[None]] | None,
+    on_step: Callable[[dict], Awaitable[str | None]] | None,
+    timings: dict[str, int],
+    started: float,
 ) -> dict:
     tinyfish_key = os.environ.get("TINYFISH_API_KEY", "")
     steps_observed = []
 
-    async with httpx.AsyncClient(timeout=httpx.Timeout(timeout)) as client:
-        async with client.stream(
-            "POST",
-            TINYFISH_URL,
-            headers={
-                "X-API-Key": tinyfish_key,
-                "Content-Type": "application/json",
-            },
-            json={"url": url, "goal": goal},
-        ) as response:
-            if response.status_code != 200:
-                error_body = ""
-                async for chunk in response.aiter_bytes():
-                    error_body += chunk.decode("utf-8", errors="replace")
-                return {
-                    "success": False,
-                    "data": None,
-                    "raw": None,
-                    "streaming_url": None,
-                    "error": f"TinyFish HTTP {response.status_code}: {error_body[:200]}",
-                    "steps": [],
-                }
+    client = get_http_client(TINYFISH_HOST)
+    async with client.stream(
+        "POST",
+        TINYFISH_URL,
+        headers={
+            "X-API-Key": tinyfish_key,
+            "Content-Type": "application/json",
+        },
+        json={"url": url, "goal": goal},
+        timeout=request_timeout(timeout),
+    ) as response:
+        timings["connect_ms"] = int((time.perf_counter() - started) * 1000)
+        if response.status_code != 200:
+            error_body = ""
+            async for chunk in response.aiter_bytes():
+                error_body += chunk.decode("utf-8", errors="replace")
+            return {
+                "success": False,
+                "data": None,
+                "raw": None,
+                "streaming_url": None,
+                "error": f"TinyFish HTTP {response.status_code}: {error_body[:200]}",
+                "steps": [],
+            }
 
-            result_json = None
-            raw_result = None
-            streaming_url = None
+        result_json = None
+        raw_result = None
+        streaming_url = None
 
-            async for line in response.aiter_lines():
-                if not line.startswith("data: "):
-                    continue
-                try:
-                    data = json.loads(line[6:])
-                except json.JSONDecodeError:
-                    continue
+        async for line in response.aiter_lines():
+            if not line.startswith("data: "):
+                continue
+            if "first_event_ms" not in timings:
+                timings["first_event_ms"] = int((time.perf_counter() - started) * 1000)
+            try:
+                data = json.loads(line[6:])
+            except json.JSONDecodeError:
+                continue
 
-                event_type = data.get("type")
+            event_type = data.get("type")
 
-                if event_type == "STREAMING_URL":
-                    streaming_url = data.get("streamingUrl")
-                    if streaming_url and on_streaming_url:
-                        try:
-                            await on_streaming_url(streaming_url)
-                        except Exception as e:
-                            print(f"[TinyFish] on_streaming_url callback error: {e}")
-                elif event_type == "STEP":
-                    steps_observed.append({
-                        "message": data.get("message", ""),
-                        "purpose": data.get("purpose", ""),
-                        "action": data.get("action", ""),
-                    })
-                elif event_type == "COMPLETE":
-                    raw_result = data.get("resultJson")
-                    if isinstance(raw_result, str):
-                        try:
-                            result_json = json.loads(raw_result)
-                        except json.JSONDecodeError:
-                            result_json = {"raw_text": raw_result}
-                    elif isinstance(raw_result, dict):
-                        result_json = raw_result
-                        raw_result = json.dumps(raw_result)
-                elif event_type == "ERROR":
+            if event_type == "STREAMING_URL":
+                streaming_url = data.get("streamingUrl")
+                if streaming_url and on_streaming_url:
+                    try:
+                        await on_streaming_url(streaming_url)
+                    except Exception as e:
+                        print(f"[TinyFish] on_streaming_url callback error: {e}")
+            elif event_type == "STEP":
+                step = {
+                    "message": data.get("message", ""),
+                    "purpose": data.get("purpose", ""),
+                    "action": data.get("action", ""),
+                }
+                steps_observed.append(step)
+                abort_reason = None
+                if on_step:
+                    try:
+                        abort_reason = await on_step(step)
+                    except Exception as e:
+                        print(f"[TinyFish] on_step callback error: {e}")
+                if abort_reason:
+                    # Leaving the stream context drops the connection, ending the session.
                     return {
                         "success": False,
                         "data": None,
                         "raw": None,
                         "streaming_url": streaming_url,
-                        "error": data.get("message", "Unknown TinyFish error"),
+                        "error": f"Aborted early: {abort_reason}",
                         "steps": steps_observed,
+                        "aborted": True,
                     }
-
-            if result_json is None and raw_result is None:
+            elif event_type == "COMPLETE":
+                raw_result = data.get("resultJson")
+                if isinstance(raw_result, str):
+                    try:
+                        result_json = json.loads(raw_result)
+                    except json.JSONDecodeError:
+                        result_json = {"raw_text": raw_result}
+                elif isinstance(raw_result, dict):
+                    result_json = raw_result
+                    raw_result = json.dumps(raw_result)
+            elif event_type == "ERROR":
                 return {
                     "success": False,
                     "data": None,
                     "raw": None,
                     "streaming_url": streaming_url,
-                    "error": "TinyFish stream ended without a COMPLETE event",
+                    "error": data.get("message", "Unknown TinyFish error"),
                     "steps": steps_observed,
                 }
 
+        if result_json is None and raw_result is None:
             return {
-                "success": True,
-                "data": result_json,
-                "raw": raw_result,
+                "success": False,
+                "data": None,
+                "raw": None,
                 "streaming_url": streaming_url,
-                "error": None,
+                "error": "TinyFish stream ended without a COMPLETE event",
                 "steps": steps_observed,
             }
+
+        return {
+            "success": True,
+            "data": result_json,
+            "raw": raw_result,
+            "streaming_url": streaming_url,
+            "error": None,
+            "steps": steps_observed,
+        }
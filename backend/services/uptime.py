@@ -0,0 +1,129 @@
+import json
+import time
+from collections import defaultdict
+
+from services.config import get_async_redis
+from services.result_store import load_runs
+
+# Hourly counters share the rollup:{test_id} hash with retention downsampling:
+# `{hour}:runs`, `{hour}:passed` and `{hour}:duration_ms`. `counted_from` is
+# the score from which store_run_result has been incrementing them; runs
+# older than that are only counted once rebuild_uptime_buckets() has run.
+COUNTED_FROM = "counted_from"
+
+
+def rollup_key(test_id: str) -> str:
+    return f"rollup:{test_id}"
+
+
+def hour_bucket(timestamp: float) -> int:
+    return int(timestamp // 3600 * 3600)
+
+
+def queue_run_counters(pipe, test_id: str, timestamp: float, passed: bool, duration_ms: int) -> None:
+    """Append hourly counter increments for one run to a write pipeline."""
+    key = rollup_key(test_id)
+    hour = hour_bucket(timestamp)
+    pipe.hsetnx(key, COUNTED_FROM, timestamp)
+    pipe.hincrby(key, f"{hour}:runs", 1)
+    if passed:
+        pipe.hincrby(key, f"{hour}:passed", 1)
+    pipe.hincrby(key, f"{hour}:duration_ms", int(duration_ms or 0))
+
+
+async def queue_bucket_counts(pipe, test_id: str, entries: list[tuple[str, float]], chunk: int = 500) -> int:
+    """Load stored runs and append their hourly counter increments to a pipeline.
+
+    `entries` are (member, score) pairs from `results:{test_id}`; runs whose
+    record is gone are skipped. Returns the number of runs counted.
+    """
+    scores = {}
+    for member, score in entries:
+        run_id = member
+        if member.startswith("{"):
+            try:
+                run_id = json.loads(member)["run_id"]
+            except (json.JSONDecodeError, KeyError, TypeError):
+                continue
+        scores[run_id] = score
+
+    buckets: dict[int, dict[str, int]] = defaultdict(lambda: {"runs": 0, "passed": 0, "duration_ms": 0})
+    members = [m for m, _ in entries]
+    for i in range(0, len(members), chunk):
+        for record in await load_runs(test_id, members[i:i + chunk]):
+            score = scores.get(record.get("run_id"))
+            if score is None:
+                continue
+            bucket = buckets[hour_bucket(score)]
+            bucket["runs"] += 1
+            bucket["passed"] += 1 if record.get("passed") else 0
+            bucket["duration_ms"] += int(record.get("duration_ms") or 0)
+
+    key = rollup_key(test_id)
+    for hour, counts in buckets.items():
+        for field, value in counts.items():
+            if value:
+                pipe.hincrby(key, f"{hour}:{field}", value)
+    return sum(b["runs"] for b in buckets.values())
+
+
+def _counted_from(value) -> float | None:
+    try:
+        return float(value) if value is not None else None
+    except (TypeError, ValueError):
+        return None
+
+
+async def rebuild_uptime_buckets(test_id: str, chunk: int = 500) -> int:
+    """Count runs stored before write-time counters existed into the buckets.
+
+    Idempotent: afterwards `counted_from` is 0, so every stored run is
+    reflected exactly once. Returns the number of runs counted.
+    """
+    redis = get_async_redis()
+    key = rollup_key(test_id)
+    lock = f"uptime:rebuild:{test_id}"
+    if not await redis.set(lock, "1", nx=True, ex=120):
+        return 0
+
+    try:
+        await redis.hsetnx(key, COUNTED_FROM, time.time())
+        counted_from = _counted_from(await redis.hget(key, COUNTED_FROM))
+        if not counted_from:
+            return 0
+
+        entries = await redis.zrangebyscore(f"results:{test_id}", "-inf", f"({counted_from}", withscores=True)
+        pipe = redis.pipeline()
+        counted = await queue_bucket_counts(pipe, test_id, entries, chunk)
+        pipe.hset(key, COUNTED_FROM, 0)
+        await pipe.exec()
+        return counted
+    finally:
+        await redis.delete(lock)
+
+
+async def get_uptime_counts(test_id: str, hours: int, now: float | None = None) -> tuple[int, int]:
+    """Return (total_runs, passed_runs) over the last `hours`, from hourly buckets.
+
+    The window is aligned to whole hours, so it can include up to one extra
+    partial hour at its start.
+    """
+    redis = get_async_redis()
+    key = rollup_key(test_id)
+    now = now or time.time()
+    first = hour_bucket(now - hours * 3600)
+    hour_keys = range(first, hour_bucket(now) + 1, 3600)
+
+    fields = [COUNTED_FROM]
+    for hour in hour_keys:
+        fields.extend([f"{hour}:runs", f"{hour}:passed"])
+    values = await redis.hmget(key, *fields)
+
+    counted_from = _counted_from(values[0])
+    if counted_from is None or counted_from > first:
+        if await rebuild_uptime_buckets(test_id) or counted_from is None:
+            values = await redis.hmget(key, *fields)
+
+    total = sum(int(v or 0) for v in values[1::2])
+    passed = sum(int(v or 0) for v in values[2::2])
+    return total, passed
@@ -24,6 +24,7 @@ interface StepStatus {
   step_number: number;
   description: string;
   state: "pending" | "running" | "passed" | "failed";
+  activity?: string;
 }
 
 interface EventEntry {
@@ -132,13 +133,20 @@ function StepTracker({ steps }: { steps: StepStatus[] }) {
               <Circle className="h-4 w-4 text-muted-foreground" />
             )}
           </div>
-          <span
-            className={
-              s.state === "pending" ? "text-muted-foreground" : ""
-            }
-          >
-            Step {s.step_number}: {s.description}
-          </span>
+          <div>
+            <span
+              className={
+                s.state === "pending" ? "text-muted-foreground" : ""
+              }
+            >
+              Step {s.step_number}: {s.description}
+            </span>
+            {s.state === "running" && s.activity && (
+              <p className="text-xs text-muted-foreground" data-testid={`step-activity-${s.step_number}`}>
+                {s.activity}
+              </p>
+            )}
+          </div>
         </div>
       ))}
     </div>
@@ -221,6 +229,39 @@ export function LiveExecutionPanel({ testId, runTrigger, onComplete }: LiveExecu
               );
               break;
             }
+            case "step_progress": {
+              // Live TinyFish activity, attributed to a planned step by the backend.
+              // Earlier steps are shown as passed until step_complete says otherwise.
+              const stepNum = parseInt(data.step_number, 10);
+              const activity = data.message.replace(/^Step \d+: /, "");
+              setSteps((prev) =>
+                prev.map((s) => {
+                  if (s.step_number < stepNum && (s.state === "pending" || s.state === "running")) {
+                    return { ...s, state: "passed", activity: undefined };
+                  }
+                  if (s.step_number === stepNum && s.state !== "failed") {
+                    return { ...s, state: "running", activity };
+                  }
+                  return s;
+                })
+              );
+              break;
+            }
+            case "browser_abort": {
+              const stepNum = parseInt(data.step_number, 10);
+              setSteps((prev) =>
+                prev.map((s) => (s.step_number === stepNum ? { ...s, state: "failed", activity: undefined } : s))
+              );
+              break;
+            }
+            case "retry":
+              // A retried TinyFish session starts over from the first step.
+              if (data.stage === "browser") {
+                setSteps((prev) =>
+                  prev.map((s, i) => ({ ...s, state: i === 0 ? "running" : "pending", activity: undefined }))
+                );
+              }
+              break;
             case "browser_start":
               setSteps((prev) =>
                 prev.length > 0 && prev[0].state === "pending"
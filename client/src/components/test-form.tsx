@@ -1,5 +1,6 @@
 import { useRef, useState, useCallback } from "react";
 import { Input } from "@/components/ui/input";
+import { Checkbox } from "@/components/ui/checkbox";
 import { Textarea } from "@/components/ui/textarea";
 import { Button } from "@/components/ui/button";
 import {
@@ -33,6 +34,12 @@ export const SCHEDULE_OPTIONS = [
   { label: "Daily", value: "0 9 * * *" },
 ];
 
+export const EVALUATOR_OPTIONS = [
+  { label: "Rules first, AI when unclear", value: "auto" },
+  { label: "Always AI", value: "llm" },
+  { label: "Rules only", value: "rules" },
+];
+
 export function scheduleLabel(cron: string): string {
   const match = SCHEDULE_OPTIONS.find((o) => o.value === cron);
   return match ? match.label : cron;
@@ -51,6 +58,9 @@ export interface FormState {
   schedule: string;
   alert_webhook: string;
   variables: Variable[];
+  evaluator_mode: string;
+  timeout_seconds: string;
+  stagger: boolean;
 }
 
 export const emptyForm: FormState = {
@@ -60,8 +70,16 @@ export const emptyForm: FormState = {
   schedule: "*/15 * * * *",
   alert_webhook: "",
   variables: [],
+  evaluator_mode: "auto",
+  timeout_seconds: "",
+  stagger: true,
 };
 
+/** Request body for a form; a blank timeout means the default (0 resets it on update). */
+export function formPayload(form: FormState) {
+  return { ...form, timeout_seconds: form.timeout_seconds ? Number(form.timeout_seconds) : 0 };
+}
+
 function VariableEditor({
   variables,
   onChange,
@@ -339,6 +357,47 @@ export function TestForm({
             ))}
           </SelectContent>
         </Select>
+        <label className="flex items-center gap-2 mt-2 text-xs text-muted-foreground">
+          <Checkbox
+            checked={form.stagger}
+            onCheckedChange={(v) => setForm({ ...form, stagger: v === true })}
+            disabled={disabled}
+            data-testid="checkbox-stagger"
+          />
+          Stagger start time so suites on the same schedule don't all run at once (a time of day you pick is kept)
+        </label>
+      </div>
+      <div>
+        <label className="text-sm font-medium mb-1.5 block">Verdict</label>
+        <Select
+          value={form.evaluator_mode}
+          onValueChange={(v) => setForm({ ...form, evaluator_mode: v })}
+          disabled={disabled}
+        >
+          <SelectTrigger data-testid="select-evaluator-mode">
+            <SelectValue />
+          </SelectTrigger>
+          <SelectContent>
+            {EVALUATOR_OPTIONS.map((opt) => (
+              <SelectItem key={opt.value} value={opt.value} data-testid={`option-evaluator-${opt.value}`}>
+                {opt.label}
+              </SelectItem>
+            ))}
+          </SelectContent>
+        </Select>
+      </div>
+      <div>
+        <label className="text-sm font-medium mb-1.5 block">Timeout (seconds)</label>
+        <Input
+          type="number"
+          min={30}
+          max={1800}
+          placeholder="300"
+          value={form.timeout_seconds}
+          onChange={(e) => setForm({ ...form, timeout_seconds: e.target.value })}
+          disabled={disabled}
+          data-testid="input-test-timeout"
+        />
       </div>
     </div>
   );
@@ -16,7 +16,7 @@ import {
 } from "lucide-react";
 import { Link } from "wouter";
 import { formatDistanceToNow } from "date-fns";
-import { TestForm, FormState, emptyForm } from "@/components/test-form";
+import { TestForm, FormState, emptyForm, formPayload } from "@/components/test-form";
 
 interface DashboardData {
   total_tests: number;
@@ -26,6 +26,7 @@ interface DashboardData {
   failing: number;
   pending: number;
   last_run_at_global: string | null;
+  next_run_at: string | null;
   next_run_approx_minutes: number | null;
   recent_runs: {
     test_id: string;
@@ -62,7 +63,7 @@ export default function Dashboard() {
   const [form, setForm] = useState<FormState>(emptyForm);
 
   const createMutation = useMutation({
-    mutationFn: (body: FormState) => apiRequest("POST", "/api/tests", body),
+    mutationFn: (body: FormState) => apiRequest("POST", "/api/tests", formPayload(body)),
     onSuccess: () => {
       queryClient.invalidateQueries({ queryKey: ["/api/tests"] });
       queryClient.invalidateQueries({ queryKey: ["/api/dashboard"] });
@@ -26,6 +26,9 @@ function StatusIcon({ status }: { status: string }) {
   if (status.startsWith("error") || status === "missing") {
     return <XCircle className="h-5 w-5 text-red-500" />;
   }
+  if (status === "not_used") {
+    return <CheckCircle2 className="h-5 w-5 text-muted-foreground" />;
+  }
   return <AlertTriangle className="h-5 w-5 text-amber-500" />;
 }
 
@@ -37,6 +40,13 @@ function StatusBadge({ status }: { status: string }) {
       </Badge>
     );
   }
+  if (status === "not_used") {
+    return (
+      <Badge variant="secondary" data-testid="badge-status-not-used">
+        Not Used
+      </Badge>
+    );
+  }
   if (status.startsWith("error") || status === "missing") {
     return (
       <Badge variant="default" className="bg-red-500/15 text-red-700 dark:text-red-400 no-default-hover-elevate no-default-active-elevate" data-testid="badge-status-error">
@@ -96,8 +96,29 @@ interface RunResult {
   tinyfish_raw?: string;
   tinyfish_data?: any;
   step_executions?: StepExecution[];
+  meta?: {
+    plan_cache?: string;
+    evaluator?: string;
+    stages?: Record<string, number>;
+    retries?: Record<string, { attempts: number; errors: string[]; wait_ms: number; overhead_ms: number }>;
+  };
 }
 
+const STAGE_LABELS: Record<string, string> = {
+  plan: "Plan",
+  tinyfish_wait: "TinyFish slot wait",
+  tinyfish_connect: "TinyFish connect",
+  tinyfish_first_event: "TinyFish first event",
+  tinyfish_complete: "TinyFish complete",
+  evaluate: "Evaluate",
+};
+
+const RETRY_LABELS: Record<string, string> = {
+  plan: "Plan",
+  browser: "TinyFish",
+  evaluate: "Evaluate",
+};
+
 interface TimingPoint {
   timestamp: string;
   duration_ms: number;
@@ -189,8 +210,14 @@ function ResultBadge({ result }: { result: string }) {
   );
 }
 
-function RunDetailPanel({ run }: { run: RunResult }) {
+function RunDetailPanel({ run: summary }: { run: RunResult }) {
   const { toast } = useToast();
+  // History rows are summaries; plan, raw TinyFish output and step executions
+  // are only loaded when a run is expanded.
+  const { data: detail } = useQuery<RunResult>({
+    queryKey: ["/api/tests", summary.test_id, "results", summary.run_id],
+  });
+  const run = detail ?? summary;
 
   return (
     <div className="p-4 border-t" data-testid={`panel-run-detail-${run.run_id}`}>
@@ -203,7 +230,14 @@ function RunDetailPanel({ run }: { run: RunResult }) {
 
         <TabsContent value="summary" className="mt-4 space-y-4">
           <div className="space-y-2">
-            <p className="text-sm font-medium">Evaluator Assessment</p>
+            <p className="text-sm font-medium">
+              Evaluator Assessment
+              {run.meta?.evaluator && (
+                <span className="ml-2 text-xs font-normal text-muted-foreground" data-testid="text-evaluator-path">
+                  {run.meta.evaluator === "rules" ? "decided by rules" : "decided by AI"}
+                </span>
+              )}
+            </p>
             <p className="text-sm text-muted-foreground">{run.details || "No assessment available."}</p>
           </div>
           {run.error && (
@@ -231,6 +265,11 @@ function RunDetailPanel({ run }: { run: RunResult }) {
                           <span className="text-muted-foreground"> — {planStep.description}</span>
                         )}
                         <p className="text-muted-foreground">{sr.details}</p>
+                        {sr.retry_count > 0 && (
+                          <p className="text-xs text-muted-foreground">
+                            Browser session retried {sr.retry_count}x
+                          </p>
+                        )}
                       </div>
                     </div>
                   );
@@ -240,6 +279,33 @@ function RunDetailPanel({ run }: { run: RunResult }) {
           ) : (
             <p className="text-sm text-muted-foreground">No step data available.</p>
           )}
+          {run.meta?.stages && (
+            <div className="space-y-2">
+              <p className="text-sm font-medium">Stage Timings</p>
+              <div className="flex flex-wrap gap-x-4 gap-y-1 text-xs text-muted-foreground" data-testid="text-stage-timings">
+                {Object.entries(STAGE_LABELS)
+                  .filter(([stage]) => run.meta?.stages?.[stage] !== undefined)
+                  .map(([stage, label]) => (
+                    <span key={stage}>
+                      {label}: {(run.meta!.stages![stage] / 1000).toFixed(1)}s
+                    </span>
+                  ))}
+              </div>
+            </div>
+          )}
+          {run.meta?.retries && (
+            <div className="space-y-2">
+              <p className="text-sm font-medium">Retries</p>
+              <div className="space-y-1 text-xs text-muted-foreground" data-testid="text-retries">
+                {Object.entries(run.meta.retries).map(([stage, r]) => (
+                  <p key={stage}>
+                    {RETRY_LABELS[stage] || stage}: {r.attempts} attempts, +{(r.overhead_ms / 1000).toFixed(1)}s
+                    overhead ({r.errors.join(", ")})
+                  </p>
+                ))}
+              </div>
+            </div>
+          )}
         </TabsContent>
 
         <TabsContent value="raw-json" className="mt-4">
@@ -299,6 +365,11 @@ function RunDetailPanel({ run }: { run: RunResult }) {
         <TabsContent value="plan" className="mt-4">
           {run.plan ? (
             <div className="space-y-4">
+              {run.meta?.plan_cache && (
+                <p className="text-xs text-muted-foreground" data-testid="text-plan-cache">
+                  {run.meta.plan_cache === "hit" ? "Reused cached plan" : run.meta.plan_cache === "replan" ? "Re-planned after repeated failures" : "Freshly planned"}
+                </p>
+              )}
               <div className="space-y-1.5">
                 <p className="text-sm font-medium">Goal</p>
                 <pre className="p-3 rounded-md text-xs bg-zinc-900 text-zinc-100 dark:bg-zinc-950">
@@ -35,7 +35,7 @@ import {
   Pause,
   RotateCcw,
 } from "lucide-react";
-import { TestForm, FormState, emptyForm, scheduleLabel, type Variable } from "@/components/test-form";
+import { TestForm, FormState, emptyForm, formPayload, scheduleLabel, type Variable } from "@/components/test-form";
 
 interface TestSuite {
   id: string;
@@ -46,9 +46,13 @@ interface TestSuite {
   schedule_id?: string;
   alert_webhook?: string;
   variables?: Variable[];
+  evaluator_mode?: string;
+  timeout_seconds?: number | string;
+  stagger?: string;
   status: string;
   last_result: string;
   last_run_at?: string;
+  next_run_at?: string | null;
   created_at: string;
   updated_at: string;
 }
@@ -135,7 +139,7 @@ export default function TestsPage() {
   const tests = data?.tests || [];
 
   const createMutation = useMutation({
-    mutationFn: (body: FormState) => apiRequest("POST", "/api/tests", body),
+    mutationFn: (body: FormState) => apiRequest("POST", "/api/tests", formPayload(body)),
     onSuccess: () => {
       queryClient.invalidateQueries({ queryKey: ["/api/tests"] });
       setCreateOpen(false);
@@ -144,8 +148,8 @@ export default function TestsPage() {
   });
 
   const updateMutation = useMutation({
-    mutationFn: ({ id, body }: { id: string; body: Partial<FormState> }) =>
-      apiRequest("PUT", `/api/tests/${id}`, body),
+    mutationFn: ({ id, body }: { id: string; body: FormState }) =>
+      apiRequest("PUT", `/api/tests/${id}`, formPayload(body)),
     onSuccess: () => {
       queryClient.invalidateQueries({ queryKey: ["/api/tests"] });
       setEditTest(null);
@@ -182,6 +186,9 @@ export default function TestsPage() {
       schedule: t.schedule,
       alert_webhook: t.alert_webhook || "",
       variables: t.variables || [],
+      evaluator_mode: t.evaluator_mode || "auto",
+      timeout_seconds: t.timeout_seconds ? String(t.timeout_seconds) : "",
+      stagger: t.stagger !== "0",
     });
     setEditTest(t);
   }
@@ -267,6 +274,11 @@ export default function TestsPage() {
                           Last run: {new Date(t.last_run_at).toLocaleString()}
                         </span>
                       )}
+                      {t.next_run_at && (
+                        <span className="text-xs text-muted-foreground" data-testid={`text-next-run-${t.id}`}>
+                          Next run: {new Date(t.next_run_at).toLocaleString()}
+                        </span>
+                      )}
                     </div>
                   </Link>
                   <div className="flex items-center gap-1 shrink-0">